@@ -0,0 +1,59 @@
+'''
+DatabaseScraperのパーサの速度を比較するベンチマーク。
+パーサ(html.parser/lxml)と、ページ全体をパースするか必要な要素だけをパースするかの組み合わせごとに、
+1秒あたりに処理できるページ数を表示する。全ての組み合わせで抽出結果が一致することも確認する。
+
+    $ python benchmarks/bench_database_parser.py
+'''
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fixtures import make_db_race_page  # noqa: E402
+from scraping.netkeiba import DatabaseScraper  # noqa: E402
+from scraping.transport import Page  # noqa: E402
+
+RACE_ID = 202105021211
+
+
+def scrape(scraper: DatabaseScraper, page: Page):
+    scraper.set_soup(scraper._make_soup(page), RACE_ID)
+    return (scraper.get_main_df(), scraper.get_race_info(), scraper.get_pay_df(),
+            scraper.get_corner_df(), scraper.get_laptime_df())
+
+
+def assert_same(expected, actual):
+    for e, a in zip(expected, actual):
+        if isinstance(e, pd.DataFrame):
+            pd.testing.assert_frame_equal(e, a)
+        else:
+            assert e == a, (e, a)
+
+
+def main(n_pages: int = 50):
+    pages = [Page(f'https://db.netkeiba.com/race/{RACE_ID}', make_db_race_page(RACE_ID, seed=i), 'EUC-JP')
+             for i in range(n_pages)]
+    print(f'{len(pages[0].content) / 1024:.0f} KiB/page, {n_pages} pages')
+    baseline = None
+    for parser in ['html.parser', 'lxml']:
+        for partial in [False, True]:
+            scraper = DatabaseScraper(parser=parser, partial=partial)
+            results = [scrape(scraper, page) for page in pages[:3]]
+            if baseline is None:
+                baseline = results
+            for expected, actual in zip(baseline, results):
+                assert_same(expected, actual)
+            start = time.perf_counter()
+            for page in pages:
+                scrape(scraper, page)
+            elapsed = time.perf_counter() - start
+            print(f'parser={parser:<12} partial={str(partial):<5} {n_pages / elapsed:8.1f} pages/sec')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,488 @@
+'''
+ベンチマーク用のHTMLを生成するモジュール。
+実際のページと同じ構造のHTMLを乱数から決定的に生成するので、ネットワークにはアクセスしない。
+'''
+import itertools
+import json
+import random
+
+HORSE_NAMES = [
+    'シャフリヤール', 'エフフォーリア', 'ステラヴェローチェ', 'グレートマジシャン',
+    'サトノレイナス', 'ヨーホーレイク', 'ワンダフルタウン', 'アドマイヤハダル',
+    'タイトルホルダー', 'バスラットレオン', 'ヴィクティファルス', 'レッドジェネシス',
+    'ディープモンスター', 'グラティアス', 'タイムトゥヘヴン', 'バジオウ',
+    'ラーゴム', 'ロードマックス']
+JOCKEY_NAMES = ['福永祐一', '横山武史', '吉田隼人', '戸崎圭太', 'ルメール', '川田将雅',
+                '岩田望来', '松山弘平', '田辺裕信', '三浦皇成', '和田竜二', '武豊']
+TRAINER_NAMES = ['藤原英昭', '鹿戸雄一', '須貝尚介', '宮田敬介', '国枝栄', '友道康夫']
+OWNER_NAMES = ['サンデーレーシング', 'キャロットファーム', 'シルクレーシング', '金子真人ホールディングス']
+
+
+def _filler(rng: random.Random, n_links: int) -> str:
+    # ヘッダやサイドバーなど、スクレイパーが参照しない部分
+    items = list()
+    for i in range(n_links):
+        items.append(
+            f'<li class="nav_item_{i % 7}"><a href="/news/?pid=news_view&amp;no={rng.randint(100000, 999999)}" '
+            f'title="ニュース{i}">競馬ニュース{i} 注目の一戦を徹底分析</a></li>')
+    return '<div class="side_nav"><ul>' + '\n'.join(items) + '</ul></div>'
+
+
+def _scripts(rng: random.Random, n: int) -> str:
+    lines = list()
+    for i in range(n):
+        lines.append(
+            f'<script type="text/javascript">var ad_slot_{i} = {{"id": {rng.randint(1, 99999)}, '
+            f'"size": [300, 250], "target": "race_{i}"}};</script>')
+    return '\n'.join(lines)
+
+
+def make_db_race_page(race_id: int = 202105021211, n_horses: int = 18, login: bool = False, seed: int = 0) -> bytes:
+    """db.netkeiba.comのレース結果ページと同じ構造のHTMLを生成する。
+
+    Parameters
+    ----------
+    race_id : int, default 202105021211
+        12桁のレースID
+    n_horses : int, default 18
+        出走頭数
+    login : bool, default False
+        Trueの場合はプレミアム会員向けの列を含める
+    seed : int, default 0
+        乱数のシード
+
+    Returns
+    -------
+    bytes
+        EUC-JPでエンコードしたHTML
+    """
+    rng = random.Random(seed)
+    header = ['着<br />順', '枠<br />番', '馬<br />番', '馬名', '性齢', '斤量', '騎手', 'タイム', '着差',
+              'ﾀｲﾑ<br />指数', '通過', '上り', '単勝', '人<br />気', '馬体重',
+              '調教<br />ﾀｲﾑ', '厩舎<br />ｺﾒﾝﾄ', '備考', '調教師', '馬主', '賞金<br />(万円)']
+    rows = ['<tr class="txt_c">' + ''.join(f'<th nowrap="nowrap">{h}</th>' for h in header) + '</tr>']
+    umaban_list = list(range(1, n_horses + 1))
+    rng.shuffle(umaban_list)
+    base_time = 142.5
+    for rank, umaban in enumerate(umaban_list, 1):
+        waku = (umaban - 1) * 8 // n_horses + 1
+        t = base_time + rank * rng.uniform(0.0, 0.4)
+        time_text = f'{int(t // 60)}:{t % 60:04.1f}'
+        weight = rng.randint(420, 520)
+        prize = f'{rng.randint(0, 20000):,}.0' if rank <= 5 else ''
+        premium = ['**', '**', '**', '<diary_snap_cut></diary_snap_cut>'] if not login else \
+            [str(rng.randint(80, 120)), '<a href="/?pid=race_training">評価</a>', '状態良好', '']
+        horse_id = 2018100000 + rng.randint(0, 99999)
+        owner = '' if rank == n_horses else \
+            f'<a href="/owner/result/recent/{rng.randint(100000, 999999)}/" title="x">{rng.choice(OWNER_NAMES)}</a>'
+        cells = [
+            f'<td class="txt_r" nowrap="nowrap">{rank}</td>',
+            f'<td class="w{waku}ml" nowrap="nowrap"><span>{waku}</span></td>',
+            f'<td class="txt_r" nowrap="nowrap">{umaban}</td>',
+            f'<td class="txt_l" nowrap="nowrap"><a href="/horse/{horse_id}/" id="umalink_{race_id}" '
+            f'title="{HORSE_NAMES[umaban - 1]}">{HORSE_NAMES[umaban - 1]}</a></td>',
+            f'<td class="txt_c" nowrap="nowrap">{rng.choice("牡牝セ")}3</td>',
+            f'<td nowrap="nowrap">{rng.choice(["55", "57", "54.0"])}</td>',
+            f'<td class="txt_l" nowrap="nowrap"><a href="/jockey/result/recent/0{rng.randint(1000, 1200)}/" '
+            f'title="x">{rng.choice(JOCKEY_NAMES)}</a></td>',
+            f'<td class="txt_r" nowrap="nowrap">{time_text}</td>',
+            f'<td nowrap="nowrap">{"" if rank == 1 else rng.choice(["クビ", "1/2", "ハナ", "1"])}</td>',
+            f'<td class="txt_c" nowrap="nowrap">{premium[0]}</td>',
+            f'<td nowrap="nowrap">{rng.randint(1, 18)}-{rng.randint(1, 18)}-{rng.randint(1, 18)}-{rank}</td>',
+            f'<td class="txt_c" nowrap="nowrap"><span class="">{rng.uniform(33, 37):.1f}</span></td>',
+            f'<td class="txt_r" nowrap="nowrap">{rng.uniform(1.5, 300):.1f}</td>',
+            f'<td class="txt_r" nowrap="nowrap"><span>{rng.randint(1, n_horses)}</span></td>',
+            f'<td nowrap="nowrap">{weight}({rng.choice(["+", "-"])}{rng.randint(0, 12)})</td>',
+            f'<td class="txt_c" nowrap="nowrap">{premium[1]}</td>',
+            f'<td class="txt_c" nowrap="nowrap">{premium[2]}</td>',
+            f'<td nowrap="nowrap">{premium[3]}</td>',
+            f'<td class="txt_l" nowrap="nowrap">[{rng.choice("東西")}] <a href="/trainer/result/recent/0{rng.randint(1000, 1200)}/" '
+            f'title="x">{rng.choice(TRAINER_NAMES)}</a></td>',
+            f'<td class="txt_l" nowrap="nowrap">{owner}</td>',
+            f'<td class="txt_r" nowrap="nowrap">{prize}</td>']
+        rows.append('<tr>\n' + '\n'.join(cells) + '\n</tr>')
+    result_table = (
+        '<table class="race_table_01 nk_tb_common" summary="レース結果" cellpadding="0" cellspacing="1">\n'
+        + '\n'.join(rows) + '\n</table>')
+
+    top3 = umaban_list[:3]
+
+    def pay_row(cls, name, combos, pays, pops):
+        return (f'<tr>\n<th class="{cls}">{name}</th>\n<td>{"<br />".join(combos)}</td>\n'
+                f'<td class="txt_r">{"<br />".join(pays)}</td>\n<td class="txt_r">{"<br />".join(pops)}</td>\n</tr>')
+
+    def pay():
+        return f'{rng.randint(100, 500000):,}'
+
+    a, b, c = top3
+    pay_table_1 = '<table width="32%" summary="払い戻し" class="pay_table_01">\n' + '\n'.join([
+        pay_row('tan', '単勝', [str(a)], [pay()], ['4']),
+        pay_row('fuku', '複勝', [str(x) for x in top3], [pay(), pay(), pay()], ['4', '3', '9']),
+        pay_row('waku', '枠連', [f'{min(a, b) * 8 // n_horses + 1} - {max(a, b) * 8 // n_horses + 1}'], [pay()], ['7']),
+        pay_row('uren', '馬連', [f'{min(a, b)} - {max(a, b)}'], [pay()], ['11'])]) + '\n</table>'
+    pay_table_2 = '<table width="32%" summary="払い戻し" class="pay_table_01">\n' + '\n'.join([
+        pay_row('wide', 'ワイド', [f'{min(a, b)} - {max(a, b)}', f'{min(a, c)} - {max(a, c)}', f'{min(b, c)} - {max(b, c)}'],
+                [pay(), pay(), pay()], ['10', '23', '30']),
+        pay_row('utan', '馬単', [f'{a} → {b}'], [pay()], ['21']),
+        pay_row('sanfuku', '三連複', [' - '.join(str(x) for x in sorted(top3))], [pay()], ['110']),
+        pay_row('santan', '三連単', [f'{a} → {b} → {c}'], [pay()], ['578'])]) + '\n</table>'
+
+    corners = list()
+    for i in range(1, 5):
+        order = list(range(1, n_horses + 1))
+        rng.shuffle(order)
+        k = len(order) // 3
+        corners.append(
+            f'<tr>\n<th>{i}コーナー</th>\n<td>({",".join(map(str, order[:2]))})-{",".join(map(str, order[2:k + 2]))}'
+            f'({",".join(map(str, order[k + 2:k + 4]))})-{",".join(map(str, order[k + 4:]))}</td>\n</tr>')
+    corner_table = '<table summary="コーナー通過順位" class="result_table_02">\n' + '\n'.join(corners) + '\n</table>'
+    laps = [rng.uniform(11.0, 13.0) for _ in range(12)]
+    cum = [sum(laps[:i + 1]) for i in range(12)]
+    lap_table = (
+        '<table summary="ラップタイム" class="result_table_02">\n'
+        f'<tr>\n<th>ラップ</th>\n<td class="race_lap_cell">{" - ".join(f"{x:.1f}" for x in laps)}</td>\n</tr>\n'
+        f'<tr>\n<th>ペース</th>\n<td class="race_lap_cell">{" - ".join(f"{x:.1f}" for x in cum)} '
+        f'({sum(laps[:3]):.1f}-{sum(laps[-3:]):.1f})</td>\n</tr>\n</table>')
+
+    data_intro = (
+        '<div class="data_intro">\n<dl class="racedata fc">\n<dt>11 R</dt>\n<dd>\n<h1>日本ダービー(G1)</h1>\n'
+        '<p><diary_snap_cut>\n<span>芝左2400m&nbsp;/&nbsp;天候 : 晴&nbsp;/&nbsp;芝 : 良&nbsp;/&nbsp;発走 : 15:40</span>\n'
+        '</diary_snap_cut></p>\n</dd>\n</dl>\n'
+        '<p class="smalltxt">2021年5月30日 2回東京12日目 3歳オープン&nbsp;&nbsp;(国際) 牡・牝(指)(定量)</p>\n</div>')
+
+    html = f'''<!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Transitional//EN" "http://www.w3.org/TR/xhtml1/DTD/xhtml1-transitional.dtd">
+<html xmlns="http://www.w3.org/1999/xhtml" lang="ja" xml:lang="ja">
+<head>
+<meta http-equiv="Content-Type" content="text/html; charset=EUC-JP" />
+<title>日本ダービー(G1) 結果・払戻 | 2021年5月30日 東京11R レース情報(JRA) - netkeiba.com</title>
+{_scripts(rng, 40)}
+</head>
+<body>
+<div id="page">
+<div id="header">{_filler(rng, 120)}</div>
+<div id="contents">
+<div id="main">
+<div class="race_head fc">
+<div class="race_head_inner">
+<ul class="race_place fc"><li><a href="/race/list/20210530/" class="active">東京</a></li></ul>
+{data_intro}
+</div>
+</div>
+{result_table}
+<div class="result_info box_left">
+<dl class="pay_block">
+<dt>払い戻し</dt>
+<dd class="fc">
+{pay_table_1}
+{pay_table_2}
+</dd>
+</dl>
+{corner_table}
+{lap_table}
+</div>
+</div>
+<div id="side">{_filler(rng, 200)}</div>
+</div>
+<div id="footer">{_filler(rng, 80)}</div>
+</div>
+</body>
+</html>
+'''
+    return html.encode('euc-jp')
+
+
+def _page(title: str, body: str, charset: str, rng: random.Random) -> str:
+    return f'''<!DOCTYPE html>
+<html lang="ja">
+<head>
+<meta http-equiv="Content-Type" content="text/html; charset={charset}" />
+<title>{title}</title>
+{_scripts(rng, 20)}
+</head>
+<body>
+<div id="header">{_filler(rng, 80)}</div>
+<div id="contents">
+{body}
+</div>
+<div id="footer">{_filler(rng, 60)}</div>
+</body>
+</html>
+'''
+
+
+def make_race_list_page(date: str = '20210530', n_places: int = 3, seed: int = 0) -> bytes:
+    """db.netkeiba.comのレース一覧ページ(/race/list/YYYYMMDD/)と同じ構造のHTMLを生成する"""
+    rng = random.Random(seed)
+    year = date[:4]
+    blocks = list()
+    for place in rng.sample(range(1, 11), n_places):
+        kai, nichi = rng.randint(1, 5), rng.randint(1, 12)
+        items = list()
+        for r in range(1, 13):
+            race_id = f'{year}{place:02}{kai:02}{nichi:02}{r:02}'
+            items.append(
+                f'<dd><a href="/race/{race_id}/" title="{r}R">{r}R</a> '
+                f'<a href="/race/movie/{race_id}/" class="movie">映像</a></dd>')
+        blocks.append(f'<dl class="race_top_hold_list"><dt>{kai}回{place}日目</dt>\n' + '\n'.join(items) + '</dl>')
+    body = '<div class="race_list fc">\n' + '\n'.join(blocks) + '\n</div>'
+    return _page(f'{date} レース一覧 | netkeiba.com', body, 'EUC-JP', rng).encode('euc-jp')
+
+
+def make_nar_race_list_page(kaisai_id: str = '2021440530', n_races: int = 12, seed: int = 0) -> bytes:
+    """nar.netkeiba.comの開催場ごとのレース一覧(race_list_sub.html)と同じ構造のHTMLを生成する。
+    n_races=0の場合は、開催が無い日と同じく別の開催のレースを表示する。
+    """
+    rng = random.Random(seed)
+    if n_races == 0:
+        kaisai_id, n_races, header = f'{kaisai_id[:8]}{int(kaisai_id[8:]) % 28 + 1:02}', 10, '-回'
+    else:
+        header = f'{rng.randint(1, 20)}回'
+    items = list()
+    for r in range(1, n_races + 1):
+        race_id = f'{kaisai_id}{r:02}'
+        items.append(
+            f'<li class="RaceList_DataItem"><a href="../race/shutuba.html?race_id={race_id}&rf=race_list">'
+            f'<div class="Race_Num"><span>{r}R</span></div>'
+            f'<div class="RaceList_ItemContent"><span class="ItemTitle">{_filler(rng, 2)}</span></div></a></li>')
+    body = (f'<div id="RaceList"><dl><dt><div><p>{header}</p></div></dt>'
+            '<dd><ul>' + '\n'.join(items) + '</ul></dd></dl></div>')
+    return f'<!-- {_filler(rng, 5)} -->\n{body}'.encode('euc-jp')
+
+
+def make_odds_api_payload(race_id: str = '202105021211', odds_type: int = 1, n_horses: int = 16,
+                          seed: int = 0) -> bytes:
+    """race.netkeiba.comのオッズのAPI(api_get_jra_odds.html)と同じ構造のJSONを生成する"""
+    rng = random.Random(seed)
+    horses = range(1, n_horses + 1)
+    # type: (oddsのキー, 組番の列挙)
+    combos = {
+        1: [('1', [(h,) for h in horses]), ('2', [(h,) for h in horses])],
+        4: [('4', list(itertools.combinations(horses, 2)))],
+        5: [('5', list(itertools.combinations(horses, 2)))],
+        6: [('6', list(itertools.permutations(horses, 2)))],
+        7: [('7', list(itertools.combinations(horses, 3)))],
+        8: [('8', list(itertools.permutations(horses, 3)))],
+    }[odds_type]
+    odds = dict()
+    for key, items in combos:
+        values = [round(rng.uniform(1.1, 30) ** len(items[0]), 1) for _ in items]
+        ranks = {i: r + 1 for r, i in enumerate(sorted(range(len(values)), key=values.__getitem__))}
+        table = dict()
+        for i, (combo, value) in enumerate(zip(items, values)):
+            upper = f'{value * 1.4:.1f}' if key in ('2', '5') else ''
+            # 取消の馬はオッズが無い
+            if combo[0] == n_horses and key == '1':
+                table[''.join(f'{h:02}' for h in combo)] = ['---', '', '']
+                continue
+            table[''.join(f'{h:02}' for h in combo)] = [f'{value:.1f}', upper, str(ranks[i])]
+        odds[key] = table
+    payload = {'status': 'middle', 'reason': '', 'data': {
+        'official_datetime': '2021-05-30 15:30:00', 'odds': odds}}
+    return json.dumps(payload, separators=(',', ':')).encode('utf-8')
+
+
+def make_horse_page(horse_id: str = '2018105027', n_races: int = 20, seed: int = 0) -> bytes:
+    """db.netkeiba.comの馬のページ(過去成績の表を含む)と同じ構造のHTMLを生成する"""
+    rng = random.Random(seed)
+    header = ['日付', '開催', '天気', 'R', 'レース名', '映像', '頭数', '枠番', '馬番', 'オッズ', '人気', '着順',
+              '騎手', '斤量', '距離', '馬場', '馬場指数', 'タイム', '着差', 'ﾀｲﾑ指数', '通過', 'ペース', '上り',
+              '馬体重', '厩舎ｺﾒﾝﾄ', '備考', '勝ち馬(2着馬)', '賞金']
+    rows = ['<thead><tr>' + ''.join(f'<th>{h}</th>' for h in header) + '</tr></thead><tbody>']
+    for i in range(n_races):
+        t = rng.uniform(68, 150)
+        n = rng.randint(8, 18)
+        cells = [
+            f'<a href="/race/list/2021{rng.randint(1, 12):02}{rng.randint(1, 28):02}/">2021/{rng.randint(1, 12):02}/{rng.randint(1, 28):02}</a>',
+            f'<a href="/race/sum/05/">{rng.randint(1, 5)}{rng.choice(["東京", "中山", "京都", "阪神"])}{rng.randint(1, 12)}</a>',
+            rng.choice(['晴', '曇', '雨']), str(rng.randint(1, 12)),
+            f'<a href="/race/2021050212{i:02}/" title="x">{rng.choice(["日本ダービー(G1)", "皐月賞(G1)", "3歳未勝利"])}</a>',
+            '<a href="#" class="movie"><img src="/img/movie.png" /></a>', str(n), str(rng.randint(1, 8)),
+            str(rng.randint(1, n)), f'{rng.uniform(1.5, 200):.1f}', str(rng.randint(1, n)), str(rng.randint(1, n)),
+            f'<a href="/jockey/result/recent/0{rng.randint(1000, 1200)}/">{rng.choice(JOCKEY_NAMES)}</a>',
+            rng.choice(['55', '57', '54.0']), f'{rng.choice(["芝", "ダ"])}{rng.choice([1200, 1600, 2000, 2400])}',
+            rng.choice(['良', '稍', '重']), '**', f'{int(t // 60)}:{t % 60:04.1f}', f'{rng.uniform(0, 2):.1f}', '**',
+            f'{rng.randint(1, 18)}-{rng.randint(1, 18)}', f'{rng.uniform(34, 37):.1f}-{rng.uniform(34, 37):.1f}',
+            f'{rng.uniform(33, 37):.1f}', f'{rng.randint(420, 520)}({rng.choice("+-")}{rng.randint(0, 12)})',
+            '', '', f'<a href="/horse/2018{rng.randint(100000, 109999)}/">{rng.choice(HORSE_NAMES)}</a>',
+            f'{rng.randint(0, 20000):,}.0' if rng.random() < 0.3 else '']
+        rows.append('<tr>' + ''.join(f'<td>{c}</td>' for c in cells) + '</tr>')
+    table = ('<table class="db_h_race_results nk_tb_common" summary="競走成績">\n'
+             + '\n'.join(rows) + '\n</tbody></table>')
+    prof_rows = [
+        ('生年月日', f'2018年{rng.randint(1, 6)}月{rng.randint(1, 28)}日'),
+        ('調教師', f'<a href="/trainer/0{rng.randint(1000, 1200)}/" title="x">{rng.choice(TRAINER_NAMES)}</a>(美浦)'),
+        ('馬主', f'<a href="/owner/{rng.randint(100000, 999999)}/" title="x">{rng.choice(OWNER_NAMES)}</a>'),
+        ('生産者', f'<a href="/breeder/{rng.randint(100000, 999999)}/" title="x">ノーザンファーム</a>'),
+        ('産地', '安平町'),
+        ('獲得賞金', f'{rng.randint(0, 50000):,}万円 (中央)'),
+    ]
+    prof = ('<div class="db_prof_area_02"><table class="db_prof_table" summary="のプロフィール">'
+            + ''.join(f'<tr><th>{k}</th><td>{v}</td></tr>' for k, v in prof_rows) + '</table></div>')
+    body = (f'<div class="db_main_box"><div class="horse_title"><h1>{rng.choice(HORSE_NAMES)}</h1>'
+            f'<p class="txt_01">現役　牡3　鹿毛</p></div>\n{prof}\n{table}</div>')
+    return _page('競走馬データ | netkeiba.com', body, 'EUC-JP', rng).encode('euc-jp')
+
+
+def make_ped_page(horse_id: str = '2018105027', seed: int = 0) -> bytes:
+    """db.netkeiba.comの5代血統表のページと同じ構造のHTMLを生成する"""
+    rng = random.Random(seed)
+    rows = list()
+    for i in range(32):
+        cells = list()
+        for span in [16, 8, 4, 2, 1]:
+            if i % span == 0:
+                ancestor_id = f'{rng.randint(1980, 2015)}{rng.randint(100000, 109999)}'
+                name = rng.choice(HORSE_NAMES)
+                attr = f' rowspan="{span}"' if span > 1 else ''
+                cells.append(
+                    f'<td{attr} class="b_ml"><a href="/horse/{ancestor_id}/">{name}\n{name}</a><br />'
+                    f'<span>{rng.choice(["鹿毛", "黒鹿毛", "栗毛"])} {rng.randint(1980, 2015)}</span><br />'
+                    f'<a href="/horse/sire/{ancestor_id}/">産駒</a></td>')
+        rows.append('<tr>' + ''.join(cells) + '</tr>')
+    body = '<table class="blood_table detail" summary="5代血統表">\n' + '\n'.join(rows) + '\n</table>'
+    return _page('血統 | netkeiba.com', body, 'EUC-JP', rng).encode('euc-jp')
+
+
+def make_umabashira_page(race_id: str = '202105021211', n_horses: int = 18, seed: int = 0) -> bytes:
+    """jiro8.sakura.ne.jpの馬柱のページと同じ構造のHTMLを生成する。
+    馬が列、項目が行の表で、右端の列に項目名が入る。
+    """
+    rng = random.Random(seed)
+    labels = ['枠番', '馬番', '馬名', '性齢', '斤量', '騎手', '調教師', '着順', 'オッズ(人気)', 'タイム',
+              'ペース脚質3F', 'コーナー順位', '体重(増減)', '先行指数', 'ペース指数', '上がり指数',
+              'スピード指数', '本紙)独自指数', 'SP指数補正後', '前走の指数', '前走', '2走前', '3走前']
+    rows = list()
+    for label in labels:
+        cells = list()
+        for h in range(n_horses, 0, -1):
+            if label == '馬番':
+                v = str(h)
+            elif label == '馬名':
+                v = rng.choice(HORSE_NAMES)
+            elif label.endswith('指数') or label == 'SP指数補正後':
+                v = str(rng.randint(30, 110))
+            else:
+                v = f'{label[:2]}{rng.randint(1, 99)}'
+            cells.append(f'<td class="c{h % 4}">{v}</td>')
+        cells.append(f'<td class="label">{label}</td>')
+        rows.append('<tr>' + ''.join(cells) + '</tr>')
+    tables = [f'<table class="t{k}"><tr><td>{k}</td><td>x</td></tr></table>' for k in range(12)]
+    body = '\n'.join(tables) + '\n<table class="c1" border="1">\n' + '\n'.join(rows) + '\n</table>'
+    return _page(f'{race_id} 馬柱', body, 'Shift_JIS', rng).encode('cp932')
+
+
+def make_boatrace_result_page(seed: int = 0) -> bytes:
+    """www.boatrace.jpのレース結果ページと同じ構造のHTMLを生成する"""
+    rng = random.Random(seed)
+    order = list(range(1, 7))
+    rng.shuffle(order)
+    rows = list()
+    for rank, waku in enumerate(order, 1):
+        t = 108 + rank * rng.uniform(0.5, 1.5)
+        rows.append(
+            f'<tbody class="is-fs12"><tr><td class="is-fs14">{"０１２３４５６"[rank]}</td><td>{waku}</td>'
+            f'<td><span class="is-fs12">{rng.randint(3000, 5200)}</span>　<span class="is-fs18 is-fBold">'
+            f'山田　{rng.choice(["太郎", "花子", "一郎"])}</span></td>'
+            f'<td>{int(t // 60)}\'{int(t % 60):02}"{rng.randint(0, 9)}</td></tr></tbody>')
+    result = ('<table class="is-w495"><thead><tr><th>着</th><th>枠</th><th>ボートレーサー</th>'
+              '<th>レースタイム</th></tr></thead>' + ''.join(rows) + '</table>')
+    pay_rows = list()
+    for name, combos in [('3連単', 1), ('3連複', 1), ('2連単', 1), ('2連複', 1), ('拡連複', 3), ('単勝', 1), ('複勝', 2)]:
+        for j in range(combos + 1):
+            head = f'<td rowspan="{combos + 1}">{name}</td>' if j == 0 else ''
+            if j < combos:
+                pay_rows.append(
+                    f'<tr>{head}<td>{"-".join(map(str, rng.sample(range(1, 7), 3)))}</td>'
+                    f'<td>&yen;{rng.randint(100, 99999):,}</td><td>{rng.randint(1, 120)}</td></tr>')
+            else:
+                # 的中が1つしかない券種でも空の行がある
+                pay_rows.append(f'<tr>{head}<td></td><td></td><td></td></tr>')
+    pay = ('<table class="is-w495"><thead><tr><th>勝式</th><th>組番</th><th>払戻金</th><th>人気</th></tr></thead>'
+           '<tbody>' + ''.join(pay_rows) + '</tbody></table>')
+    body = ('<table><tr><th>1R</th></tr><tr><td>x</td></tr></table>\n' + result
+            + '\n<table><tr><th>スタート情報</th></tr><tr><td>x</td></tr></table>\n' + pay)
+    return _page('レース結果 | BOAT RACE', body, 'UTF-8', rng).encode('utf-8')
+
+
+def make_boatrace_odds_page(kind: str = 'odds3t', seed: int = 0) -> bytes:
+    """www.boatrace.jpのオッズのページと同じ構造のHTMLを生成する。
+
+    Parameters
+    ----------
+    kind : str, default 'odds3t'
+        'oddstf'(単勝・複勝)、'odds3t'(3連単)、'odds3f'(3連複)、'odds2tf'(2連単・2連複)のいずれか
+    """
+    rng = random.Random(seed)
+
+    def odds():
+        return f'{rng.uniform(1.0, 999.0):.1f}'
+
+    def ren_table(delta, n_rows):
+        head = '<tr>' + ''.join(f'<th colspan="{delta}">{b}</th>' for b in range(1, 7)) + '</tr>'
+        rows = list()
+        for r in range(n_rows):
+            cells = list()
+            for b in range(1, 7):
+                if delta == 3:
+                    if r % 4 == 0:
+                        cells.append(f'<td rowspan="4">{(r // 4) % 6 + 1}</td>')
+                    cells.append(f'<td>{r % 6 + 1}</td><td>{odds()}</td>')
+                else:
+                    cells.append(f'<td>{r % 6 + 1}</td><td>{odds()}</td>')
+            rows.append('<tr>' + ''.join(cells) + '</tr>')
+        return '<table>' + head + ''.join(rows) + '</table>'
+
+    if kind == 'oddstf':
+        rows = ''.join(f'<tr><td>{b}</td><td>山田 太郎</td><td>{odds()}</td></tr>' for b in range(1, 7))
+        tables = ['<table><thead><tr><th></th><th>ボートレーサー</th><th>単勝オッズ</th></tr></thead>'
+                  f'<tbody>{rows}</tbody></table>']
+    elif kind == 'odds2tf':
+        tables = [ren_table(2, 5), ren_table(2, 5)]
+    else:
+        tables = [ren_table(3, 20)]
+    body = '<table><tr><th>オッズ</th></tr><tr><td>x</td></tr></table>\n' + '\n'.join(tables)
+    return _page('オッズ | BOAT RACE', body, 'UTF-8', rng).encode('utf-8')
+
+
+def make_keirin_result_page(n_riders: int = 9, seed: int = 0) -> bytes:
+    """keirin.netkeiba.comのレース結果ページと同じ構造のHTMLを生成する"""
+    rng = random.Random(seed)
+    header = ['着', '車番', '選手名', '年齢', '府県', '期別', '級班', '着差', '上り', '決まり手', 'S/B', '勝敗因']
+    rows = ['<tr>' + ''.join(f'<th>{h}</th>' for h in header) + '</tr>']
+    for rank in range(1, n_riders + 1):
+        cells = [f'{rank}着', str(rng.randint(1, n_riders)),
+                 f'<a href="/db/profile/?id={rng.randint(10000, 19999)}">選手{rank}</a>\n'
+                 '<span class="fav">お気に入り</span><span>(個人情報)</span>',
+                 str(rng.randint(20, 50)), rng.choice(['東京', '大阪', '福岡']), str(rng.randint(80, 120)),
+                 rng.choice(['S1', 'S2', 'A1']), rng.choice(['', '1/2車輪', '1車身']), f'{rng.uniform(10, 13):.1f}',
+                 rng.choice(['逃げ', '捲り', '差し']), rng.choice(['', 'S', 'B']), '']
+        rows.append('<tr>\n' + ''.join(f'<td>{c}</td>' for c in cells) + '\n</tr>')
+    main = '<table class="RaceResult_Table">' + ''.join(rows) + '</table>'
+    pay_rows = list()
+    for name in ['2枠複', '2枠単', '2車複', '2車単', 'ワイド', '3連複', '3連単']:
+        n = 3 if name == 'ワイド' else 1
+        for j in range(n):
+            head = f'<th rowspan="{n}">{name}</th>' if j == 0 else ''
+            pay_rows.append(
+                f'<tr>{head}<td>{rng.randint(1, 9)}-{rng.randint(1, 9)}</td>'
+                f'<td>{rng.randint(100, 99999):,}円</td><td>{rng.randint(1, 50)}人気</td></tr>')
+    pay = '<table class="Payout_Table">' + ''.join(pay_rows) + '</table>'
+    return _page('競輪 レース結果 | netkeiba.com', main + '\n' + pay, 'UTF-8', rng).encode('utf-8')
+
+
+def make_amedas_station_df(n_stations: int = 1300, seed: int = 0):
+    """AmedasStationScraper.get_all_station_linkがformat_dfに渡すDataFrameを生成する"""
+    import pandas as pd
+    rng = random.Random(seed)
+    rows = list()
+    for i in range(n_stations):
+        prec_no, block_no = rng.randint(11, 99), rng.randint(1000, 99999)
+        kind = rng.choice('as')
+        info = (f"javascript:viewPoint('{kind}','{block_no}','地点{i}','ﾁﾃﾝ','43','3.6','141','46.1',"
+                f"'4.0','1','1','1','1','1','9999','99','99','','','','','')")
+        url = f'index.php?prec_no={prec_no}&block_no={block_no}&year=&month=&day=&view='
+        # 地域全体へのリンクなど、地点でない要素も混ざっている
+        if i % 50 == 0:
+            url, info = f'prefecture.php?prec_no={prec_no}&block_no=&year=', '-'
+        rows.append({'area': f'地域{prec_no}', 'station': f'地点{i}', 'url': url, 'info': info})
+    return pd.DataFrame(rows)[['area', 'station', 'url', 'info']]
@@ -0,0 +1,352 @@
+'''
+各スクレイパーのパース処理のベンチマーク。
+fixtures.pyで生成したHTMLをFixtureTransportから返すので、ネットワークにはアクセスしない。
+ケースごとに1秒あたりのページ数、1行あたりの処理時間、1ページあたりの最大メモリ使用量を計測し、
+baseline.jsonに保存した値と比較する。出力の内容が変わった場合も検出する。
+
+    $ python benchmarks/run_benchmarks.py                    # baseline.jsonと比較する
+    $ python benchmarks/run_benchmarks.py --update-baseline  # baseline.jsonを更新する
+    $ python benchmarks/run_benchmarks.py --only netkeiba.DatabaseScraper --pages 50
+
+処理速度は計測したマシンに依存するので、baselineは同じマシンで作り直してから比較すること。
+--pagesを省略した場合はbaselineを作成したときのページ数で計測する。
+ページ数がbaselineと異なるケースは、出力が変わったかどうかを比較できないので警告だけを表示する。
+性能が劣化した、または出力が変わったケースがある場合は終了コード1で終了する。
+'''
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fixtures  # noqa: E402
+from scraping import boatrace, netkeiba, netkeirin, utils  # noqa: E402
+from scraping.transport import HttpTransport, Page  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+# baselineが無い場合のケースごとのページ数
+DEFAULT_PAGES = 30
+
+
+class FixtureTransport(HttpTransport):
+    '''ネットワークにアクセスせず、URLごとに登録したページを返すHttpTransport'''
+
+    def __init__(self, pages: Dict[str, Page]):
+        super().__init__()
+        self.pages = pages
+
+    def fetch(self, url: str, encoding: str = None, session=None) -> Page:
+        return self.pages[url]
+
+
+@dataclass
+class Case:
+    '''
+    ベンチマークの1ケース。
+    items[i]に対してrun(scraper, items[i])を呼び出し、戻り値を出力として扱う。
+    '''
+    name: str
+    items: List[Any]
+    pages: Dict[str, Page]
+    make: Callable[[HttpTransport], Any]
+    run: Callable[[Any, Any], Any]
+
+
+def _pages(urls: List[str], contents: List[bytes], encoding: str) -> Dict[str, Page]:
+    return {url: Page(url, content, encoding) for url, content in zip(urls, contents)}
+
+
+def case_db_race(n: int) -> Case:
+    race_ids = [202105021201 + i % 12 + (i // 12) * 100 for i in range(n)]
+    urls = [f'https://db.netkeiba.com/race/{race_id}' for race_id in race_ids]
+    contents = [fixtures.make_db_race_page(race_id, n_horses=8 + i % 11, seed=i) for i, race_id in enumerate(race_ids)]
+
+    def run(scraper, race_id):
+        scraper.get_soup(race_id)
+        return [scraper.get_main_df(), scraper.get_race_info(), scraper.get_pay_df(),
+                scraper.get_corner_df(), scraper.get_laptime_df()]
+    return Case('netkeiba.DatabaseScraper', race_ids, _pages(urls, contents, 'EUC-JP'),
+                lambda t: netkeiba.DatabaseScraper(transport=t, partial=True), run)
+
+
+def case_db_race_lxml(n: int) -> Case:
+    case = case_db_race(n)
+    case.name = 'netkeiba.DatabaseScraper[lxml]'
+    case.make = lambda t: netkeiba.DatabaseScraper(transport=t, parser='lxml', partial=True)
+    return case
+
+
+def case_race_id(n: int) -> Case:
+    dates = [datetime.date(2021, 1, 1) + datetime.timedelta(days=i) for i in range(n)]
+    urls = [f'https://db.netkeiba.com/race/list/{d:%Y%m%d}' for d in dates]
+    contents = [fixtures.make_race_list_page(f'{d:%Y%m%d}', n_places=1 + i % 3, seed=i) for i, d in enumerate(dates)]
+    # 出力の順番がsetの順番に依存しないように並べ替える
+    return Case('netkeiba.RaceidScraper.get_raceID_list_from_date', dates, _pages(urls, contents, 'EUC-JP'),
+                lambda t: netkeiba.RaceidScraper(transport=t),
+                lambda scraper, d: sorted(scraper.get_raceID_list_from_date(d)))
+
+
+def case_nar_race_id(n: int) -> Case:
+    dates = [datetime.date(2021, 1, 1) + datetime.timedelta(days=i) for i in range(n)]
+    courses = list(netkeiba.LocalRaceidHttpScraper.RACECOURSE_ID_DICT)
+    urls, contents = list(), list()
+    for i, d in enumerate(dates):
+        for j, course in enumerate(courses):
+            kaisai_id = f'{d.year:04}{course:02}{d.month:02}{d.day:02}'
+            urls.append(netkeiba.LocalRaceidHttpScraper.RACE_LIST_URL.format(kaisai_id, f'{d:%Y%m%d}'))
+            # 開催があるのは3場に1場程度
+            n_races = 8 + (i + j) % 5 if (i + j) % 3 == 0 else 0
+            contents.append(fixtures.make_nar_race_list_page(kaisai_id, n_races=n_races, seed=i * 100 + j))
+    return Case('netkeiba.LocalRaceidHttpScraper.get_raceID_list_from_date', dates, _pages(urls, contents, 'EUC-JP'),
+                lambda t: netkeiba.LocalRaceidHttpScraper(transport=t),
+                lambda scraper, d: scraper.get_raceID_list_from_date(d))
+
+
+def case_odds_api(n: int) -> Case:
+    race_ids = [202105021201 + i % 12 + (i // 12) * 100 for i in range(n)]
+    urls, contents = list(), list()
+    for i, race_id in enumerate(race_ids):
+        for odds_type in (1, 4, 5, 6, 7, 8):
+            urls.append(f'{netkeiba.OddsApiScraper.API_URL}?race_id={race_id}&type={odds_type}&action=init')
+            contents.append(fixtures.make_odds_api_payload(str(race_id), odds_type, n_horses=8 + i % 11, seed=i))
+    return Case('netkeiba.OddsApiScraper', race_ids, _pages(urls, contents, 'utf-8'),
+                lambda t: netkeiba.OddsApiScraper(transport=t),
+                lambda scraper, race_id: scraper.get_odds_df_dict(race_id))
+
+
+def case_horse_results(n: int) -> Case:
+    horse_ids = [str(2018100000 + i) for i in range(n)]
+    urls = [f'https://db.netkeiba.com/horse/{horse_id}' for horse_id in horse_ids]
+    contents = [fixtures.make_horse_page(horse_id, n_races=5 + i % 30, seed=i) for i, horse_id in enumerate(horse_ids)]
+    return Case('netkeiba.HorseResultsScraper', horse_ids, _pages(urls, contents, 'EUC-JP'),
+                lambda t: netkeiba.HorseResultsScraper(transport=t),
+                lambda scraper, horse_id: scraper.get_horseresults(horse_id))
+
+
+def case_horse_profile(n: int) -> Case:
+    horse_ids = [str(2018100000 + i) for i in range(n)]
+    urls = [f'https://db.netkeiba.com/horse/{horse_id}/' for horse_id in horse_ids]
+    contents = [fixtures.make_horse_page(horse_id, n_races=5 + i % 30, seed=i) for i, horse_id in enumerate(horse_ids)]
+
+    def run(scraper, horse_id):
+        profile = scraper.get_profile(horse_id)
+        return [{k: v for k, v in vars(profile).items() if k != 'results'}, profile.results]
+    return Case('netkeiba.HorseDataScraper.get_profile', horse_ids, _pages(urls, contents, 'EUC-JP'),
+                lambda t: netkeiba.HorseDataScraper(transport=t), run)
+
+
+def case_peds(n: int) -> Case:
+    horse_ids = [str(2018100000 + i) for i in range(n)]
+    urls = [f'https://db.netkeiba.com/horse/ped/{horse_id}' for horse_id in horse_ids]
+    contents = [fixtures.make_ped_page(horse_id, seed=i) for i, horse_id in enumerate(horse_ids)]
+    return Case('netkeiba.HorseDataScraper.get_peds', horse_ids, _pages(urls, contents, 'EUC-JP'),
+                lambda t: netkeiba.HorseDataScraper(transport=t),
+                lambda scraper, horse_id: scraper.get_peds(horse_id))
+
+
+def case_umabashira(n: int) -> Case:
+    race_ids = [str(202105021201 + i) for i in range(n)]
+    urls = [f'http://jiro8.sakura.ne.jp/index.php?code={race_id[2:]}' for race_id in race_ids]
+    contents = [fixtures.make_umabashira_page(race_id, n_horses=8 + i % 11, seed=i) for i, race_id in enumerate(race_ids)]
+    return Case('netkeiba.UmabashiraLimitedScraper', race_ids, _pages(urls, contents, 'cp932'),
+                lambda t: netkeiba.UmabashiraLimitedScraper(transport=t),
+                lambda scraper, race_id: scraper.get_umabashira(race_id))
+
+
+def _boatrace_items(n: int) -> List[tuple]:
+    return [(i % 12 + 1, f'{i // 12 % 24 + 1:02}', '20210530') for i in range(n)]
+
+
+def case_boatrace_result(n: int) -> Case:
+    items = _boatrace_items(n)
+    url = 'https://www.boatrace.jp/owpc/pc/race/raceresult?rno={}&jcd={}&hd={}'
+    urls = [url.format(*item) for item in items]
+    contents = [fixtures.make_boatrace_result_page(seed=i) for i in range(n)]
+    return Case('boatrace.ResultScraper', items, _pages(urls, contents, 'utf-8'),
+                lambda t: boatrace.ResultScraper(transport=t),
+                lambda scraper, item: list(scraper.get_result(*item)))
+
+
+def case_boatrace_odds(n: int) -> Case:
+    items = _boatrace_items(n)
+    url = 'https://www.boatrace.jp/owpc/pc/race/{}?rno={}&jcd={}&hd={}'
+    pages = dict()
+    for i, item in enumerate(items):
+        for kind in ['oddstf', 'odds3t', 'odds3f', 'odds2tf']:
+            u = url.format(kind, *item)
+            pages[u] = Page(u, fixtures.make_boatrace_odds_page(kind, seed=i), 'utf-8')
+
+    def run(scraper, item):
+        return [scraper.get_tansho_table(*item), scraper.get_rentan3_table(*item),
+                scraper.get_renfuku3_table(*item), *scraper.get_rentanfuku2_table(*item)]
+    return Case('boatrace.OddsScraper', items, pages, lambda t: boatrace.OddsScraper(transport=t), run)
+
+
+def case_keirin(n: int) -> Case:
+    race_ids = [str(2021053022010001 + i) for i in range(n)]
+    urls = [f'https://keirin.netkeiba.com/db/result/?race_id={race_id}' for race_id in race_ids]
+    contents = [fixtures.make_keirin_result_page(n_riders=7 + i % 3, seed=i) for i in range(n)]
+
+    def run(scraper, race_id):
+        scraper.get_soup(race_id)
+        return [scraper.get_main_table(), scraper.get_prize_table()]
+    return Case('netkeirin.DatabaseScraper', race_ids, _pages(urls, contents, 'utf-8'),
+                lambda t: netkeirin.DatabaseScraper(transport=t), run)
+
+
+def case_amedas(n: int) -> Case:
+    url = ('https://www.data.jma.go.jp/obd/stats/etrn/select/prefecture00.php'
+           '?prec_no=&block_no=&year=&month=&day=&view=')
+    # コンストラクタで取得するページ。format_dfの計測には使わない
+    pages = {url: Page(url, b'<html><body><map></map></body></html>', 'utf-8')}
+    dfs = [fixtures.make_amedas_station_df(seed=i) for i in range(n)]
+    return Case('utils.AmedasStationScraper.format_df', list(range(n)), pages,
+                lambda t: utils.AmedasStationScraper(transport=t),
+                lambda scraper, i: scraper.format_df(dfs[i].copy()))
+
+
+CASES = [case_db_race, case_db_race_lxml, case_race_id, case_nar_race_id, case_odds_api,
+         case_horse_results, case_horse_profile, case_peds,
+         case_umabashira, case_boatrace_result, case_boatrace_odds, case_keirin, case_amedas]
+
+
+def count_rows(result) -> int:
+    if isinstance(result, pd.DataFrame):
+        return len(result)
+    if isinstance(result, (list, tuple)):
+        if all(not isinstance(r, (pd.DataFrame, list, tuple, dict)) for r in result):
+            return len(result)
+        return sum(count_rows(r) for r in result)
+    return 1
+
+
+def digest(results: List[Any]) -> str:
+    """出力の内容から作ったハッシュ。baselineと比較して出力が変わっていないことを確認する。"""
+    h = hashlib.sha256()
+
+    def update(obj):
+        if isinstance(obj, pd.DataFrame):
+            h.update(obj.to_csv().encode('utf-8'))
+        elif isinstance(obj, (list, tuple)):
+            for o in obj:
+                update(o)
+        elif isinstance(obj, dict):
+            h.update(json.dumps(obj, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8'))
+        else:
+            h.update(repr(obj).encode('utf-8'))
+    update(results)
+    return h.hexdigest()[:16]
+
+
+def measure(case: Case, repeat: int = 3) -> dict:
+    scraper = case.make(FixtureTransport(case.pages))
+    results = [case.run(scraper, item) for item in case.items]
+    rows = sum(count_rows(r) for r in results)
+    # 最も速かった回を採用する
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in case.items:
+            case.run(scraper, item)
+        best = min(best, time.perf_counter() - start)
+    # 1ページあたりの最大メモリ使用量
+    peak = 0
+    for item in case.items[:3]:
+        tracemalloc.start()
+        case.run(scraper, item)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return {
+        'pages': len(case.items),
+        'rows': rows,
+        'pages_per_sec': len(case.items) / best,
+        'us_per_row': best / max(rows, 1) * 1e6,
+        'peak_kib': peak / 1024,
+        'digest': digest(results),
+    }
+
+
+def compare(name: str, current: dict, baseline: dict, tolerance: float) -> List[str]:
+    """baselineと比べて問題がある点のリストを返す"""
+    if baseline is None:
+        return list()
+    problems = list()
+    if current['pages'] != baseline['pages']:
+        # 入力が違うので出力のハッシュは比較できない
+        print(f"warning: {name} was measured with {current['pages']} pages but the baseline with "
+              f"{baseline['pages']} pages; skipping the output check", file=sys.stderr)
+    elif current['digest'] != baseline['digest']:
+        problems.append('output changed')
+    if current['pages_per_sec'] < baseline['pages_per_sec'] * (1 - tolerance):
+        problems.append(f"pages/sec {baseline['pages_per_sec']:.1f} -> {current['pages_per_sec']:.1f}")
+    if current['peak_kib'] > baseline['peak_kib'] * (1 + tolerance):
+        problems.append(f"peak {baseline['peak_kib']:.0f} -> {current['peak_kib']:.0f} KiB")
+    return problems
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=None,
+                        help='ケースごとのページ数。省略した場合はbaselineと同じページ数')
+    parser.add_argument('--repeat', type=int, default=3, help='計測を繰り返す回数')
+    parser.add_argument('--only', action='append', help='指定した名前を含むケースだけを実行する')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='劣化とみなす割合')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--update-baseline', action='store_true')
+    args = parser.parse_args(argv)
+
+    baseline = dict()
+    baseline_pages = DEFAULT_PAGES
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            data = json.load(f)
+        baseline = data.get('cases', dict())
+        baseline_pages = data.get('pages', DEFAULT_PAGES)
+    if args.pages is None:
+        args.pages = baseline_pages
+
+    print(f"{'case':<50} {'pages/s':>9} {'us/row':>9} {'peak KiB':>9}  status")
+    results = dict()
+    failed = False
+    for make_case in CASES:
+        case = make_case(args.pages)
+        if args.only and not any(name in case.name for name in args.only):
+            continue
+        try:
+            current = measure(case, args.repeat)
+        except Exception as e:
+            # 依存パッケージが無い場合なども、他のケースは続けて計測する
+            failed = True
+            print(f"{case.name:<50} {'-':>9} {'-':>9} {'-':>9}  error: {type(e).__name__}: {e}")
+            continue
+        results[case.name] = current
+        problems = compare(case.name, current, baseline.get(case.name), args.tolerance)
+        failed |= bool(problems)
+        status = 'new' if case.name not in baseline else ('; '.join(problems) or 'ok')
+        print(f"{case.name:<50} {current['pages_per_sec']:>9.1f} {current['us_per_row']:>9.1f} "
+              f"{current['peak_kib']:>9.0f}  {status}")
+
+    if args.update_baseline:
+        data = {'machine': platform.platform(), 'python': platform.python_version(),
+                'pandas': pd.__version__, 'pages': args.pages, 'cases': dict(baseline, **results)}
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+            f.write('\n')
+        print(f'baseline saved to {args.baseline}')
+        return 0
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,131 @@
+import asyncio
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List
+from urllib.parse import urlsplit
+
+import requests
+
+from .transport import HttpTransport, Page, get_default_transport
+
+
+class AsyncFetcher(object):
+    '''
+    HttpTransportをスレッドプール上で動かし、asyncioから並行にページを取得するクラス。
+    ホストごとに同時リクエスト数の上限を設けて、サイトに負荷をかけすぎないようにする。
+
+    Examples
+    ----------
+    >>> fetcher = AsyncFetcher(max_per_host=16)
+    >>> pages = run_sync(fetcher.gather(urls, encoding='EUC-JP'))
+    '''
+
+    def __init__(self, transport: HttpTransport = None, max_per_host: int = 8,
+                 max_workers: int = 32, host_limits: Dict[str, int] = None):
+        """
+        Parameters
+        ----------
+        transport : HttpTransport, default None
+            指定しない場合は全スクレイパーで共有しているものを利用する
+        max_per_host : int, default 8
+            1ホストあたりの同時リクエスト数の上限
+        max_workers : int, default 32
+            全ホスト合計の同時リクエスト数の上限
+        host_limits : Dict[str, int], default None
+            ホストごとに同時リクエスト数の上限を個別に指定する場合に利用する
+        """
+        self._transport = get_default_transport() if transport is None else transport
+        self.max_per_host = max_per_host
+        self.max_workers = max_workers
+        self.host_limits = dict() if host_limits is None else dict(host_limits)
+        self._executor = None
+        self._lock = threading.Lock()
+        # セマフォはイベントループごとに作り直す必要がある
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    @property
+    def transport(self) -> HttpTransport:
+        transport = self._transport
+        if isinstance(transport, weakref.ReferenceType):
+            # get_fetcherが作ったものは、HttpTransportを弱参照で保持している
+            transport = transport()
+            if transport is None:
+                raise RuntimeError('HttpTransport has already been garbage collected')
+        return transport
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix='AsyncFetcher')
+            return self._executor
+
+    def set_host_limit(self, host: str, limit: int) -> None:
+        with self._lock:
+            self.host_limits[host] = limit
+            for semaphores in self._semaphores.values():
+                semaphores.pop(host, None)
+
+    def _get_semaphore(self, host: str) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            semaphores = self._semaphores.setdefault(loop, dict())
+            if host not in semaphores:
+                limit = self.host_limits.get(host, self.max_per_host)
+                semaphores[host] = asyncio.Semaphore(limit)
+            return semaphores[host]
+
+    async def fetch(self, url: str, encoding: str = None, session: requests.Session = None) -> Page:
+        """`HttpTransport.fetch`の非同期版"""
+        semaphore = self._get_semaphore(urlsplit(url).hostname or '')
+        async with semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self.executor, self.transport.fetch, url, encoding, session)
+
+    async def gather(self, urls: Iterable[str], encoding: str = None,
+                     session: requests.Session = None, return_exceptions: bool = False) -> List[Page]:
+        """複数のページを並行に取得し、入力と同じ順番で返す"""
+        return await asyncio.gather(
+            *[self.fetch(url, encoding=encoding, session=session) for url in urls],
+            return_exceptions=return_exceptions)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+
+_fetchers = weakref.WeakKeyDictionary()
+_fetchers_lock = threading.Lock()
+
+
+def get_fetcher(transport: HttpTransport = None) -> AsyncFetcher:
+    '''HttpTransportごとに共有されるAsyncFetcherを返す'''
+    transport = get_default_transport() if transport is None else transport
+    with _fetchers_lock:
+        fetcher = _fetchers.get(transport)
+        if fetcher is None:
+            fetcher = AsyncFetcher(transport)
+            # 値から鍵を強参照すると辞書の項目が回収されないので、弱参照に置き換える
+            fetcher._transport = weakref.ref(transport)
+            # HttpTransportが回収されたら、スレッドプールも止める
+            weakref.finalize(transport, fetcher.close)
+            _fetchers[transport] = fetcher
+        return fetcher
+
+
+def run_sync(coro):
+    '''
+    コルーチンを同期的に実行する。
+    Jupyterなど既にイベントループが動いている環境では別スレッドで実行する。
+    '''
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coro).result()
@@ -1,21 +1,131 @@
+import asyncio
 from abc import ABC
-from typing import List
+from typing import List, Tuple
+from urllib.parse import urlsplit
 
-import requests
 from bs4 import BeautifulSoup
-from selenium.webdriver import Chrome, ChromeOptions
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.common.by import By
 from selenium.webdriver.support.expected_conditions import (
     visibility_of_all_elements_located, visibility_of_element_located)
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support.select import Select
+from selenium.webdriver.remote.webdriver import WebDriver
 from selenium.webdriver.remote.webelement import WebElement
 
+from .async_fetch import AsyncFetcher, get_fetcher
+from .driver_pool import new_chrome_driver
+from .fragment import extract_fragments
+from .ratelimit import RateLimiter
+from .table import NA_VALUES
+from .transport import HttpTransport, Page, get_default_transport
+
+# _get_tablesでブラウザの中で実行するJavaScript。rootの中の全てのtableを[見出しの行, 行のリスト]の配列にする。
+# pd.read_htmlと同じ規則で、display:noneの要素を除き、空白を整理し、colspan, rowspanを展開する
+_TABLES_JS = r'''
+if (!root) { return null; }
+const na = new Set(arguments[1]);
+const hidden = (el) => /display:\s*none/.test(el.getAttribute('style') || '');
+const text = (node) => {
+  if (node.nodeType === 3) { return node.nodeValue; }
+  if (node.nodeType !== 1 || node.tagName === 'STYLE' || hidden(node)) { return ''; }
+  if (node.tagName === 'BR') { return '\n'; }
+  let s = '';
+  for (const child of node.childNodes) { s += text(child); }
+  return s;
+};
+const clean = (cell) => text(cell).trim().replace(/[\r\n]+|\s{2,}/g, ' ');
+const parse = (cell) => {
+  const t = clean(cell);
+  if (na.has(t)) { return null; }
+  const n = t.replace(/,/g, '');
+  return /^[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?$/.test(n) ? Number(n) : t;
+};
+const tagged = (el, names) => Array.from(el.children).filter((c) => names.includes(c.tagName));
+const expand = (rows, value, remainder, overflow) => {
+  const all = [];
+  for (const tr of rows) {
+    const texts = [];
+    const next = [];
+    let index = 0;
+    for (const td of tagged(tr, ['TD', 'TH'])) {
+      while (remainder.length && remainder[0][0] <= index) {
+        const [i, v, span] = remainder.shift();
+        texts.push(v);
+        if (span > 1) { next.push([i, v, span - 1]); }
+        index++;
+      }
+      const v = value(td);
+      const rowspan = parseInt(td.getAttribute('rowspan') || '1');
+      const colspan = parseInt(td.getAttribute('colspan') || '1');
+      for (let k = 0; k < colspan; k++) {
+        texts.push(v);
+        if (rowspan > 1) { next.push([index, v, rowspan - 1]); }
+        index++;
+      }
+    }
+    for (const [i, v, span] of remainder) {
+      texts.push(v);
+      if (span > 1) { next.push([i, v, span - 1]); }
+    }
+    all.push(texts);
+    remainder = next;
+  }
+  while (!overflow && remainder.length) {
+    all.push(remainder.map((r) => r[1]));
+    remainder = remainder.filter((r) => r[2] > 1).map((r) => [r[0], r[1], r[2] - 1]);
+  }
+  return [all, remainder];
+};
+const tables = [];
+const walk = (el, visible) => {
+  visible = visible && !hidden(el);
+  if (el.tagName === 'TABLE' && visible) { tables.push(el); }
+  for (const child of el.children) { walk(child, visible); }
+};
+walk(root, true);
+return tables.map((table) => {
+  const head = [];
+  const body = [];
+  const foot = [];
+  for (const section of tagged(table, ['THEAD', 'TBODY', 'TFOOT', 'TR'])) {
+    if (section.tagName === 'TR') { body.push(section); continue; }
+    const rows = tagged(section, ['TR']);
+    ({THEAD: head, TBODY: body, TFOOT: foot})[section.tagName].push(...rows);
+  }
+  while (!head.length && body.length && tagged(body[0], ['TD', 'TH']).every((c) => c.tagName === 'TH')) {
+    head.push(body.shift());
+  }
+  const [header, rem] = expand(head, clean, [], true);
+  const [rows, rest] = expand(body, parse, rem, foot.length > 0);
+  rows.push(...expand(foot, parse, rest, false)[0]);
+  const width = Math.max(0, ...header.map((r) => r.length), ...rows.map((r) => r.length));
+  const columns = header.length ? header[header.length - 1] : [];
+  while (header.length && columns.length < width) { columns.push(''); }
+  for (const row of rows) { while (row.length < width) { row.push(null); } }
+  return [columns, rows];
+});
+'''
+_NA_VALUES = sorted(NA_VALUES)
+
+
 class SeleniumScraperBase(ABC):
     '''
     動的なサイトをスクレイピングする場合は、このクラスを継承。
     '''
 
-    def __init__(self, executable_path: str, visible : bool = False, wait_time: float = 10):
+    # _fingerprintで要素を探すJavaScriptの式。arguments[0]に検索する文字列が入る
+    _LOCATE_JS = {
+        By.ID: 'document.getElementById(arguments[0])',
+        By.CLASS_NAME: 'document.getElementsByClassName(arguments[0])[0]',
+        By.TAG_NAME: 'document.getElementsByTagName(arguments[0])[0]',
+        By.CSS_SELECTOR: 'document.querySelector(arguments[0])',
+        By.XPATH: 'document.evaluate(arguments[0], document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null)'
+                  '.singleNodeValue',
+    }
+
+    def __init__(self, executable_path: str = None, visible : bool = False, wait_time: float = 10,
+                 rate_limiter: RateLimiter = None, driver: WebDriver = None):
         """
         Parameters
         ----------
@@ -25,30 +135,115 @@ class SeleniumScraperBase(ABC):
             ブラウザを起動して動作させるかのフラグ
         wait_time : float, default 10
             タイムアウトまでの時間
+        rate_limiter : RateLimiter, default None
+            ページ遷移の前に参照するレート制限。
+            指定しない場合は全スクレイパーで共有しているHttpTransportのものを利用する。
+        driver : WebDriver, default None
+            DriverPoolから借りたブラウザなど、起動済みのブラウザを使う場合に指定する。
+            指定したブラウザは、このクラスでは閉じない。
         """
-        self.option = ChromeOptions()
-        if not visible:
-            self.option.add_argument('--headless')
-        self.option.add_experimental_option(
-            'excludeSwitches', ['enable-logging'])
-        self.option.use_chromium = True
-        self.driver = Chrome(
-            executable_path=executable_path, options=self.option)
-        self.driver.implicitly_wait(wait_time)
+        self.rate_limiter = get_default_transport().rate_limiter if rate_limiter is None else rate_limiter
+        self._own_driver = driver is None
+        if driver is None:
+            driver = new_chrome_driver(executable_path, visible, wait_time)
+        self.driver = driver
+        self.wait_time = wait_time
         self.wait = WebDriverWait(self.driver, wait_time)
 
     def __del__(self):
-        self.driver.close()
+        if getattr(self, '_own_driver', False):
+            self.driver.close()
 
     def _visit_page(self, url) -> None:
+        self.rate_limiter.acquire(url)
         self.driver.get(url)
 
     def _get_element(self, by, text) -> WebElement:
         return self.wait.until(visibility_of_element_located((by, text)))
 
+    def _fingerprint(self, by, text) -> str:
+        """要素の内容(outerHTML)から作った指紋。要素が無い場合はNone。
+        find_elementsと異なり、要素が無くても暗黙の待機時間だけ待たされることはない。
+        """
+        locate = self._LOCATE_JS.get(by)
+        if locate is None:
+            raise ValueError(f'unsupported locator: {by}')
+        return self.driver.execute_script(
+            f'const el = {locate}; if (!el) {{ return null; }}'
+            'const s = el.outerHTML; let h = 0;'
+            'for (let i = 0; i < s.length; i++) { h = (Math.imul(h, 31) + s.charCodeAt(i)) | 0; }'
+            "return s.length + ':' + h;", text)
+
+    def _wait_for_rerender(self, by, text, previous: str, timeout: float = None, poll_interval: float = 0.05,
+                           required: bool = False) -> str:
+        """要素の内容がpreviousから変わり、描画が落ち着くまで待つ。
+        クリックやプルダウンの選択の直前に_fingerprintで指紋を取っておき、操作の後に呼び出す。
+        指紋が前回と異なり、かつ連続する2回の確認で同じになった時点で描画が終わったとみなす。
+
+        Parameters
+        ----------
+        by, text
+            _get_elementと同じ、対象の要素の指定方法
+        previous : str
+            操作の前の_fingerprintの値。要素が無かった場合はNone。
+        timeout : float, default None
+            待機時間の上限[秒]。Noneの場合はwait_time。
+            同じ内容が再描画された場合など、上限まで変化しなければその時点の内容を使う。
+        poll_interval : float, default 0.05
+            確認する間隔[秒]
+        required : bool, default False
+            Trueの場合は、上限まで変化しなければTimeoutExceptionを送出する。
+            軸馬を選び直した場合など、内容が必ず変わる操作の後に指定し、古い表を読まないようにする。
+
+        Returns
+        -------
+        str
+            描画後の指紋
+        """
+        last = [previous]
+
+        def rerendered(driver):
+            current = self._fingerprint(by, text)
+            settled = current is not None and current != previous and current == last[0]
+            last[0] = current
+            return current if settled else False
+        try:
+            return WebDriverWait(
+                self.driver, self.wait_time if timeout is None else timeout, poll_frequency=poll_interval
+            ).until(rerendered)
+        except TimeoutException:
+            if required:
+                raise TimeoutException(f'{by}={text!r} was not re-rendered within the timeout')
+            return last[0]
+
     def _get_elements(self, by, text) -> List[WebElement]:
         return self.wait.until(visibility_of_all_elements_located((by, text)))
 
+    def _get_tables(self, by, text) -> List[Tuple[List[str], List[list]]]:
+        """要素(とその中)の全てのtableを、ブラウザの中で見出しとセルの値の配列にして、1回のやり取りで取得する。
+        `pd.read_html(element.get_attribute('outerHTML'))`と同じ規則で見出しの行やcolspan, rowspanを扱うが、
+        HTMLを文字列にして送り、DataFrameに読み直す処理が無い。
+        要素がまだ無い場合や、要素はあるが表がまだ描画されていない場合は、表が1つ以上現れるまでwait_timeだけ待つ。
+
+        Returns
+        -------
+        List[Tuple[List[str], List[list]]]
+            表ごとの(見出しの文字列のリスト, 行ごとのセルの値のリスト)。
+            見出しが複数行の場合は最後の行で、見出しが無い表は空のリスト。
+            セルの値は、数値として読めるものは数値、欠損値とみなされる文字列はNone、それ以外は文字列とする。
+        """
+        locate = self._LOCATE_JS.get(by)
+        if locate is None:
+            raise ValueError(f'unsupported locator: {by}')
+        script = f'const root = {locate};' + _TABLES_JS
+
+        def extracted(driver):
+            # 要素が無い場合はNone、表が無い場合は空のリストが返るので、どちらも待ち続ける
+            tables = driver.execute_script(script, text, _NA_VALUES)
+            return tables if tables else False
+        tables = self.wait.until(extracted)
+        return [(columns, rows) for columns, rows in tables]
+
     def _click(self, element) -> None:
         self.driver.execute_script("arguments[0].scrollIntoView(false);", element)
         element.click()
@@ -62,7 +257,11 @@ class SoupScraperBase(ABC):
     '''
     静的なサイトをスクレイピングする場合は、このクラスを継承。
     '''
-    def __init__(self, login_url: str = None, login_info: dict = None):
+    # (タグ名, 属性名, 属性値)のリスト。指定した場合は一致する要素だけをパースする
+    PARSE_TARGETS = None
+
+    def __init__(self, login_url: str = None, login_info: dict = None, transport: HttpTransport = None,
+                 parser: str = "html.parser"):
         """
         Parameters
         ----------
@@ -70,22 +269,56 @@ class SoupScraperBase(ABC):
             _description_, by default None
         login_info : dict, optional
             _description_, by default None
+        transport : HttpTransport, optional
+            ページの取得に利用するHttpTransport。
+            指定しない場合は全スクレイパーで共有しているものを利用する。
+        parser : str, default "html.parser"
+            BeautifulSoupで利用するパーサ。"lxml"を指定すると高速になる。
         """
+        self.transport = get_default_transport() if transport is None else transport
+        self.parser = parser
+        self.parse_targets = self.PARSE_TARGETS
         self.login = False
+        self.session = None
         if (login_info is not None) and (login_url is not None):
             self.login = True
-            self.session = requests.session()
+            self.session = self.transport.new_session()
             self.session.post(login_url, data=login_info)
 
+    @property
+    def fetcher(self) -> AsyncFetcher:
+        """並行取得に利用するAsyncFetcher。同じtransportを使うスクレイパー間で共有される。"""
+        return get_fetcher(self.transport)
+
     def _get_soup(self, url: str, encoding: str = None):
-        if self.login:
-            html = self.session.get(url)
-        else:
-            html = requests.get(url)
-        if encoding is not None:
-            html.encoding = encoding
+        html = self.transport.fetch(url, encoding=encoding, session=self.session)
+        return self._make_soup(html)
+
+    async def _aget_soup(self, url: str, encoding: str = None):
+        """`_get_soup`の非同期版"""
+        html = await self.fetcher.fetch(url, encoding=encoding, session=self.session)
+        return self._make_soup(html)
+
+    async def _agather_soups(self, urls: List[str], encoding: str = None, return_exceptions: bool = False):
+        """複数のページを並行に取得し、入力と同じ順番でBeautifulSoupのリストを返す"""
+        return await asyncio.gather(
+            *[self._aget_soup(url, encoding=encoding) for url in urls],
+            return_exceptions=return_exceptions)
+
+    def _request_interval(self, interval: float, *urls: str):
+        """withの間だけ、urlsのホストに対するリクエスト間隔の下限をintervalにする。従来のsleep_time引数との互換用。
+        共有しているtransportのレート制限は、終了後に元に戻る。
+        """
+        return self.transport.rate_limiter.override_interval([urlsplit(url).hostname for url in urls], interval)
+
+    def _make_soup(self, html: Page) -> BeautifulSoup:
         content = html.content if self.login else html.text
-        soup = BeautifulSoup(content, "html.parser")
+        if self.parse_targets is not None:
+            # 必要な要素だけを切り出してパースする。見つからない場合はページ全体をパースする
+            fragments = extract_fragments(html.text, self.parse_targets)
+            if len(fragments) > 0:
+                content = '\n'.join(fragments)
+        soup = BeautifulSoup(content, self.parser)
         return soup
 
     def _get_element(self, soup: BeautifulSoup, tag: str, by: str = None, text: str = None) -> BeautifulSoup:
@@ -1,17 +1,17 @@
 import datetime
 import re
-import time
 
 import pandas as pd
 from dateutil import relativedelta
 from tqdm import tqdm
 
 from .base import SoupScraperBase
+from .transport import HttpTransport, get_default_transport
 
 
 class BoarRaceSoupScraperBase(SoupScraperBase):
-    def __init__(self, base_url):
-        super().__init__()
+    def __init__(self, base_url, transport: HttpTransport = None):
+        super().__init__(transport=transport)
         self.base_url = base_url
         self.soup = None
 
@@ -24,8 +24,9 @@ class BoarRaceSoupScraperBase(SoupScraperBase):
 
 
 class JcdScraper(BoarRaceSoupScraperBase):
-    def __init__(self):
-        super().__init__('https://www.boatrace.jp/owpc/pc/race/index?jcd=01&hd={}')
+    def __init__(self, transport: HttpTransport = None):
+        super().__init__(
+            'https://www.boatrace.jp/owpc/pc/race/index?jcd=01&hd={}', transport=transport)
 
     def get_Jcd_list_from_date(self, today: datetime.date) -> list:
         date = f'{today.year:04}{today.month:02}{today.day:02}'
@@ -43,25 +44,26 @@ class JcdScraper(BoarRaceSoupScraperBase):
             jcd_list.append({'date': date, 'jcd': jcd})
         return jcd_list
 
-    def get_monthly_Jcd_list(self, year, month, sleep_time, leave=True) -> list:
-        today = datetime.date(year, month, 1)
-        jcd_dict_list = list()
-        for _ in tqdm(range(31), leave=leave):
-            jcd_list = self.get_Jcd_list_from_date(today)
-            if jcd_list is None:
-                continue
-            jcd_dict_list += jcd_list
-            today = today + relativedelta.relativedelta(days=1)
-            time.sleep(sleep_time)
+    def get_monthly_Jcd_list(self, year, month, sleep_time=1, leave=True) -> list:
+        with self._request_interval(sleep_time, self.base_url):
+            today = datetime.date(year, month, 1)
+            jcd_dict_list = list()
+            for _ in tqdm(range(31), leave=leave):
+                jcd_list = self.get_Jcd_list_from_date(today)
+                if jcd_list is None:
+                    continue
+                jcd_dict_list += jcd_list
+                today = today + relativedelta.relativedelta(days=1)
         return jcd_dict_list
 
 
 class ResultScraper(object):
-    def __init__(self):
+    def __init__(self, transport: HttpTransport = None):
+        self.transport = get_default_transport() if transport is None else transport
         self.base_url = 'https://www.boatrace.jp/owpc/pc/race/raceresult?rno={}&jcd={}&hd={}'
 
     def get_result(self, race_number, jcd, hold_date):
-        tables = pd.read_html(self.base_url.format(race_number, jcd, hold_date))
+        tables = self.transport.read_html(self.base_url.format(race_number, jcd, hold_date))
         if len(tables)==0:
             return None
         result_df = self._reshape_result_df(tables[1])
@@ -82,7 +84,8 @@ class ResultScraper(object):
 
 
 class OddsScraper(object):
-    def __init__(self):
+    def __init__(self, transport: HttpTransport = None):
+        self.transport = get_default_transport() if transport is None else transport
         self.base_url = 'https://www.boatrace.jp/owpc/pc/race/{}?rno={}&jcd={}&hd={}'
         self.race_type_dict = {
             '単勝': 'oddstf', '複勝': 'oddstf',
@@ -93,7 +96,7 @@ class OddsScraper(object):
     def get_tansho_table(self, race_number, jcd, date):
         url = self.base_url.format(
             self.race_type_dict['単勝'], race_number, jcd, date)
-        tables = pd.read_html(url)
+        tables = self.transport.read_html(url)
         if len(tables)==0:
             return None
         df = tables[1].rename(columns={'Unnamed: 0': 'First', '単勝オッズ': 'Odds'})
@@ -102,7 +105,7 @@ class OddsScraper(object):
     def get_rentan3_table(self, race_number, jcd, date):
         url = self.base_url.format(
             self.race_type_dict['3連単'], race_number, jcd, date)
-        tables = pd.read_html(url)
+        tables = self.transport.read_html(url)
         if len(tables)==0:
             return None
         return self._reshape_ren_table(tables[1], 3)
@@ -110,7 +113,7 @@ class OddsScraper(object):
     def get_renfuku3_table(self, race_number, jcd, date):
         url = self.base_url.format(
             self.race_type_dict['3連複'], race_number, jcd, date)
-        tables = pd.read_html(url)
+        tables = self.transport.read_html(url)
         if len(tables)==0:
             return None
         df = self._reshape_ren_table(tables[1], 3)
@@ -119,7 +122,7 @@ class OddsScraper(object):
     def get_rentanfuku2_table(self, race_number, jcd, date):
         url = self.base_url.format(
             self.race_type_dict['2連単'], race_number, jcd, date)
-        tables = pd.read_html(url)
+        tables = self.transport.read_html(url)
         if len(tables)==0:
             return (None, None)
         rentan2_df = self._reshape_ren_table(tables[1], 2)
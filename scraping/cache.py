@@ -0,0 +1,226 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from typing import List, Tuple
+
+from .transport import Page
+
+
+class CacheMiss(KeyError):
+    '''リプレイモードでキャッシュに存在しないページを要求した場合に発生する例外'''
+
+
+class PageCache(object):
+    '''
+    取得したページを圧縮してディスクに保存するキャッシュ。
+    URLとエンコーディングから作ったハッシュをキーとし、URLの種類ごとに有効期限を設定できる。
+    合計サイズが上限を超えた場合は、最後に参照された時刻が古いものから削除する。
+
+    Examples
+    ----------
+    >>> cache = PageCache('~/.cache/scraping', max_bytes=4 * 1024 ** 3)
+    >>> set_default_transport(HttpTransport(cache=cache))
+    >>> # ネットワークに一切アクセスせず、キャッシュだけでパーサを動かす場合
+    >>> cache.replay = True
+    '''
+    DAY = 24 * 60 * 60
+    # (URLの正規表現, 有効期限[秒])。Noneは期限なし。先にマッチしたものを採用する。
+    DEFAULT_TTL_RULES = [
+        # 確定したレース結果のページは変化しない
+        (r'^https?://db\.netkeiba\.com/race/\d{12}', None),
+        (r'^https?://db\.netkeiba\.com/race/list/', 7 * DAY),
+        (r'^https?://db\.netkeiba\.com/horse/ped/', 30 * DAY),
+        (r'^https?://db\.netkeiba\.com/horse/', DAY),
+        (r'^https?://keirin\.netkeiba\.com/db/result/', None),
+        (r'^https?://www\.boatrace\.jp/owpc/pc/race/raceresult', None),
+        (r'^https?://www\.boatrace\.jp/owpc/pc/race/odds', 60),
+        (r'^https?://race\.netkeiba\.com/api/api_get_jra_odds', 60),
+        (r'^https?://www\.data\.jma\.go\.jp/obd/stats/etrn/view/', 30 * DAY),
+        (r'^https?://jiro8\.sakura\.ne\.jp/', 60 * 60),
+    ]
+    # (URLの正規表現, ページに含まれるべきバイト列)。含まれないページは保存しない。
+    # 結果が確定する前のレースのページを、期限なしで保存してしまわないようにする
+    DEFAULT_REQUIRED_MARKERS = [
+        (r'^https?://db\.netkeiba\.com/race/\d{12}', b'race_table_01'),
+    ]
+
+    def __init__(self, directory: str, max_bytes: int = 2 * 1024 ** 3,
+                 ttl_rules: List[Tuple[str, float]] = None, default_ttl: float = DAY,
+                 replay: bool = False, compress_level: int = 6, required_markers: List[Tuple[str, bytes]] = None):
+        """
+        Parameters
+        ----------
+        directory : str
+            キャッシュを保存するディレクトリ
+        max_bytes : int, default 2GiB
+            キャッシュの合計サイズ(圧縮後)の上限
+        ttl_rules : List[Tuple[str, float]], default None
+            URLの正規表現と有効期限[秒]の組のリスト。Noneの場合はDEFAULT_TTL_RULESを使う。
+        default_ttl : float, default 1日
+            どのルールにもマッチしなかったURLの有効期限
+        replay : bool, default False
+            Trueの場合はネットワークにアクセスせず、キャッシュに無いページはCacheMissとする
+        compress_level : int, default 6
+            zlibの圧縮レベル
+        required_markers : List[Tuple[str, bytes]], default None
+            URLの正規表現と、保存するページに含まれるべきバイト列の組のリスト。
+            Noneの場合はDEFAULT_REQUIRED_MARKERSを使う。
+        """
+        self.directory = os.path.abspath(os.path.expanduser(directory))
+        os.makedirs(self.directory, exist_ok=True)
+        self.max_bytes = max_bytes
+        rules = self.DEFAULT_TTL_RULES if ttl_rules is None else ttl_rules
+        self.ttl_rules = [(re.compile(pattern), ttl) for pattern, ttl in rules]
+        markers = self.DEFAULT_REQUIRED_MARKERS if required_markers is None else required_markers
+        self.required_markers = [(re.compile(pattern), marker) for pattern, marker in markers]
+        self.default_ttl = default_ttl
+        self.replay = replay
+        self.compress_level = compress_level
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            os.path.join(self.directory, 'index.sqlite'),
+            check_same_thread=False, timeout=30)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS pages ('
+            'key TEXT PRIMARY KEY, url TEXT, encoding TEXT, page_encoding TEXT, '
+            'status INTEGER, size INTEGER, stored_at REAL, accessed_at REAL)')
+        self._conn.execute(
+            'CREATE INDEX IF NOT EXISTS pages_accessed_at ON pages (accessed_at)')
+        self._conn.commit()
+        self._total_bytes = self._conn.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM pages').fetchone()[0]
+
+    @staticmethod
+    def make_key(url: str, encoding: str = None, variant: str = '') -> str:
+        """URL、エンコーディング、ログインの有無などからキーを作る"""
+        s = '\0'.join([url, encoding or '', variant])
+        return hashlib.sha256(s.encode('utf-8')).hexdigest()
+
+    def ttl_for(self, url: str) -> float:
+        for pattern, ttl in self.ttl_rules:
+            if pattern.search(url):
+                return ttl
+        return self.default_ttl
+
+    def is_cacheable(self, page: Page) -> bool:
+        """required_markersの条件を満たすかどうか"""
+        for pattern, marker in self.required_markers:
+            if pattern.search(page.url) and marker not in page.content:
+                return False
+        return True
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, url: str, encoding: str = None, variant: str = '') -> Page:
+        """キャッシュからページを取り出す。存在しない、または期限切れの場合はNone。
+        リプレイモードでは、存在しない場合にCacheMissを発生させる。
+        """
+        key = self.make_key(url, encoding, variant)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT page_encoding, status, stored_at FROM pages WHERE key=?',
+                (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                if self.replay:
+                    raise CacheMiss(url)
+                return None
+            page_encoding, status, stored_at = row
+            ttl = self.ttl_for(url)
+            if (not self.replay) and (ttl is not None) and (now - stored_at > ttl):
+                self.misses += 1
+                return None
+            try:
+                with open(self._path(key), 'rb') as f:
+                    content = zlib.decompress(f.read())
+            except (OSError, zlib.error):
+                self._delete(key)
+                self._conn.commit()
+                self.misses += 1
+                if self.replay:
+                    raise CacheMiss(url)
+                return None
+            self._conn.execute(
+                'UPDATE pages SET accessed_at=? WHERE key=?', (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return Page(url, content, page_encoding, status)
+
+    def put(self, page: Page, encoding: str = None, variant: str = '') -> None:
+        """ページをキャッシュに保存する。required_markersの条件を満たさないページは保存しない。"""
+        if not self.is_cacheable(page):
+            return
+        key = self.make_key(page.url, encoding, variant)
+        data = zlib.compress(page.content, self.compress_level)
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute(
+                'SELECT size FROM pages WHERE key=?', (key,)).fetchone()
+            if old is not None:
+                self._total_bytes -= old[0]
+            self._conn.execute(
+                'INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, page.url, encoding or '', page.encoding, page.status_code,
+                 len(data), now, now))
+            self._total_bytes += len(data)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+            self._conn.commit()
+
+    def _delete(self, key: str) -> None:
+        row = self._conn.execute(
+            'SELECT size FROM pages WHERE key=?', (key,)).fetchone()
+        if row is None:
+            return
+        self._conn.execute('DELETE FROM pages WHERE key=?', (key,))
+        self._total_bytes -= row[0]
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _evict(self) -> None:
+        # 他のプロセスが書き込んでいる可能性があるので合計サイズを数え直す
+        self._total_bytes = self._conn.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM pages').fetchone()[0]
+        # 上限の9割まで、参照が古いものから削除する
+        target = self.max_bytes * 0.9
+        rows = self._conn.execute(
+            'SELECT key FROM pages ORDER BY accessed_at').fetchall()
+        for (key,) in rows:
+            if self._total_bytes <= target:
+                break
+            self._delete(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            keys = self._conn.execute('SELECT key FROM pages').fetchall()
+            for (key,) in keys:
+                self._delete(key)
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            count = self._conn.execute('SELECT COUNT(*) FROM pages').fetchone()[0]
+        return {'pages': count, 'bytes': self._total_bytes,
+                'hits': self.hits, 'misses': self.misses}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
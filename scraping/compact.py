@@ -0,0 +1,210 @@
+from typing import Dict, Iterable, List
+
+import numpy as np
+import pandas as pd
+
+from .sink import _import_pyarrow, _normalize, split_odds, split_weight, to_float, to_int, to_seconds
+
+# 文字列のIDを番号に置き換えて保持する列
+ID_COLUMNS = ('horse_id', 'jockey_id', 'trainer_id', 'owner_id')
+SEX_CATEGORIES = ('牡', '牝', 'セ')
+# (列名, 型)。整数の列は0、小数の列はNaN、番号の列は-1を欠損値とする
+SCHEMA = [
+    ('race_id', np.int64),
+    ('horse_id', np.int32), ('jockey_id', np.int32), ('trainer_id', np.int32), ('owner_id', np.int32),
+    ('着順', np.int8), ('枠番', np.int8), ('馬番', np.int8), ('人気', np.int8),
+    ('性別', np.int8), ('年齢', np.int8),
+    ('斤量', np.float32), ('タイム', np.float32), ('上り', np.float32), ('単勝', np.float32),
+    ('馬体重', np.int16), ('体重増減', np.float32), ('賞金(万円)', np.float32),
+]
+
+
+class InternTable(object):
+    '''文字列に通し番号を振り、同じ文字列を1つだけ保持する表。番号は追加した順に振り、後から変わることは無い。'''
+
+    def __init__(self, values: Iterable[str] = None):
+        self.values: List[str] = list()
+        self._codes: Dict[str, int] = dict()
+        if values is not None:
+            self.encode(list(values))
+
+    def _intern(self, value: str) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self._codes[value] = code
+            self.values.append(value)
+        return code
+
+    def encode(self, values) -> np.ndarray:
+        """文字列の配列を番号の配列にする。未登録の文字列は登録する。欠損値と空文字は-1。"""
+        # 重複の無い値だけを辞書で引き、残りは配列の添字で置き換える
+        codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+        mapping = np.array([-1 if str(u).strip() == '' else self._intern(str(u)) for u in uniques] + [-1],
+                           dtype=np.int32)
+        return mapping[codes]
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        """番号の配列を文字列の配列に戻す。-1はNone。"""
+        values = np.array(self.values + [None], dtype=object)
+        return values[codes]
+
+    def code(self, value: str) -> int:
+        """文字列の番号。登録されていない場合は-1。"""
+        return self._codes.get(str(value), -1)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+class CompactResults(object):
+    '''
+    DatabaseScraper.get_main_dfの結果を、少ないメモリで保持するクラス。
+    ID列はInternTableの番号(int32)、数値の列は型を決めたnumpy配列、性別は番号で保持し、1行あたり56バイトとなる。
+    同じInternTableを使うもの同士はnumpy配列を繋ぐだけで結合できる。
+
+    Examples
+    ----------
+    >>> tables = CompactResults.new_tables()
+    >>> results = CompactResults.concat([
+    ...     CompactResults.from_records(scraper.scrape_many(race_ids), tables=tables)
+    ...     for race_ids in yearly_race_ids])
+    >>> df = results.to_pandas()
+    '''
+
+    def __init__(self, columns: Dict[str, np.ndarray], tables: Dict[str, InternTable]):
+        """
+        Parameters
+        ----------
+        columns : Dict[str, np.ndarray]
+            SCHEMAの列名と、その型の同じ長さの配列
+        tables : Dict[str, InternTable]
+            ID_COLUMNSの列名と、番号の元になったInternTable
+        """
+        self.columns = columns
+        self.tables = tables
+
+    @staticmethod
+    def new_tables() -> Dict[str, InternTable]:
+        """ID列ごとの空のInternTable。複数のCompactResultsで共有すると、結合時に番号を振り直さずに済む。"""
+        return {name: InternTable() for name in ID_COLUMNS}
+
+    @classmethod
+    def from_main_df(cls, df: pd.DataFrame, tables: Dict[str, InternTable] = None) -> 'CompactResults':
+        """get_main_dfやRaceRecord.main_dfの形式のDataFrameから作る。SCHEMAに無い列は保持しない。
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+        tables : Dict[str, InternTable], default None
+            ID列の番号を振るInternTable。Noneの場合は新しく作る。
+        """
+        tables = cls.new_tables() if tables is None else tables
+        n = len(df)
+        columns = dict()
+
+        def number(name, converted):
+            dtype = dict(SCHEMA)[name]
+            na_value = np.nan if np.issubdtype(dtype, np.floating) else 0
+            if converted is None:
+                columns[name] = np.full(n, na_value, dtype=dtype)
+            else:
+                columns[name] = converted.to_numpy(dtype=dtype, na_value=na_value)
+
+        def get(name):
+            return df[name] if name in df.columns else None
+
+        columns['race_id'] = pd.to_numeric(df['race_id']).to_numpy(dtype=np.int64)
+        for name in ID_COLUMNS:
+            columns[name] = tables[name].encode(df[name].to_numpy()) if name in df.columns \
+                else np.full(n, -1, dtype=np.int32)
+        for name in ['着順', '枠番', '馬番', '人気']:
+            number(name, None if get(name) is None else to_int(get(name)))
+        if '性齢' in df.columns:
+            parts = _normalize(df['性齢']).str.extract(r'^(\D*)(\d*)')
+            columns['性別'] = pd.Categorical(parts[0], categories=SEX_CATEGORIES).codes.astype(np.int8)
+            number('年齢', to_int(parts[1]))
+        else:
+            columns['性別'] = np.full(n, -1, dtype=np.int8)
+            number('年齢', None)
+        for name in ['斤量', '上り', '賞金(万円)']:
+            number(name, None if get(name) is None else to_float(get(name)))
+        number('タイム', None if get('タイム') is None else to_seconds(get('タイム')))
+        number('単勝', None if get('単勝') is None else split_odds(get('単勝'))[0])
+        if '馬体重' in df.columns:
+            weight = split_weight(df['馬体重'])
+            number('馬体重', weight[0])
+            number('体重増減', weight[1])
+        else:
+            number('馬体重', None)
+            number('体重増減', None)
+        return cls({name: columns[name] for name, _ in SCHEMA}, tables)
+
+    @classmethod
+    def from_records(cls, records: Iterable, tables: Dict[str, InternTable] = None) -> 'CompactResults':
+        """DatabaseScraper.parse_raceやscrape_manyで取得したRaceRecordのmain_dfをまとめて変換する"""
+        dfs = [record.main_df for record in records if record is not None]
+        if len(dfs) == 0:
+            return cls.from_main_df(pd.DataFrame({'race_id': []}), tables)
+        return cls.from_main_df(pd.concat(dfs, ignore_index=True), tables)
+
+    @classmethod
+    def concat(cls, parts: List['CompactResults']) -> 'CompactResults':
+        """結合する。InternTableが異なるものは、先頭のInternTableの番号に振り直す。
+        partsが空の場合は、新しいInternTableを持つ0行のCompactResultsを返す。
+        """
+        if len(parts) == 0:
+            return cls.from_main_df(pd.DataFrame({'race_id': []}))
+        tables = parts[0].tables
+        columns = {name: list() for name, _ in SCHEMA}
+        for part in parts:
+            for name, _ in SCHEMA:
+                values = part.columns[name]
+                if name in tables and part.tables[name] is not tables[name]:
+                    # 番号の対応表を作り、配列の添字で振り直す。末尾は欠損値(-1)の行き先
+                    mapping = np.append(tables[name].encode(part.tables[name].values), np.int32(-1))
+                    values = mapping[values]
+                columns[name].append(values)
+        return cls({name: np.concatenate(arrays) for name, arrays in columns.items()}, tables)
+
+    def __len__(self) -> int:
+        return len(self.columns['race_id'])
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    @property
+    def nbytes(self) -> int:
+        """配列が使っているバイト数。InternTableの文字列は含まない。"""
+        return sum(array.nbytes for array in self.columns.values())
+
+    def ids(self, name: str) -> np.ndarray:
+        """ID列を文字列に戻した配列"""
+        return self.tables[name].decode(self.columns[name])
+
+    def to_pandas(self) -> pd.DataFrame:
+        """DataFrameに変換する。数値の列は配列をコピーせずに使い、ID列と性別はカテゴリ型にする。"""
+        data = dict()
+        for name, _ in SCHEMA:
+            values = self.columns[name]
+            if name in self.tables:
+                data[name] = pd.Categorical.from_codes(values, categories=self.tables[name].values, validate=False)
+            elif name == '性別':
+                data[name] = pd.Categorical.from_codes(values, categories=SEX_CATEGORIES, validate=False)
+            else:
+                data[name] = values
+        return pd.DataFrame(data, copy=False)
+
+    def to_arrow(self):
+        """pyarrow.Tableに変換する。数値の列は配列をコピーせずに使い、ID列と性別は辞書型にする。"""
+        pa = _import_pyarrow()
+        arrays = dict()
+        for name, _ in SCHEMA:
+            values = self.columns[name]
+            if name in self.tables or name == '性別':
+                dictionary = self.tables[name].values if name in self.tables else list(SEX_CATEGORIES)
+                arrays[name] = pa.DictionaryArray.from_arrays(
+                    pa.array(values, mask=values < 0), pa.array(dictionary, type=pa.string()))
+            else:
+                arrays[name] = pa.array(values)
+        return pa.table(arrays)
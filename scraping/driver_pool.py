@@ -0,0 +1,207 @@
+import contextlib
+import functools
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable, List
+
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver import Chrome, ChromeOptions
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.remote.webdriver import WebDriver
+
+
+def new_chrome_driver(executable_path: str, visible: bool = False, wait_time: float = 10) -> WebDriver:
+    """SeleniumScraperBaseと同じ設定でChromeを起動する
+
+    Parameters
+    ----------
+    executable_path : str
+        chrome driverまでのパス。Noneの場合はSelenium Managerが探したものを使う。
+    visible : bool, default False
+        ブラウザを起動して動作させるかのフラグ
+    wait_time : float, default 10
+        要素が見つかるまで待つ時間
+    """
+    option = ChromeOptions()
+    if not visible:
+        option.add_argument('--headless')
+    option.add_experimental_option('excludeSwitches', ['enable-logging'])
+    option.use_chromium = True
+    # Selenium 4.10以降はexecutable_pathを受け付けないので、Serviceで渡す
+    if executable_path is None:
+        driver = Chrome(options=option)
+    else:
+        driver = Chrome(service=Service(executable_path=executable_path), options=option)
+    driver.implicitly_wait(wait_time)
+    return driver
+
+
+def is_alive(driver: WebDriver) -> bool:
+    """ブラウザが応答するかどうか。クラッシュしたり閉じられたりした場合はFalse。"""
+    try:
+        driver.execute_script('return 1')
+        return True
+    except WebDriverException:
+        return False
+
+
+class DriverPool(object):
+    '''
+    複数のChromeを起動しておき、スレッドごとに貸し出すクラス。
+    貸し出す前に応答を確認し、クラッシュしたブラウザは閉じて起動し直す。
+    ページ遷移はSeleniumScraperBaseと同じくホストごとのレート制限に従うので、
+    ブラウザの数を増やしてもサイトへのリクエスト間隔の下限は変わらない。
+
+    Examples
+    ----------
+    >>> with DriverPool('chromedriver', size=4) as pool:
+    ...     odds = OddsScraper.get_odds_df_dict_many(pool, race_ids)
+    '''
+
+    def __init__(self, executable_path: str = None, size: int = 4, visible: bool = False, wait_time: float = 10,
+                 factory: Callable[[], WebDriver] = None, max_retries: int = 1):
+        """
+        Parameters
+        ----------
+        executable_path : str, default None
+            chrome driverまでのパス
+        size : int, default 4
+            同時に起動するブラウザの数の上限。ブラウザは必要になった時点で起動する。
+        visible : bool, default False
+            ブラウザを起動して動作させるかのフラグ
+        wait_time : float, default 10
+            要素が見つかるまで待つ時間
+        factory : Callable[[], WebDriver], default None
+            ブラウザを起動する関数。Noneの場合はnew_chrome_driverを使う。
+        max_retries : int, default 1
+            mapで、処理中にブラウザがクラッシュした場合に新しいブラウザでやり直す回数
+        """
+        if factory is None:
+            factory = functools.partial(new_chrome_driver, executable_path, visible, wait_time)
+        self.factory = factory
+        self.size = size
+        self.wait_time = wait_time
+        self.max_retries = max_retries
+        # クラッシュしたために閉じたブラウザの数
+        self.n_restarts = 0
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._drivers: List[WebDriver] = list()
+        self._closed = False
+
+    def _start(self) -> WebDriver:
+        driver = self.factory()
+        with self._lock:
+            self._drivers.append(driver)
+        return driver
+
+    def _discard(self, driver: WebDriver, crashed: bool = False) -> None:
+        with self._lock:
+            if driver in self._drivers:
+                self._drivers.remove(driver)
+            if crashed:
+                self.n_restarts += 1
+        try:
+            driver.quit()
+        except WebDriverException:
+            pass
+
+    def _checkout(self) -> WebDriver:
+        try:
+            driver = self._idle.get_nowait()
+        except queue.Empty:
+            return self._start()
+        if not is_alive(driver):
+            self._discard(driver, crashed=True)
+            return self._start()
+        return driver
+
+    @contextlib.contextmanager
+    def driver(self):
+        """ブラウザを1つ借りる。全て貸し出し中の場合は返却されるまで待機する。
+
+        Examples
+        ----------
+        >>> with pool.driver() as driver:
+        ...     driver.get(url)
+        """
+        if self._closed:
+            raise RuntimeError('DriverPool is closed')
+        self._slots.acquire()
+        driver = None
+        try:
+            driver = self._checkout()
+            yield driver
+        except WebDriverException:
+            # タイムアウトなどでブラウザ自体が生きている場合は使い続ける
+            if driver is not None and not is_alive(driver):
+                self._discard(driver, crashed=True)
+                driver = None
+            raise
+        finally:
+            if driver is not None:
+                if self._closed:
+                    self._discard(driver)
+                else:
+                    self._idle.put(driver)
+            self._slots.release()
+
+    def _run(self, func: Callable[[WebDriver, Any], Any], item: Any) -> Any:
+        for attempt in range(self.max_retries + 1):
+            driver = None
+            try:
+                with self.driver() as driver:
+                    return func(driver, item)
+            except WebDriverException:
+                # ブラウザがクラッシュして閉じた場合だけ、新しいブラウザでやり直す
+                with self._lock:
+                    crashed = driver is not None and driver not in self._drivers
+                if not crashed or attempt == self.max_retries or self._closed:
+                    raise
+
+    def map(self, func: Callable[[WebDriver, Any], Any], items: Iterable[Any],
+            return_exceptions: bool = False) -> List[Any]:
+        """func(driver, item)を、ブラウザの数だけ並行に実行し、入力と同じ順番で結果を返す。
+
+        Parameters
+        ----------
+        func : Callable[[WebDriver, Any], Any]
+            借りたブラウザと要素を受け取る関数
+        items : Iterable[Any]
+        return_exceptions : bool, default False
+            Trueの場合は、失敗した要素の結果を例外オブジェクトとして返す。
+            Falseの場合は、最初に失敗した要素の例外を送出する。
+        """
+        items = list(items)
+        with ThreadPoolExecutor(max_workers=self.size, thread_name_prefix='DriverPool') as executor:
+            futures = [executor.submit(self._run, func, item) for item in items]
+            results = list()
+            for future in futures:
+                if return_exceptions:
+                    exc = future.exception()
+                    results.append(future.result() if exc is None else exc)
+                else:
+                    results.append(future.result())
+        return results
+
+    def __len__(self) -> int:
+        """起動しているブラウザの数"""
+        with self._lock:
+            return len(self._drivers)
+
+    def close(self) -> None:
+        """全てのブラウザを閉じる。貸し出し中のブラウザは返却時に閉じる。"""
+        self._closed = True
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
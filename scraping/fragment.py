@@ -0,0 +1,102 @@
+import re
+from typing import List, Tuple
+
+_ATTR = re.compile(r'''([^\s=/>]+)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))''')
+
+
+def _parse_attrs(start_tag: str) -> dict:
+    attrs = dict()
+    for m in _ATTR.finditer(start_tag):
+        value = next(v for v in m.groups()[1:] if v is not None)
+        attrs[m.group(1).lower()] = value
+    return attrs
+
+
+def _attr_matches(attrs: dict, attr: str, value: str) -> bool:
+    if attr not in attrs:
+        return False
+    # classのように空白区切りで複数の値を持つ属性は、そのうちの1つと一致すればよい
+    return attrs[attr] == value or value in attrs[attr].split()
+
+
+def find_element_end(markup: str, tag: str, pos: int) -> int:
+    """posから始まる要素の中身を読み進め、対応する閉じタグの終わりの位置を返す。
+    同じタグが入れ子になっている場合も対応する。閉じタグが無い場合は末尾の位置を返す。
+    """
+    pattern = re.compile(r'<(/?)%s\b[^>]*?(/?)>' % tag, re.I)
+    depth = 1
+    for m in pattern.finditer(markup, pos):
+        if m.group(1):
+            depth -= 1
+            if depth == 0:
+                return m.end()
+        elif not m.group(2):
+            depth += 1
+    return len(markup)
+
+
+def extract_fragments(markup: str, targets: List[Tuple[str, str, str]], limit: int = None) -> List[str]:
+    """ページ全体をパースせずに、条件に一致する要素のHTMLだけを文書順に切り出す。
+    一致した要素の内側にある要素は、外側の要素に含まれるので個別には切り出さない。
+
+    Parameters
+    ----------
+    markup : str
+        ページ全体のHTML
+    targets : List[Tuple[str, str, str]]
+        (タグ名, 属性名, 属性値)のリスト。いずれかに一致した要素を切り出す。
+        属性名がNoneの場合はタグ名だけで判定する。
+    limit : int, default None
+        切り出す要素の数の上限
+
+    Returns
+    -------
+    List[str]
+        切り出した要素のHTMLのリスト
+
+    Examples
+    ----------
+    >>> extract_fragments(html, [('table', 'class', 'race_table_01'), ('div', 'class', 'data_intro')])
+    """
+    tags = sorted({tag for tag, _, _ in targets})
+    start_pattern = re.compile(r'<(%s)\b[^>]*>' % '|'.join(tags), re.I)
+    fragments = list()
+    pos = 0
+    while (limit is None) or (len(fragments) < limit):
+        m = start_pattern.search(markup, pos)
+        if m is None:
+            break
+        tag = m.group(1).lower()
+        attrs = _parse_attrs(m.group(0)[len(tag) + 1:])
+        matched = any(
+            (tag == t) and ((attr is None) or _attr_matches(attrs, attr, value))
+            for t, attr, value in targets)
+        if not matched:
+            pos = m.end()
+            continue
+        end = find_element_end(markup, tag, m.end())
+        fragments.append(markup[m.start():end])
+        pos = end
+    return fragments
+
+
+def extract_fragments_from_bytes(content: bytes, targets: List[Tuple[str, str, str]], encoding: str,
+                                 limit: int = None) -> List[str]:
+    """`extract_fragments`をデコード前のバイト列に対して行い、切り出した部分だけをデコードする。
+    Shift_JIS(cp932)、EUC-JP、UTF-8のように、マルチバイト文字の途中に'<'や'>'が現れないエンコーディングに使える。
+
+    Parameters
+    ----------
+    content : bytes
+        ページ全体のレスポンスボディ
+    targets : List[Tuple[str, str, str]]
+        `extract_fragments`と同じ
+    encoding : str
+        切り出した部分のデコードに使うエンコーディング
+    limit : int, default None
+        切り出す要素の数の上限
+    """
+    # latin-1は1バイトを1文字に対応させるだけなので、ページ全体をデコードするより速い
+    markup = content.decode('latin-1')
+    return [fragment.encode('latin-1').decode(encoding, errors='replace')
+            for fragment in extract_fragments(markup, targets, limit=limit)]
@@ -0,0 +1,186 @@
+import datetime
+import json
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Union
+
+import pandas as pd
+
+
+class HorseHistoryStore(object):
+    '''
+    馬の過去成績を馬IDごとに保存し、新しく出走した馬だけを取得し直せるようにするクラス。
+    取得したレースから馬IDと開催日を記録しておき、保存済みの最新の成績より後に出走した馬だけを取得対象とする。
+    取得し直した場合も、保存済みの成績より新しい行だけを追記する。
+
+    Examples
+    ----------
+    >>> store = HorseHistoryStore('data/horse_history.sqlite')
+    >>> store.observe_records(DatabaseScraper().scrape_many(race_ids))
+    >>> HorseResultsScraper().update_history(store)
+    >>> df = store.get('2018105027')
+    '''
+    DATE_COLUMN = '日付'
+
+    def __init__(self, path: str, grace_days: int = 7):
+        """
+        Parameters
+        ----------
+        path : str
+            保存するSQLiteファイルのパス
+        grace_days : int, default 7
+            出走したレースが馬のページに反映されるのを待つ日数。
+            開催日からこの日数が経過した後に取得しても反映されていない場合は、次に出走するまで取得しない。
+        """
+        self.path = os.path.abspath(os.path.expanduser(path))
+        self.grace_days = grace_days
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        # last_seen : 取得したレースで確認した最新の出走日
+        # last_row : 保存済みの成績の最新の日付
+        # fetched_on : 最後に馬のページを取得した日
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS horses ('
+            'horse_id TEXT PRIMARY KEY, last_seen TEXT, last_row TEXT, fetched_on TEXT)')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS results (horse_id TEXT, date TEXT, row TEXT)')
+        self._conn.execute(
+            'CREATE INDEX IF NOT EXISTS results_horse_id ON results (horse_id, date)')
+        self._conn.commit()
+
+    @staticmethod
+    def _to_date(value: Union[str, datetime.date]) -> str:
+        # '2021/05/30'や'2021-05-30'、datetime.dateを'2021-05-30'にそろえる
+        if isinstance(value, (datetime.date, pd.Timestamp)):
+            return value.strftime('%Y-%m-%d')
+        return str(value).strip().replace('/', '-')
+
+    def observe(self, horse_ids: Iterable[Union[str, int]], race_date: Union[str, datetime.date]) -> None:
+        """race_dateに開催されたレースにhorse_idsの馬が出走したことを記録する"""
+        race_date = self._to_date(race_date)
+        self._observe({str(horse_id): race_date for horse_id in horse_ids})
+
+    def observe_records(self, records: Iterable) -> int:
+        """DatabaseScraper.parse_raceやscrape_manyで取得したRaceRecordから、出走した馬と開催日を記録する。
+        同じ馬が複数のレースに出走している場合は、最も新しい開催日だけを記録する。
+
+        Returns
+        -------
+        int
+            記録した馬の数
+        """
+        seen = dict()
+        for record in records:
+            if record is None or record.race_info.get(self.DATE_COLUMN) is None:
+                continue
+            race_date = self._to_date(record.race_info[self.DATE_COLUMN])
+            for horse_id in record.horse_ids:
+                horse_id = str(horse_id)
+                if seen.get(horse_id, '') < race_date:
+                    seen[horse_id] = race_date
+        self._observe(seen)
+        return len(seen)
+
+    def _observe(self, seen: Dict[str, str]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                'INSERT INTO horses (horse_id, last_seen) VALUES (?, ?) '
+                'ON CONFLICT (horse_id) DO UPDATE SET last_seen = CASE '
+                'WHEN last_seen IS NULL OR excluded.last_seen > last_seen THEN excluded.last_seen '
+                'ELSE last_seen END',
+                seen.items())
+            self._conn.commit()
+
+    def stale(self, today: datetime.date = None) -> List[str]:
+        """取得し直す必要がある馬IDを返す。
+        一度も取得していない馬と、保存済みの成績より後に出走していて、まだ反映を待っている馬が対象となる。
+
+        Parameters
+        ----------
+        today : datetime.date, default None
+            Noneの場合は今日
+        """
+        today = self._to_date(datetime.date.today() if today is None else today)
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT horse_id FROM horses WHERE fetched_on IS NULL OR ('
+                "last_seen > COALESCE(last_row, '') AND fetched_on < date(last_seen, ?) AND fetched_on < ?)",
+                (f'+{self.grace_days} days', today)).fetchall()
+        return [horse_id for (horse_id,) in rows]
+
+    def update(self, horse_id: Union[str, int], df: pd.DataFrame, today: datetime.date = None) -> int:
+        """HorseResultsScraper.get_horseresultsで取得した成績のうち、保存済みのものより新しい行を追記する。
+
+        Returns
+        -------
+        int
+            追記した行数
+        """
+        horse_id = str(horse_id)
+        today = self._to_date(datetime.date.today() if today is None else today)
+        dates = df[self.DATE_COLUMN].map(self._to_date)
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT last_row FROM horses WHERE horse_id=?', (horse_id,)).fetchone()
+            last_row = '' if row is None or row[0] is None else row[0]
+            mask = (dates > last_row).to_numpy()
+            new, new_dates = df[mask], dates[mask]
+            self._conn.executemany(
+                'INSERT INTO results VALUES (?, ?, ?)',
+                [(horse_id, date, json.dumps(record, ensure_ascii=False, default=str))
+                 for date, record in zip(new_dates, new.to_dict(orient='records'))])
+            last_row = max([last_row] + new_dates.tolist())
+            self._conn.execute(
+                'INSERT INTO horses (horse_id, last_row, fetched_on) VALUES (?, ?, ?) '
+                'ON CONFLICT (horse_id) DO UPDATE SET last_row=excluded.last_row, fetched_on=excluded.fetched_on',
+                (horse_id, last_row or None, today))
+            self._conn.commit()
+        return len(new)
+
+    def get(self, horse_id: Union[str, int]) -> pd.DataFrame:
+        """保存済みの成績を、馬のページと同じく新しい順に返す。保存されていない場合は空のDataFrame。"""
+        return self.to_frame([horse_id])
+
+    def to_frame(self, horse_ids: Iterable[Union[str, int]] = None) -> pd.DataFrame:
+        """保存済みの成績をまとめて返す。
+
+        Parameters
+        ----------
+        horse_ids : Iterable[str or int], default None
+            Noneの場合は全ての馬
+        """
+        with self._lock:
+            if horse_ids is None:
+                rows = self._conn.execute(
+                    'SELECT row FROM results ORDER BY horse_id, date DESC').fetchall()
+            else:
+                rows = list()
+                for horse_id in horse_ids:
+                    rows += self._conn.execute(
+                        'SELECT row FROM results WHERE horse_id=? ORDER BY date DESC',
+                        (str(horse_id),)).fetchall()
+        return pd.DataFrame([json.loads(row) for (row,) in rows])
+
+    def __contains__(self, horse_id: Union[str, int]) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT 1 FROM horses WHERE horse_id=? AND fetched_on IS NOT NULL', (str(horse_id),)).fetchone()
+        return row is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM horses').fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,260 @@
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Union
+
+
+@dataclass
+class JobState:
+    '''CrawlJournalに記録する1件分の状態'''
+    status: str
+    attempts: int = 0
+    last_error: str = None
+    retry_at: float = None
+    updated_at: float = None
+
+
+class CrawlJournal(object):
+    '''
+    レースIDや馬IDごとの取得状況をファイルに記録し、中断したクロールを再開できるようにするクラス。
+    状態が変わるたびに1行追記するだけなので、記録にかかる時間は通信に比べて無視できる。
+    追記した行が増えたら、IDごとに最新の状態だけを残すようにファイルを書き直す。
+    1つのファイルに書き込むのは1つのプロセスだけにすること。
+
+    Examples
+    ----------
+    >>> journal = CrawlJournal('crawl/race.jsonl')
+    >>> journal.add(load_ids(glob.glob('resources/netkeiba_race_id/*.txt')))
+    >>> for race_id in journal.todo():
+    ...     try:
+    ...         df = scraper.get_main_df(race_id)
+    ...     except Exception as e:
+    ...         journal.mark_failed(race_id, e)
+    ...     else:
+    ...         journal.mark_done(race_id)
+    '''
+    PENDING = 'pending'
+    DONE = 'done'
+    FAILED = 'failed'
+    EMPTY = 'empty'
+
+    def __init__(self, path: str, max_attempts: int = 5, backoff: float = 60,
+                 max_backoff: float = 6 * 60 * 60, compact_every: int = 10000, sync: bool = False):
+        """
+        Parameters
+        ----------
+        path : str
+            記録するファイルのパス。既に存在する場合は読み込んで続きから記録する。
+        max_attempts : int, default 5
+            失敗した場合に試行する回数の上限。これを超えたものはtodoに含めない。
+        backoff : float, default 60
+            1回目の失敗から再試行までの待ち時間[秒]。失敗するたびに2倍にする。
+        max_backoff : float, default 6時間
+            再試行までの待ち時間の上限[秒]
+        compact_every : int, default 10000
+            追記した行数がこの値と登録済みのIDの数の両方を超えたら、ファイルを書き直す
+        sync : bool, default False
+            Trueの場合は1行ごとにfsyncする。OSごと停止しても記録が失われないが遅くなる。
+        """
+        self.path = os.path.abspath(os.path.expanduser(path))
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.compact_every = compact_every
+        self.sync = sync
+        self._states: Dict[str, JobState] = dict()
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._load()
+        self._appended = 0
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # 書き込み中に停止した場合、最後の行が途中で切れていることがある
+                    continue
+                job_id = entry.pop('id')
+                self._states[job_id] = JobState(**entry)
+
+    @staticmethod
+    def _dumps(job_id: str, state: JobState) -> str:
+        # dataclasses.asdictは遅いので直接dictを作る
+        return json.dumps({
+            'id': job_id, 'status': state.status, 'attempts': state.attempts,
+            'last_error': state.last_error, 'retry_at': state.retry_at,
+            'updated_at': state.updated_at}, ensure_ascii=False) + '\n'
+
+    def _write(self, job_id: str, state: JobState, flush: bool = True) -> None:
+        self._states[job_id] = state
+        self._file.write(self._dumps(job_id, state))
+        self._appended += 1
+        if flush:
+            self._flush()
+
+    def _flush(self) -> None:
+        self._file.flush()
+        if self.sync:
+            os.fsync(self._file.fileno())
+        # 書き直すコストが追記した行数に比例するように、IDの数より多く追記してから書き直す
+        if self._appended >= max(self.compact_every, len(self._states)):
+            self._compact()
+
+    def _compact(self) -> None:
+        tmp_path = f'{self.path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.writelines(self._dumps(job_id, state) for job_id, state in self._states.items())
+            f.flush()
+            os.fsync(f.fileno())
+        self._file.close()
+        os.replace(tmp_path, self.path)
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self._appended = 0
+
+    def compact(self) -> None:
+        """IDごとに最新の状態だけを残すようにファイルを書き直す"""
+        with self._lock:
+            self._compact()
+
+    def add(self, ids: Iterable[Union[str, int]]) -> int:
+        """IDをpendingとして登録する。登録済みのIDは状態を変えない。
+
+        Returns
+        -------
+        int
+            新たに登録したIDの数
+        """
+        now = time.time()
+        n = 0
+        with self._lock:
+            for job_id in ids:
+                job_id = str(job_id)
+                if job_id not in self._states:
+                    self._write(job_id, JobState(self.PENDING, updated_at=now), flush=False)
+                    n += 1
+            self._flush()
+        return n
+
+    def mark_done(self, job_id: Union[str, int]) -> None:
+        self._mark(job_id, self.DONE)
+
+    def mark_empty(self, job_id: Union[str, int]) -> None:
+        """ページは取得できたが、中身が存在しなかった場合に記録する。再試行しない。"""
+        self._mark(job_id, self.EMPTY)
+
+    def mark_failed(self, job_id: Union[str, int], error: Union[str, Exception] = None) -> None:
+        """失敗を記録し、失敗した回数に応じて次に再試行する時刻を決める"""
+        if isinstance(error, Exception):
+            error = f'{type(error).__name__}: {error}'
+        self._mark(job_id, self.FAILED, error)
+
+    def _mark(self, job_id: Union[str, int], status: str, error: str = None) -> None:
+        job_id = str(job_id)
+        now = time.time()
+        with self._lock:
+            old = self._states.get(job_id)
+            attempts = (0 if old is None else old.attempts) + 1
+            retry_at = None
+            if status == self.FAILED and attempts < self.max_attempts:
+                retry_at = now + min(self.max_backoff, self.backoff * 2 ** (attempts - 1))
+            self._write(job_id, JobState(status, attempts, error, retry_at, now))
+
+    def status(self, job_id: Union[str, int]) -> str:
+        """IDの状態を返す。登録されていない場合はNone。"""
+        state = self._states.get(str(job_id))
+        return None if state is None else state.status
+
+    def get(self, job_id: Union[str, int]) -> JobState:
+        return self._states.get(str(job_id))
+
+    def is_finished(self, job_id: Union[str, int]) -> bool:
+        """doneまたはemptyとして記録済みかどうか"""
+        return self.status(job_id) in (self.DONE, self.EMPTY)
+
+    def _is_due(self, state: JobState, now: float) -> bool:
+        if state.status == self.PENDING:
+            return True
+        if state.status == self.FAILED:
+            return (state.retry_at is not None) and (state.retry_at <= now)
+        return False
+
+    def todo(self, ids: Iterable[Union[str, int]] = None, now: float = None) -> List[Union[str, int]]:
+        """これから取得すべきIDを返す。
+        pendingのものと、失敗したもののうち再試行する時刻を過ぎたものが対象となる。
+
+        Parameters
+        ----------
+        ids : Iterable[str or int], default None
+            指定した場合は、未登録のIDを登録した上で、このうち取得すべきものを同じ順番・同じ型で返す。
+            指定しない場合は登録済みの全てのIDが対象となる。
+        now : float, default None
+            再試行の判定に使う時刻。Noneの場合は現在時刻。
+        """
+        now = time.time() if now is None else now
+        if ids is None:
+            return [job_id for job_id, state in self._states.items() if self._is_due(state, now)]
+        ids = list(ids)
+        self.add(ids)
+        return [job_id for job_id in ids if self._is_due(self._states[str(job_id)], now)]
+
+    def next_retry_at(self) -> float:
+        """再試行を待っているものの中で、最も早い再試行時刻を返す。無い場合はNone。"""
+        times = [s.retry_at for s in self._states.values()
+                 if s.status == self.FAILED and s.retry_at is not None]
+        return min(times, default=None)
+
+    def counts(self) -> Dict[str, int]:
+        """状態ごとの件数を返す"""
+        counts = {self.PENDING: 0, self.DONE: 0, self.FAILED: 0, self.EMPTY: 0}
+        for state in self._states.values():
+            counts[state.status] += 1
+        return counts
+
+    def __contains__(self, job_id: Union[str, int]) -> bool:
+        return str(job_id) in self._states
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def load_ids(paths: Union[str, Iterable[str]]) -> List[str]:
+    """resources/netkeiba_race_idのような、1行に1つずつIDを書いたファイルを読み込む。
+
+    Parameters
+    ----------
+    paths : str or Iterable[str]
+        ファイルのパス、またはそのリスト
+
+    Returns
+    -------
+    List[str]
+        ファイルの順番、行の順番に並べたIDのリスト。重複は除く。
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+    ids = dict()
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    ids[line] = None
+    return list(ids)
@@ -1,24 +1,45 @@
+import asyncio
+import calendar
 import datetime
+import functools
 import itertools
+import json
 import re
 import time
-from typing import Dict, List, Union
+from dataclasses import dataclass, field
+from io import StringIO
+from typing import Dict, Iterable, Iterator, List, Tuple, Union
+from urllib.parse import urlsplit
 
+import numpy as np
 import pandas as pd
-import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, Comment, Tag
 from dateutil import relativedelta
 from selenium.webdriver.common.by import By
+from selenium.webdriver.remote.webdriver import WebDriver
 from selenium.webdriver.support.select import Select
 from tqdm import tqdm
 
+from .async_fetch import get_fetcher, run_sync
 from .base import SeleniumScraperBase, SoupScraperBase
+from .driver_pool import DriverPool
+from .fragment import extract_fragments_from_bytes
+from .horse_store import HorseHistoryStore
+from .journal import CrawlJournal
+from .odds_series import OddsPoller
+from .pedigree import PED_SPANS, PedigreeGraph, parse_ped_table
+from .payout import normalize_payouts
+from .pipeline import PipelineStats, run_pipeline
+from .raceid_index import RaceIdIndex
+from .table import cells_to_array, iter_tags, read_table, table_texts
+from .transport import HttpTransport, Page, get_default_transport
 
 
 class NetkeibaSoupScraperBase(SoupScraperBase):
     '''Netkeibaの静的サイトのスクレイピングに使うベースクラス'''
 
-    def __init__(self, base_url: str, user_id: str = None, password: str = None):
+    def __init__(self, base_url: str, user_id: str = None, password: str = None,
+                 transport: HttpTransport = None, parser: str = "html.parser"):
         """
         Parameters
         ----------
@@ -28,12 +49,16 @@ class NetkeibaSoupScraperBase(SoupScraperBase):
             ログインする場合に指定するユーザID
         password : str, default None
             ログインする場合に指定するパスワード
+        transport : HttpTransport, default None
+            ページの取得に利用するHttpTransport
+        parser : str, default "html.parser"
+            BeautifulSoupで利用するパーサ。"lxml"を指定すると高速になる。
         """
         url, info = None, None
         if (user_id is not None) and (password is not None):
             url = "https://regist.netkeiba.com/account/?pid=login&action=auth"
             info = {'login_id': user_id, 'pswd': password}
-        super().__init__(login_url=url, login_info=info)
+        super().__init__(login_url=url, login_info=info, transport=transport, parser=parser)
         self.base_url = base_url
         self.soup = None
         self.race_id = None
@@ -51,6 +76,70 @@ class NetkeibaSoupScraperBase(SoupScraperBase):
         self.race_id = race_id
         return self.soup
 
+    def set_soup(self, soup: BeautifulSoup, race_id: Union[str, int]):
+        """`fetch_many`などで取得済みのページを、各getメソッドの対象として設定する。
+
+        Parameters
+        ----------
+        soup : BeautifulSoup
+        race_id : str or int
+            soupに対応するID
+        """
+        self.soup = soup
+        self.race_id = race_id
+        return self.soup
+
+    async def aget_soup(self, race_id: Union[str, int]) -> BeautifulSoup:
+        """`get_soup`の非同期版。並行に呼び出せるように`self.soup`は更新しない。"""
+        return await self._aget_soup(
+            self.base_url.format(race_id), encoding='EUC-JP')
+
+    async def afetch_many(self, race_ids: List[Union[str, int]], return_exceptions: bool = False) -> List[BeautifulSoup]:
+        """`fetch_many`の非同期版"""
+        return await self._agather_soups(
+            [self.base_url.format(race_id) for race_id in race_ids],
+            encoding='EUC-JP', return_exceptions=return_exceptions)
+
+    def fetch_many(self, race_ids: List[Union[str, int]], return_exceptions: bool = False) -> List[BeautifulSoup]:
+        """複数のページを並行に取得する。
+        ホストごとの同時リクエスト数は`self.fetcher`の設定に従う。
+
+        Parameters
+        ----------
+        race_ids : List[str or int]
+            レースIDや馬IDなど、base_urlに埋め込むIDのリスト
+        return_exceptions : bool, default False
+            Trueの場合は取得に失敗したページの位置に例外を入れて返す
+
+        Returns
+        -------
+        List[BeautifulSoup]
+            race_idsと同じ順番のBeautifulSoupのリスト
+
+        Examples
+        ----------
+        >>> scraper = DatabaseScraper()
+        >>> for race_id, soup in zip(race_ids, scraper.fetch_many(race_ids)):
+        ...     scraper.set_soup(soup, race_id)
+        ...     main_df = scraper.get_main_df()
+        """
+        return run_sync(self.afetch_many(race_ids, return_exceptions=return_exceptions))
+
+
+@dataclass
+class RaceRecord:
+    '''DatabaseScraper.parse_raceで取得した1レース分の情報'''
+    race_id: Union[int, str]
+    main_df: pd.DataFrame
+    race_info: dict
+    pay_df: pd.DataFrame
+    corner_df: pd.DataFrame
+    laptime_df: pd.DataFrame
+    horse_ids: List[str] = field(default_factory=list)
+    jockey_ids: List[str] = field(default_factory=list)
+    trainer_ids: List[str] = field(default_factory=list)
+    owner_ids: List[str] = field(default_factory=list)
+
 
 class DatabaseScraper(NetkeibaSoupScraperBase):
     '''入力されたレースIDに従ってNetkeibaのDatabaseページから情報を取得するクラス'''
@@ -61,76 +150,94 @@ class DatabaseScraper(NetkeibaSoupScraperBase):
     RACECOURSE_DICT = {
         1: '札幌', 2: '函館', 3: '福島', 4: '新潟', 5: '東京',
         6: '中山', 7: '中京', 8: '京都', 9: '阪神', 10: '小倉'}
-
-    def __init__(self, user_id=None, password=None):
+    # 各getメソッドが参照する要素。ページのそれ以外の部分はパースしない
+    PARSE_TARGETS = [
+        ('div', 'class', 'data_intro'),
+        ('dl', 'class', 'racedata'),
+        ('table', 'class', 'race_table_01'),
+        ('table', 'class', 'pay_table_01'),
+        ('table', 'summary', 'コーナー通過順位'),
+        ('table', 'summary', 'ラップタイム')]
+
+    def __init__(self, user_id=None, password=None, transport=None, parser="html.parser", partial=False):
+        """
+        Parameters
+        ----------
+        user_id : str, default None
+            ログインする場合に指定するユーザID
+        password : str, default None
+            ログインする場合に指定するパスワード
+        transport : HttpTransport, default None
+            ページの取得に利用するHttpTransport
+        parser : str, default "html.parser"
+            BeautifulSoupで利用するパーサ。"lxml"を指定すると高速になる。
+        partial : bool, default False
+            Trueの場合は、各getメソッドが参照する要素だけをパースして高速にする。
+            その場合、self.soupにはそれ以外の部分が含まれない。
+            scrape_manyはself.soupを公開しないため、この指定によらず必要な要素だけをパースする。
+        """
         super().__init__(
             base_url="https://db.netkeiba.com/race/{}",
-            user_id=user_id, password=password)
+            user_id=user_id, password=password, transport=transport, parser=parser)
+        if not partial:
+            self.parse_targets = None
 
     def get_main_df(self, race_id: Union[int, str] = None) -> pd.DataFrame:
         """馬ごとの情報をスクレイピングする"""
         if race_id is not None:
             self.get_soup(race_id)
         assert self.soup is not None
-        rows = self.soup.find(
-            'table', attrs={"class": "race_table_01"}).find_all('tr')
-        data = [[col.text.replace('\n', '') for col in row.findAll(
-            ['td', 'th'])] for row in rows]
-        cols = self.MAIN_DF_COLUMNS + \
-            self.PLEMIUS_COLUMNS if self.login else self.MAIN_DF_COLUMNS
-        main_df = pd.DataFrame(data[1:], columns=data[0])[cols]
-        main_df['race_id'] = self.race_id
-        main_df['horse_id'] = self.__get_horse_id_list()
-        main_df['jockey_id'] = self.__get_jockey_id_list()
-        main_df['trainer_id'] = self.__get_trainer_id_list()
-        main_df['owner_id'] = self.__get_owner_id_list()
+        table = self.soup.find('table', attrs={"class": "race_table_01"})
+        main_df, _ = self.__build_main_df(table)
         return main_df
 
-    def __get_horse_id_list(self) -> List[int]:
-        """DataBaseページに掲載されている馬のIDリストを取得する"""
-        return self.__get_id_list('horse')
-
-    def __get_jockey_id_list(self) -> List[int]:
-        """DataBaseページに掲載されている騎手のIDリストを取得する"""
-        return self.__get_id_list('jockey')
-
-    def __get_trainer_id_list(self) -> List[int]:
-        """DataBaseページに掲載されている調教師のIDリストを取得する"""
-        return self.__get_id_list('trainer')
-
-    def __get_owner_id_list(self) -> List[int]:
-        """DataBaseページに掲載されている馬主のIDリストを取得する"""
-        return self.__get_id_list_from_col(19)
-
-    def __get_id_list(self, id_type: str) -> List[str]:
-        atag_list = self.soup.find("table", attrs={"summary": "レース結果"}).find_all(
-            "a", attrs={"href": re.compile(f"^/{id_type}")})
-        id_list = [re.findall(r"\d+", atag["href"])[0] for atag in atag_list]
-        return id_list
-
-    def __get_id_list_from_col(self, col_idx: int) -> List[str]:
-        id_list = list()
-        tr_list = self.soup.find(
-            'table', attrs={'class': 'race_table_01'}).find_all('tr')[1:]
-        for tr in tr_list:
-            atag = tr.find_all('td')[col_idx].find('a')
+    def __build_main_df(self, table: BeautifulSoup):
+        """レース結果の表を1回だけ走査して、馬ごとの情報と各IDのリストを取得する"""
+        data = list()
+        id_dict = {'horse_id': [], 'jockey_id': [], 'trainer_id': [], 'owner_id': []}
+        prefixes = [('/horse', 'horse_id'), ('/jockey', 'jockey_id'), ('/trainer', 'trainer_id')]
+        for i, row in enumerate(iter_tags(table, ('tr',))):
+            cols, atags = list(), list()
+            for tag in iter_tags(row, ('td', 'th', 'a')):
+                (atags if tag.name == 'a' else cols).append(tag)
+            data.append([col.text.replace('\n', '') for col in cols])
+            for atag in atags:
+                href = atag.get('href')
+                if href is None:
+                    continue
+                for prefix, key in prefixes:
+                    if href.startswith(prefix):
+                        id_dict[key].append(re.findall(r"\d+", href)[0])
+            if i == 0:
+                continue
+            # 馬主は19列目のリンクから取得する
+            atag = next(iter_tags([col for col in cols if col.name == 'td'][19], ('a',)), None)
             if atag is None:
-                id_list.append('')
+                id_dict['owner_id'].append('')
             else:
-                id_list.append(re.findall(r"\d+", atag["href"])[0])
-        return id_list
+                id_dict['owner_id'].append(re.findall(r"\d+", atag["href"])[0])
+        cols = self.MAIN_DF_COLUMNS + \
+            self.PLEMIUS_COLUMNS if self.login else self.MAIN_DF_COLUMNS
+        main_df = pd.DataFrame(data[1:], columns=data[0])[cols]
+        main_df['race_id'] = self.race_id
+        for key, id_list in id_dict.items():
+            main_df[key] = id_list
+        return main_df, id_dict
 
     def get_race_info(self, race_id: Union[int, str] = None) -> dict:
         """レースの基本情報を取得する"""
         if race_id is not None:
             self.get_soup(race_id)
         assert self.soup is not None
+        return self.__build_race_info(
+            self.soup.find("dl", attrs={"class": "racedata fc"}),
+            self.soup.find("div", attrs={"class": "data_intro"}))
+
+    def __build_race_info(self, racedata: BeautifulSoup, data_intro: BeautifulSoup) -> dict:
         info = {'race_id': int(self.race_id)}
         # レース情報のスクレイピング
-        race_name = self.soup.find(
-            "dl", attrs={"class": "racedata fc"}).find('h1').text
-        data_intro = self.soup.find(
-            "div", attrs={"class": "data_intro"}).find_all("p")
+        race_name = racedata.find('h1').text
+        data_intro = data_intro.find_all("p")
         # 情報の整理
         info.update(self.__parse_racename(race_name))
         info.update(self.__parse_race_id(self.race_id))
@@ -196,29 +303,44 @@ class DatabaseScraper(NetkeibaSoupScraperBase):
             self.get_soup(race_id)
         assert self.soup is not None
         tables = self.soup.find_all('table', attrs={"class": "pay_table_01"})
-        rows = tables[0].find_all('tr') + tables[1].find_all('tr')
-        data = [[re.sub(r"\<.+?\>", "", str(col).replace('<br/>', 'br')).replace(
-            '\n', '') for col in row.findAll(['td', 'th'])] for row in rows]
-        pay_df = pd.DataFrame(data)
+        return self.__build_pay_df(tables)
+
+    def get_pay_table(self, race_id: Union[int, str] = None) -> pd.DataFrame:
+        """払い戻し情報を、払戻金や人気を整数、組番を整数のtupleにした形式で取得する。
+        列の詳細はscraping.payout.normalize_payoutsを参照。
+        """
+        return normalize_payouts(self.get_pay_df(race_id))
+
+    def __build_pay_df(self, tables: List[BeautifulSoup]) -> pd.DataFrame:
+        rows = list(iter_tags(tables[0], ('tr',))) + list(iter_tags(tables[1], ('tr',)))
         cols = ['券種', '馬番号', '払戻', '人気']
-        l = list()
-        for row in pay_df.values:
-            for i in range(len(row[1].split('br'))):
-                d = {'race_id': self.race_id}
-                for col_idx, key in enumerate(cols):
-                    if key == '券種':
-                        d[key] = row[col_idx].split('br')[0]
-                    else:
-                        d[key] = row[col_idx].split('br')[i]
-                l.append(d)
-        return pd.DataFrame(l)
+        data = list()
+        for row in rows:
+            # セルごとに1回だけ行に分け、同着などで複数行ある場合は行ごとに1件とする
+            cells = [self.__pay_cell_text(col).split('br') for col in iter_tags(row, ('td', 'th'))]
+            data += [(self.race_id, cells[0][0]) + lines for lines in zip(*cells[1:len(cols)])]
+        return pd.DataFrame(data, columns=['race_id'] + cols)
+
+    def __pay_cell_text(self, col: BeautifulSoup) -> str:
+        # タグを取り除き、改行(<br/>)は'br'に置き換えたテキスト
+        texts = list()
+        for node in col.descendants:
+            if isinstance(node, Tag):
+                if node.name == 'br':
+                    texts.append('br')
+            elif not isinstance(node, Comment):
+                texts.append(str(node))
+        return ''.join(texts).replace('\n', '')
 
     def get_corner_df(self, race_id: Union[int, str] = None):
         if race_id is not None:
             self.get_soup(race_id)
         assert self.soup is not None
-        df = pd.read_html(
-            str(self.soup.find('table', attrs={"summary": 'コーナー通過順位'})))[0]
+        return self.__build_corner_df(
+            self.soup.find('table', attrs={"summary": 'コーナー通過順位'}))
+
+    def __build_corner_df(self, table: BeautifulSoup) -> pd.DataFrame:
+        df = read_table(table)
         df.columns = ['コーナー', '通過順']
         return df
 
@@ -226,17 +348,179 @@ class DatabaseScraper(NetkeibaSoupScraperBase):
         if race_id is not None:
             self.get_soup(race_id)
         assert self.soup is not None
-        df = pd.read_html(
-            str(self.soup.find('table', attrs={"summary": 'ラップタイム'})))[0].T
+        return self.__build_laptime_df(
+            self.soup.find('table', attrs={"summary": 'ラップタイム'}))
+
+    def __build_laptime_df(self, table: BeautifulSoup) -> pd.DataFrame:
+        df = read_table(table).T
         df.columns = ['ラップ', 'ペース']
         df = df.iloc[1:].reset_index(drop=True)
         return df
 
+    def parse_race(self, race_id: Union[int, str] = None) -> RaceRecord:
+        """ページを1回だけ走査して、各getメソッドで取得できる情報をまとめて取得する。
+
+        Parameters
+        ----------
+        race_id : int or str, default None
+            指定しない場合は、get_soupやset_soupで設定済みのページを利用する
+
+        Returns
+        -------
+        RaceRecord
+            払い戻し、コーナー通過順位、ラップタイムの表がページに無い場合はNoneとなる
+        """
+        if race_id is not None:
+            self.get_soup(race_id)
+        assert self.soup is not None
+        elements = self.__find_elements()
+        main_df, id_dict = self.__build_main_df(elements['main'])
+        pay_tables = elements['pay']
+        corner_table = elements['corner']
+        laptime_table = elements['laptime']
+        return RaceRecord(
+            race_id=self.race_id,
+            main_df=main_df,
+            race_info=self.__build_race_info(elements['racedata'], elements['data_intro']),
+            pay_df=self.__build_pay_df(pay_tables) if len(pay_tables) >= 2 else None,
+            corner_df=None if corner_table is None else self.__build_corner_df(corner_table),
+            laptime_df=None if laptime_table is None else self.__build_laptime_df(laptime_table),
+            horse_ids=id_dict['horse_id'],
+            jockey_ids=id_dict['jockey_id'],
+            trainer_ids=id_dict['trainer_id'],
+            owner_ids=id_dict['owner_id'])
+
+    def scrape_many(self, race_ids: List[Union[int, str]], workers: int = None, fetch_workers: int = 8,
+                    ordered: bool = True, return_exceptions: bool = False,
+                    stats: PipelineStats = None, journal: CrawlJournal = None) -> Iterator[RaceRecord]:
+        """複数のレースを、取得はスレッドで、パースはプロセスで並行に処理し、RaceRecordを順次返す。
+
+        Parameters
+        ----------
+        race_ids : List[int or str]
+            12桁のレースIDのリスト
+        workers : int, default None
+            パースに利用するプロセス数。Noneの場合はCPUのコア数。0の場合はこのプロセスでパースする。
+        fetch_workers : int, default 8
+            取得に利用するスレッド数。リクエストの頻度はtransportのrate_limiterで制限される。
+        ordered : bool, default True
+            Trueの場合はrace_idsと同じ順番で、Falseの場合は完了した順番で返す
+        return_exceptions : bool, default False
+            Trueの場合は、失敗したレースについてRaceRecordの代わりに例外を返す
+        stats : PipelineStats, default None
+            取得とパースそれぞれのスループットを記録する。各プールの大きさを決める参考にする。
+        journal : CrawlJournal, default None
+            指定した場合は、取得済みのレースを飛ばし、各レースの結果を記録する。
+            中断しても、同じjournalを指定して呼び出せば続きから再開できる。
+
+        Yields
+        -------
+        RaceRecord
+            レース結果の表が無いページの場合はNone
+
+        Examples
+        ----------
+        >>> stats = PipelineStats()
+        >>> for record in scraper.scrape_many(race_ids, workers=16, fetch_workers=32, stats=stats):
+        ...     record.main_df.to_csv(f'{record.race_id}.csv')
+        >>> print(stats)
+        """
+        if journal is not None:
+            race_ids = journal.todo(race_ids)
+        parse = functools.partial(
+            _parse_race_page, parser=self.parser, parse_targets=self.PARSE_TARGETS, login=self.login)
+        for race_id, result in run_pipeline(
+                race_ids, self.__fetch_page, parse, fetch_workers=fetch_workers, parse_workers=workers,
+                ordered=ordered, return_exceptions=(journal is not None) or return_exceptions, stats=stats):
+            if journal is None:
+                yield result
+                continue
+            if isinstance(result, Exception):
+                journal.mark_failed(race_id, result)
+                if not return_exceptions:
+                    raise result
+                yield result
+                continue
+            yield result
+            # 呼び出し元が結果を処理し終えてから記録する
+            if result is None:
+                journal.mark_empty(race_id)
+            else:
+                journal.mark_done(race_id)
+
+    def __fetch_page(self, race_id: Union[int, str]):
+        page = self.transport.fetch(self.base_url.format(race_id), encoding='EUC-JP', session=self.session)
+        # エラーページはパース用のプロセスに送らずに、ここで失敗させる
+        page.raise_for_status()
+        return race_id, page
+
+    def __find_elements(self) -> dict:
+        """各getメソッドが参照する要素を、ページを1回だけ走査して探す"""
+        elements = {'main': None, 'racedata': None, 'data_intro': None,
+                    'pay': [], 'corner': None, 'laptime': None}
+
+        def set_first(key, element):
+            if elements[key] is None:
+                elements[key] = element
+
+        for element in iter_tags(self.soup, ('table', 'div', 'dl')):
+            classes = element.get('class') or []
+            if element.name == 'table':
+                summary = element.get('summary')
+                if 'race_table_01' in classes:
+                    set_first('main', element)
+                elif 'pay_table_01' in classes:
+                    elements['pay'].append(element)
+                elif summary == 'コーナー通過順位':
+                    set_first('corner', element)
+                elif summary == 'ラップタイム':
+                    set_first('laptime', element)
+            elif element.name == 'div' and 'data_intro' in classes:
+                set_first('data_intro', element)
+            elif element.name == 'dl' and ' '.join(classes) == 'racedata fc':
+                set_first('racedata', element)
+        return elements
+
+
+# パース用のプロセスごとに1つずつ作るDatabaseScraper
+_worker_scrapers: Dict[tuple, DatabaseScraper] = dict()
+
+
+def _parse_race_page(fetched: tuple, parser: str, parse_targets: list, login: bool) -> RaceRecord:
+    """`DatabaseScraper.scrape_many`のパース用プロセスで実行する関数"""
+    race_id, page = fetched
+    key = (parser, None if parse_targets is None else tuple(parse_targets), login)
+    scraper = _worker_scrapers.get(key)
+    if scraper is None:
+        scraper = DatabaseScraper(parser=parser)
+        scraper.parse_targets = parse_targets
+        scraper.login = login
+        _worker_scrapers[key] = scraper
+    scraper.set_soup(scraper._make_soup(page), race_id)
+    # 存在しないレースIDの場合は、結果の表が無いページが返ってくる
+    if scraper.soup.find('table', class_='race_table_01') is None:
+        return None
+    return scraper.parse_race()
+
+
+def _find_umabashira_table(page: Page, parser: str = "html.parser") -> BeautifulSoup:
+    # 馬柱の表(table.c1)だけをバイト列のまま切り出し、その部分だけをcp932でデコードしてパースする
+    fragments = extract_fragments_from_bytes(page.content, [('table', 'class', 'c1')], 'cp932', limit=1)
+    if len(fragments) == 0:
+        return None
+    return BeautifulSoup(fragments[0], parser).find('table')
+
+
+def _fetch_pages(transport: HttpTransport, urls: List[str], encoding: str = None,
+                 return_exceptions: bool = False) -> List[Page]:
+    return run_sync(get_fetcher(transport).gather(urls, encoding=encoding, return_exceptions=return_exceptions))
+
 
 class UmabashiraScraper(object):
     '''入力されたレースIDに従って馬柱を取得するクラス'''
 
-    def __init__(self):
+    def __init__(self, transport: HttpTransport = None):
+        self.transport = get_default_transport() if transport is None else transport
         self.base_url = 'http://jiro8.sakura.ne.jp/index.php?code={}'
 
     def get_umabashira(self, race_id: Union[str, int]) -> pd.DataFrame:
@@ -248,11 +532,45 @@ class UmabashiraScraper(object):
             8桁のレースID
         """
         code = str(race_id)[2:]
-        html = requests.get(self.base_url.format(code))
-        html.encoding = 'cp932'
-        dfs = pd.read_html(html.text)
+        html = self.transport.fetch(self.base_url.format(code), encoding='cp932')
         # TODO: 整形するコード書いておく
-        return dfs[12]
+        return self._parse_umabashira(html)
+
+    def get_umabashira_many(self, race_ids: List[Union[str, int]], return_exceptions: bool = False) -> List[pd.DataFrame]:
+        """複数のレースの馬柱を並行に取得する。
+
+        Parameters
+        ----------
+        race_ids : List[str or int]
+            レースIDのリスト
+        return_exceptions : bool, default False
+            Trueの場合は取得やパースに失敗したレースの位置に例外を入れて返す
+
+        Returns
+        -------
+        List[pd.DataFrame]
+            race_idsと同じ順番の馬柱のリスト
+        """
+        urls = [self.base_url.format(str(race_id)[2:]) for race_id in race_ids]
+        pages = _fetch_pages(self.transport, urls, encoding='cp932', return_exceptions=return_exceptions)
+        dfs = list()
+        for page in pages:
+            try:
+                if isinstance(page, Exception):
+                    raise page
+                dfs.append(self._parse_umabashira(page))
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                dfs.append(e)
+        return dfs
+
+    def _parse_umabashira(self, html: Page) -> pd.DataFrame:
+        table = _find_umabashira_table(html)
+        if table is None:
+            # 馬柱の表が見つからない場合は、従来通りページ内の13番目の表を使う
+            return pd.read_html(StringIO(html.text))[12]
+        return read_table(table)
 
 
 class UmabashiraLimitedScraper(SoupScraperBase):
@@ -260,9 +578,15 @@ class UmabashiraLimitedScraper(SoupScraperBase):
     DatabaseScraperのmain_dfなどと照合できるようにレースIDと馬番号だけは残し、
     main_dfやrace_infoなどに含まれている情報は抽出しない。
     '''
-
-    def __init__(self):
-        super().__init__(login_url=None, login_info=None)
+    # 馬柱の表の先頭20行の項目名。表は馬が列、項目が行になっている
+    ROW_LABELS = [
+        '枠番', '馬番', '馬名', '性齢', '斤量', '騎手', '調教師', '着順',
+        'オッズ(人気)', 'タイム', 'ペース脚質3F', 'コーナー順位', '体重(増減)',
+        '先行指数', 'ペース指数', '上がり指数', 'スピード指数',
+        '本紙)独自指数', 'SP指数補正後', '前走の指数']
+
+    def __init__(self, transport: HttpTransport = None):
+        super().__init__(login_url=None, login_info=None, transport=transport)
         self.base_url = 'http://jiro8.sakura.ne.jp/index.php?code={}'
         self.cols = [
             'race_id', '馬番', 'ペース脚質3F', 'コーナー順位',
@@ -271,22 +595,58 @@ class UmabashiraLimitedScraper(SoupScraperBase):
 
     def get_umabashira(self, race_id: Union[str, int]) -> pd.DataFrame:
         code = str(race_id)[2:]
-        soup = self._get_soup(self.base_url.format(code))
-        table = soup.find('table', attrs={"class": 'c1'})
-        df = pd.read_html(str(table))[0]
-        df = df.T.iloc[:-1, :20]
-        df.columns = [
-            '枠番', '馬番', '馬名', '性齢', '斤量', '騎手', '調教師', '着順',
-            'オッズ(人気)', 'タイム', 'ペース脚質3F', 'コーナー順位', '体重(増減)',
-            '先行指数', 'ペース指数', '上がり指数', 'スピード指数',
-            '本紙)独自指数', 'SP指数補正後', '前走の指数']
+        html = self.transport.fetch(self.base_url.format(code), encoding='cp932')
+        return self._parse_umabashira(html, race_id)
+
+    def get_umabashira_many(self, race_ids: List[Union[str, int]], return_exceptions: bool = False) -> List[pd.DataFrame]:
+        """複数のレースの馬柱を並行に取得する。
+
+        Parameters
+        ----------
+        race_ids : List[str or int]
+            レースIDのリスト
+        return_exceptions : bool, default False
+            Trueの場合は取得やパースに失敗したレースの位置に例外を入れて返す
+
+        Returns
+        -------
+        List[pd.DataFrame]
+            race_idsと同じ順番の、get_umabashiraと同じ形式のDataFrameのリスト
+        """
+        urls = [self.base_url.format(str(race_id)[2:]) for race_id in race_ids]
+        pages = _fetch_pages(self.transport, urls, encoding='cp932', return_exceptions=return_exceptions)
+        dfs = list()
+        for race_id, page in zip(race_ids, pages):
+            try:
+                if isinstance(page, Exception):
+                    raise page
+                dfs.append(self._parse_umabashira(page, race_id))
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                dfs.append(e)
+        return dfs
+
+    def _parse_umabashira(self, html: Page, race_id: Union[str, int]) -> pd.DataFrame:
+        table = _find_umabashira_table(html, self.parser)
+        if table is None:
+            raise ValueError(f'馬柱の表が見つかりませんでした: {race_id}')
+        # 表を転置したDataFrameを、行ごとのセルから直接作る。右端の列は項目名なので除く
+        data = dict()
+        for label, row in zip(self.ROW_LABELS, table_texts(table)):
+            data[label] = row[:-1]
+        df = pd.DataFrame(data, dtype=object)
         df['race_id'] = race_id
         return df[self.cols].copy()
 
 
 class RaceidScraper(NetkeibaSoupScraperBase):
-    def __init__(self):
-        super().__init__(base_url="https://db.netkeiba.com/race/list/{}")
+    # 月ごとの開催カレンダー。開催日にはkaisai_date=YYYYMMDDのリンクが付いている
+    CALENDAR_URL = "https://race.netkeiba.com/top/calendar.html?year={}&month={}"
+
+    def __init__(self, transport: HttpTransport = None):
+        super().__init__(
+            base_url="https://db.netkeiba.com/race/list/{}", transport=transport)
 
     def get_raceID_list_from_date(self, date: datetime.date) -> List[int]:
         """指定した日付に開催されたレースのレースID
@@ -309,16 +669,176 @@ class RaceidScraper(NetkeibaSoupScraperBase):
         #     warnings.warn('直近のレースは情報が更新されていない場合があります')
         date = f'{date.year:04}{date.month:02}{date.day:02}'
         self.get_soup(date)
-        race_list = self.soup.find('div', attrs={"class": 'race_list fc'})
+        return self._parse_raceID_list(self.soup)
+
+    @staticmethod
+    def _parse_raceID_list(soup: BeautifulSoup) -> List[int]:
+        race_list = soup.find('div', attrs={"class": 'race_list fc'})
         if race_list is None:
             return list()
-        a_tag_list = race_list.find_all('a')
-        href_list = [a_tag.get('href') for a_tag in a_tag_list]
         race_id_list = list()
-        for href in href_list:
-            for s in re.findall('[0-9]{12}', href):
+        for a_tag in iter_tags(race_list, ('a',)):
+            for s in re.findall('[0-9]{12}', a_tag.get('href', '')):
                 race_id_list.append(int(s))
-        return list(set(race_id_list))
+        return sorted(set(race_id_list))
+
+    @staticmethod
+    def _parse_calendar(soup: BeautifulSoup, year: int, month: int) -> List[datetime.date]:
+        table = soup.find('table', attrs={'class': 'Calendar_Table'})
+        if table is None:
+            # カレンダーが読めない場合は、従来通り月の全ての日付を対象にする
+            n_days = calendar.monthrange(year, month)[1]
+            return [datetime.date(year, month, day) for day in range(1, n_days + 1)]
+        dates = set()
+        for a_tag in iter_tags(table, ('a',)):
+            for s in re.findall(r'kaisai_date=([0-9]{8})', a_tag.get('href', '')):
+                date = datetime.datetime.strptime(s, '%Y%m%d').date()
+                # 前後の月の日付が表示されている場合があるので除く
+                if (date.year, date.month) == (year, month):
+                    dates.add(date)
+        return sorted(dates)
+
+    def get_race_dates(self, year: int, month: int) -> List[datetime.date]:
+        """開催カレンダーから、指定した年月にレースが開催された日付を取得する
+
+        Parameters
+        ----------
+        year : int
+        month : int
+
+        Returns
+        -------
+        List[datetime.date]
+            開催日のリスト。カレンダーが取得できない形式だった場合は、月の全ての日付。
+        """
+        soup = self._get_soup(self.CALENDAR_URL.format(year, month), encoding='EUC-JP')
+        return self._parse_calendar(soup, year, month)
+
+    async def aget_race_dates(self, start: datetime.date, end: datetime.date) -> List[datetime.date]:
+        """`get_race_dates`の非同期版。start以上end以下の開催日を、各月のカレンダーを並行に取得して返す。"""
+        months = list()
+        month = datetime.date(start.year, start.month, 1)
+        while month <= end:
+            months.append(month)
+            month += relativedelta.relativedelta(months=1)
+        soups = await self._agather_soups(
+            [self.CALENDAR_URL.format(m.year, m.month) for m in months], encoding='EUC-JP')
+        dates = list()
+        for m, soup in zip(months, soups):
+            dates += [d for d in self._parse_calendar(soup, m.year, m.month) if start <= d <= end]
+        return dates
+
+    async def aget_raceID_dict(self, start: datetime.date, end: datetime.date) -> Dict[datetime.date, List[int]]:
+        """start以上end以下の開催日ごとのレースIDを、開催日をキーとする辞書で返す"""
+        dates = await self.aget_race_dates(start, end)
+        soups = await self.afetch_many([f'{d.year:04}{d.month:02}{d.day:02}' for d in dates])
+        return {date: self._parse_raceID_list(soup) for date, soup in zip(dates, soups)}
+
+    async def aget_raceID_list(self, start: datetime.date, end: datetime.date) -> List[int]:
+        """`get_raceID_list`の非同期版"""
+        race_id_dict = await self.aget_raceID_dict(start, end)
+        return list(itertools.chain.from_iterable(race_id_dict.values()))
+
+    def get_raceID_list(self, start: datetime.date, end: datetime.date, sleep_time: float = None) -> List[int]:
+        """start以上end以下の期間に開催された全レースのレースIDを取得する。
+        月ごとの開催カレンダーで開催日を調べ、開催日のページだけを並行に取得する。
+
+        Parameters
+        ----------
+        start : datetime.date
+            期間の初日
+        end : datetime.date
+            期間の最終日
+        sleep_time : float, default None
+            このメソッドの間だけ使うリクエスト間隔の下限[秒]。Noneの場合は既存のレート制限の設定に従う。
+
+        Returns
+        -------
+        List[int]
+            日付順に並べたレースIDのリスト
+
+        Examples
+        ----------
+        >>> scraper = RaceidScraper()
+        >>> race_ids = scraper.get_raceID_list(datetime.date(2021, 4, 1), datetime.date(2021, 6, 30))
+        """
+        with self._request_interval(sleep_time, self.base_url, self.CALENDAR_URL):
+            return run_sync(self.aget_raceID_list(start, end))
+
+    def _add_to_index(self, index: RaceIdIndex, start: datetime.date, end: datetime.date,
+                      sleep_time: float = None) -> int:
+        with self._request_interval(sleep_time, self.base_url, self.CALENDAR_URL):
+            race_id_dict = run_sync(self.aget_raceID_dict(start, end))
+        race_ids, dates = list(), list()
+        for date, ids in race_id_dict.items():
+            race_ids += ids
+            dates += [date] * len(ids)
+        return index.add(race_ids, dates)
+
+    def update_index(self, index: RaceIdIndex, end: datetime.date = None, sleep_time: float = None,
+                     start: datetime.date = None) -> int:
+        """RaceIdIndexに記録された最後の開催日の翌日からendまでのレースIDを取得し、indexに追加する。
+        開催日が1件も記録されていない場合は、登録されている最も新しい年の1月1日から取得する。
+        それより前の年の開催日はbackfill_indexで埋めること。
+
+        Parameters
+        ----------
+        index : RaceIdIndex
+            追加先のRaceIdIndex。保存はしないので、必要に応じてindex.saveを呼び出すこと。
+        end : datetime.date, default None
+            取得する期間の最終日。Noneの場合は今日。
+        sleep_time : float, default None
+            このメソッドの間だけ使うリクエスト間隔の下限[秒]。Noneの場合は既存のレート制限の設定に従う。
+        start : datetime.date, default None
+            取得する期間の初日。Noneの場合はindexから決める。
+
+        Returns
+        -------
+        int
+            新たに追加したレースIDの数
+        """
+        end = datetime.date.today() if end is None else end
+        if start is None:
+            if index.last_date is not None:
+                start = index.last_date + datetime.timedelta(days=1)
+            elif index.last_year is not None:
+                start = datetime.date(index.last_year, 1, 1)
+            else:
+                raise ValueError('index is empty; build it with RaceIdIndex.from_text first')
+        if start > end:
+            return 0
+        return self._add_to_index(index, start, end, sleep_time)
+
+    def backfill_index(self, index: RaceIdIndex, years: Iterable[int] = None, sleep_time: float = None) -> int:
+        """開催日が不明なレースIDがある年について、1年分の開催日を取得してindexの開催日を埋める。
+        RaceIdIndex.from_textで作った直後のindexは全ての開催日が不明なので、betweenを使う前に呼び出す。
+
+        Parameters
+        ----------
+        index : RaceIdIndex
+            開催日を埋めるRaceIdIndex。保存はしないので、必要に応じてindex.saveを呼び出すこと。
+        years : Iterable[int], default None
+            対象の年。Noneの場合は開催日が不明なレースIDがある全ての年。
+            開催日が全て分かっている年は指定しても取得しない。
+        sleep_time : float, default None
+            このメソッドの間だけ使うリクエスト間隔の下限[秒]。Noneの場合は既存のレート制限の設定に従う。
+
+        Returns
+        -------
+        int
+            開催日を埋めたレースIDの数。取得した期間に未登録のレースIDがあれば、それも追加する。
+        """
+        undated_years = index.undated_years()
+        if years is not None:
+            undated_years = sorted(set(undated_years) & set(years))
+        today = datetime.date.today()
+        n_undated = int((index.data['date'] == 0).sum())
+        for year in undated_years:
+            start = datetime.date(year, 1, 1)
+            if start > today:
+                continue
+            self._add_to_index(index, start, min(datetime.date(year, 12, 31), today), sleep_time)
+        return n_undated - int((index.data['date'] == 0).sum())
 
     def get_monthly_raceID_list(self, year: int, month: int, sleep_time: float = 1, leave: bool = True) -> List[str]:
         """指定した年月、1ヶ月の間に開催された全レースのレースIDを取得する
@@ -327,39 +847,38 @@ class RaceidScraper(NetkeibaSoupScraperBase):
         ----------
         year : int
         month : int
-        sleep_time : float, default True
-            スクレイピングの際1回ごとに発生する待機時間
+        sleep_time : float, default 1
+            このメソッドの間だけ使うリクエスト間隔の下限[秒]。Noneの場合は既存のレート制限の設定に従う。
         leave : bool, default True
-            Falseを指定すると、終了したら進捗バーを消すようにできる
+            互換性のために残している引数。開催日のページは並行に取得するため進捗バーは表示しない。
 
         Returns
         -------
         List[str]
             レースIDのリスト
         """
-        today = datetime.date(year, month, 1)
-        race_id_list = list()
-        for _ in tqdm(range(31), leave=leave):
-            race_id_list += self.get_raceID_list_from_date(today)
-            today = today + relativedelta.relativedelta(days=1)
-            time.sleep(sleep_time)
-        return race_id_list
+        return self.get_raceID_list(
+            datetime.date(year, month, 1),
+            datetime.date(year, month, calendar.monthrange(year, month)[1]),
+            sleep_time=sleep_time)
 
-    def get_yearly_raceID_list(self, year, sleep_time, leave=True) -> list:
+    def get_yearly_raceID_list(self, year, sleep_time=1, leave=True) -> list:
         race_id_list = list()
-        for i in range(12):
-            race_id_list += self.get_monthly_raceID_list(
-                year, month=i+1, sleep_time=sleep_time, leave=leave)
+        for i in tqdm(range(12), leave=leave):
+            race_id_list += self.get_raceID_list(
+                datetime.date(year, i + 1, 1),
+                datetime.date(year, i + 1, calendar.monthrange(year, i + 1)[1]),
+                sleep_time=sleep_time)
         return race_id_list
 
 
 class HorseResultsScraper(NetkeibaSoupScraperBase):
     '''馬の過去成績データをスクレイピングするクラス'''
 
-    def __init__(self, user_id=None, password=None):
+    def __init__(self, user_id=None, password=None, transport=None):
         super().__init__(
             base_url='https://db.netkeiba.com/horse/{}',
-            user_id=user_id, password=password)
+            user_id=user_id, password=password, transport=transport)
 
     def get_horseresults(self, horse_id):
         """
@@ -375,16 +894,99 @@ class HorseResultsScraper(NetkeibaSoupScraperBase):
         """
 
         soup = self.get_soup(horse_id)
-        table = soup.find('table', attrs={"class": "db_h_race_results"})
-        df = pd.read_html(str(table), flavor="bs4")[0]
-        columns = df.columns.values.tolist()
-        new_columns = ['horse_id'] + columns
-        df['horse_id'] = horse_id
-        return df[new_columns]
+        return self._parse_horseresults(soup, horse_id)
+
+    def get_horseresults_many(self, horse_ids: List[Union[str, int]]) -> List[pd.DataFrame]:
+        """複数の馬の過去成績データを並行に取得する。
+
+        Parameters:
+        ----------
+        horse_ids : List[Union[str, int]]
+            馬IDのリスト
+
+        Returns:
+        ----------
+        List[pandas.DataFrame]
+            horse_idsと同じ順番の過去成績データのリスト
+        """
+        soups = self.fetch_many(horse_ids)
+        return [self._parse_horseresults(soup, horse_id)
+                for horse_id, soup in zip(horse_ids, soups)]
+
+    def update_history(self, store: HorseHistoryStore, horse_ids: List[Union[str, int]] = None,
+                       batch_size: int = 100, leave: bool = True) -> int:
+        """HorseHistoryStoreで取得し直す必要があるとされた馬だけを取得し、新しい成績を追記する。
+        取得に失敗した馬は記録を更新しないので、次回の呼び出しで再び取得する。
+
+        Parameters
+        ----------
+        store : HorseHistoryStore
+            observeやobserve_recordsで出走した馬を記録済みのHorseHistoryStore
+        horse_ids : List[str or int], default None
+            指定した場合は、store.staleに含まれるもののうち、この中の馬だけを取得する
+        batch_size : int, default 100
+            並行に取得する馬の数
+        leave : bool, default True
+            Falseを指定すると、終了したら進捗バーを消すようにできる
+
+        Returns
+        -------
+        int
+            追記した行数
+        """
+        targets = store.stale()
+        if horse_ids is not None:
+            wanted = {str(horse_id) for horse_id in horse_ids}
+            targets = [horse_id for horse_id in targets if horse_id in wanted]
+        n = 0
+        for i in tqdm(range(0, len(targets), batch_size), leave=leave):
+            batch = targets[i:i + batch_size]
+            for horse_id, soup in zip(batch, self.fetch_many(batch, return_exceptions=True)):
+                if isinstance(soup, Exception):
+                    continue
+                try:
+                    df = self._parse_horseresults(soup, horse_id)
+                except ValueError:
+                    # 成績の表が無いページ
+                    continue
+                n += store.update(horse_id, df)
+        return n
+
+    def _parse_horseresults(self, soup: BeautifulSoup, horse_id: Union[str, int]) -> pd.DataFrame:
+        return _build_horseresults(soup, horse_id)
+
+
+def _build_horseresults(soup: BeautifulSoup, horse_id: Union[str, int]) -> pd.DataFrame:
+    # HorseResultsScraperとHorseDataScraper.get_profileで共通の、馬のページの成績の表のパース
+    table = soup.find('table', attrs={"class": "db_h_race_results"})
+    if table is None:
+        raise ValueError(f'成績の表が見つかりませんでした: {horse_id}')
+    df = read_table(table)
+    df.insert(0, 'horse_id', horse_id)
+    return df
+
+
+@dataclass
+class HorseProfile:
+    '''HorseDataScraper.get_profileで取得した1頭分の情報'''
+    horse_id: Union[int, str]
+    name: str = None
+    sex: str = None
+    birthday: str = None
+    trainer: str = None
+    trainer_id: str = None
+    owner: str = None
+    owner_id: str = None
+    breeder: str = None
+    breeder_id: str = None
+    results: pd.DataFrame = None
 
 
 class HorseDataScraper(SoupScraperBase):
     '''馬の情報をスクレイピングするクラス'''
+    HORSE_URL = 'https://db.netkeiba.com/horse/{}/'
+    # プロフィールの表の見出しと、HorseProfileの属性名の対応
+    PROFILE_LINKS = {'調教師': 'trainer', '馬主': 'owner', '生産者': 'breeder'}
 
     def get_sex(self, horse_id: Union[int, str]) -> str:
         """性別をスクレイピングするメソッド
@@ -392,19 +994,17 @@ class HorseDataScraper(SoupScraperBase):
         Parameters
         ----------
         horse_id : Union[int, str]
-            _description_
+            馬ID
 
         Returns
         -------
         str
-            _description_
+            セ、牡、牝のいずれか
         """
-        base_url = 'https://db.netkeiba.com/horse/{}/'
-        soup = self._get_soup(base_url.format(horse_id), encoding='EUC-JP')
-        s = soup.find('p', attrs={"class": "txt_01"})
-        cont = re.findall('[セ牡牝]', s.text)
-        assert len(cont) != 0, '性別が判定できませんでした'
-        return cont[0]
+        soup = self._get_soup(self.HORSE_URL.format(horse_id), encoding='EUC-JP')
+        sex = self._parse_sex(soup)
+        assert sex is not None, '性別が判定できませんでした'
+        return sex
 
     def get_birthday(self, horse_id: Union[int, str]) -> str:
         """誕生日をスクレイピングするメソッド
@@ -417,15 +1017,120 @@ class HorseDataScraper(SoupScraperBase):
         Returns
         -------
         str
-            2016-07-16など、日付を表す文字列
+            2016-07-16など、日付を表す文字列。ページから取得できない場合はValueErrorとなる。
+        """
+        soup = self._get_soup(self.HORSE_URL.format(horse_id), encoding='EUC-JP')
+        birthday = self._parse_profile_table(soup).get('birthday')
+        if birthday is None:
+            raise ValueError(f'誕生日が取得できませんでした: {horse_id}')
+        return birthday
+
+    def get_profile(self, horse_id: Union[int, str]) -> HorseProfile:
+        """馬のページを1回だけ取得して、性別、誕生日、調教師、馬主、生産者、過去成績をまとめて取得する。
+
+        Parameters
+        ----------
+        horse_id : Union[int, str]
+            馬ID
+
+        Returns
+        -------
+        HorseProfile
+            ページに無い項目はNoneとなる
         """
-        url = f'https://db.netkeiba.com/horse/{horse_id}/'
+        soup = self._get_soup(self.HORSE_URL.format(horse_id), encoding='EUC-JP')
+        return self._parse_profile(soup, horse_id)
+
+    def get_profiles(self, horse_ids: List[Union[int, str]], batch_size: int = 100,
+                     leave: bool = True, return_exceptions: bool = False) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """複数の馬のページを並行に取得し、プロフィールと過去成績をそれぞれ1つのDataFrameにまとめて返す。
 
-        soup = self._get_soup(url, encoding='EUC-JP')
-        html = str(soup.find('div', attrs={"class": "db_prof_area_02"}))
-        s = pd.read_html(html)[0].iloc[0, 1]
-        dt = datetime.datetime.strptime(s, '%Y年%m月%d日')
-        return dt.strftime('%Y-%m-%d')
+        Parameters
+        ----------
+        horse_ids : List[int or str]
+            馬IDのリスト
+        batch_size : int, default 100
+            並行に取得する馬の数。取得したページはこの数ごとにパースして破棄する。
+        leave : bool, default True
+            Falseを指定すると、終了したら進捗バーを消すようにできる
+        return_exceptions : bool, default False
+            Trueの場合は、取得やパースに失敗した馬もhorse_id以外をNoneにした行として残し、
+            プロフィールのDataFrameのerror列に例外を入れる。成功した馬のerror列はNoneとなる。
+
+        Returns
+        -------
+        Tuple[pd.DataFrame, pd.DataFrame]
+            horse_idsと同じ順番で1頭1行にしたプロフィールのDataFrameと、全ての馬の過去成績を縦に結合したDataFrame
+        """
+        profiles, errors = list(), list()
+        for i in tqdm(range(0, len(horse_ids), batch_size), leave=leave):
+            batch = horse_ids[i:i + batch_size]
+            urls = [self.HORSE_URL.format(horse_id) for horse_id in batch]
+            soups = run_sync(self._agather_soups(urls, encoding='EUC-JP', return_exceptions=return_exceptions))
+            for horse_id, soup in zip(batch, soups):
+                try:
+                    if isinstance(soup, Exception):
+                        raise soup
+                    profiles.append(self._parse_profile(soup, horse_id))
+                    errors.append(None)
+                except Exception as e:
+                    if not return_exceptions:
+                        raise
+                    profiles.append(HorseProfile(horse_id=horse_id))
+                    errors.append(e)
+        columns = [name for name in HorseProfile.__dataclass_fields__ if name != 'results']
+        profile_df = pd.DataFrame({name: [getattr(p, name) for p in profiles] for name in columns})
+        if return_exceptions:
+            profile_df['error'] = pd.Series(errors, index=profile_df.index, dtype=object)
+        results = [p.results for p in profiles if p.results is not None]
+        results_df = pd.concat(results, ignore_index=True) if len(results) > 0 else pd.DataFrame()
+        return profile_df, results_df
+
+    def _parse_profile(self, soup: BeautifulSoup, horse_id: Union[int, str]) -> HorseProfile:
+        profile = HorseProfile(horse_id=horse_id, sex=self._parse_sex(soup), **self._parse_profile_table(soup))
+        title = soup.find('div', attrs={"class": "horse_title"})
+        if title is not None and title.find('h1') is not None:
+            profile.name = title.find('h1').text.strip()
+        try:
+            profile.results = _build_horseresults(soup, horse_id)
+        except ValueError:
+            # 出走したことが無い馬
+            pass
+        return profile
+
+    @staticmethod
+    def _parse_sex(soup: BeautifulSoup) -> str:
+        s = soup.find('p', attrs={"class": "txt_01"})
+        cont = [] if s is None else re.findall('[セ牡牝]', s.text)
+        return cont[0] if len(cont) > 0 else None
+
+    def _parse_profile_table(self, soup: BeautifulSoup) -> dict:
+        d = dict()
+        area = soup.find('div', attrs={"class": "db_prof_area_02"})
+        if area is None:
+            return d
+        for row in iter_tags(area, ('tr',)):
+            th, td = row.find('th'), row.find('td')
+            if th is None or td is None:
+                continue
+            key = th.text.strip()
+            if key == '生年月日':
+                try:
+                    dt = datetime.datetime.strptime(td.text.strip(), '%Y年%m月%d日')
+                except ValueError:
+                    continue
+                d['birthday'] = dt.strftime('%Y-%m-%d')
+            elif key in self.PROFILE_LINKS:
+                name = self.PROFILE_LINKS[key]
+                a_tag = td.find('a')
+                if a_tag is None:
+                    d[name] = td.text.strip()
+                    continue
+                d[name] = a_tag.text.strip()
+                ids = re.findall(f'/{name}/(?:result/recent/)?([0-9a-zA-Z]+)', a_tag.get('href', ''))
+                if len(ids) > 0:
+                    d[f'{name}_id'] = ids[0]
+        return d
 
     def get_peds(self, horse_id: Union[int, str]):
         """血統データをスクレイピングするメソッド
@@ -456,6 +1161,66 @@ class HorseDataScraper(SoupScraperBase):
                         id_list.append(d)
         return pd.DataFrame(id_list)
 
+    def crawl_pedigrees(self, graph: PedigreeGraph, horse_ids: List[Union[int, str]], generations: int = 5,
+                        batch_size: int = 100, leave: bool = True) -> int:
+        """血統表のページをまとめて取得してPedigreeGraphに追加する。
+        既にgenerations世代分の血統が分かっている馬は取得しない。
+        generationsが5より大きい場合は、血統表の5代目の祖先の血統表を、必要な世代数が分かるまで続けて取得する。
+
+        Parameters
+        ----------
+        graph : PedigreeGraph
+            追加先のPedigreeGraph
+        horse_ids : List[int or str]
+            馬IDのリスト
+        generations : int, default 5
+            血統が必要な世代数
+        batch_size : int, default 100
+            並行に取得するページ数
+        leave : bool, default True
+            Falseを指定すると、終了したら進捗バーを消すようにできる
+
+        Returns
+        -------
+        int
+            取得したページ数
+        """
+        base_url = 'https://db.netkeiba.com/horse/ped/{}'
+        n_gens = len(PED_SPANS)
+        # 馬IDと、その馬について必要な世代数
+        required = {str(horse_id): generations for horse_id in horse_ids}
+        n_fetched = 0
+        while len(required) > 0:
+            targets, next_required = list(), dict()
+
+            def require_next(horse_id):
+                # 血統表の最も古い世代の祖先について、足りない世代数を次に取得する
+                rest = required[horse_id] - n_gens
+                if rest > 0:
+                    for ancestor_id in graph.generation(horse_id, n_gens):
+                        next_required[ancestor_id] = max(next_required.get(ancestor_id, 0), rest)
+
+            for horse_id, n in required.items():
+                if graph.known_depth(horse_id) >= n:
+                    continue
+                if horse_id in graph and graph.depth[graph.index(horse_id)] >= n_gens:
+                    # 血統表は取得済みなので、取得し直さずに祖先へ進む
+                    require_next(horse_id)
+                else:
+                    targets.append(horse_id)
+            for i in tqdm(range(0, len(targets), batch_size), leave=leave):
+                batch = targets[i:i + batch_size]
+                soups = run_sync(self._agather_soups([base_url.format(horse_id) for horse_id in batch]))
+                n_fetched += len(batch)
+                for horse_id, soup in zip(batch, soups):
+                    table = soup.find('table', attrs={"class": "blood_table"})
+                    if table is None:
+                        continue
+                    graph.add_pedigree(horse_id, parse_ped_table(table))
+                    require_next(horse_id)
+            required = next_required
+        return n_fetched
+
 
 class RealTimeOddsScraper(SeleniumScraperBase):
     """
@@ -465,7 +1230,8 @@ class RealTimeOddsScraper(SeleniumScraperBase):
         1: '札幌', 2: '函館', 3: '福島', 4: '新潟', 5: '東京',
         6: '中山', 7: '中京', 8: '京都', 9: '阪神', 10: '小倉'}
 
-    def __init__(self, executable_path: str, visible: bool = False, wait_time: int = 10, select_manually: bool = False):
+    def __init__(self, executable_path: str = None, visible: bool = False, wait_time: int = 10,
+                 select_manually: bool = False, driver: WebDriver = None):
         """
         Parameters
         ----------
@@ -475,6 +1241,8 @@ class RealTimeOddsScraper(SeleniumScraperBase):
             ブラウザを起動して動作させるかのフラグ
         wait_time : float, default 10
             タイムアウトまでの時間
+        driver : WebDriver, default None
+            DriverPoolから借りたブラウザなど、起動済みのブラウザを使う場合に指定する
 
         Notes
         -----
@@ -485,10 +1253,12 @@ class RealTimeOddsScraper(SeleniumScraperBase):
         * 3: レース個別ページが表示されている状態
         """
         super().__init__(executable_path=executable_path,
-                         visible=visible, wait_time=wait_time)
+                         visible=visible, wait_time=wait_time, driver=driver)
         self.URL = 'https://www.jra.go.jp/'
         self.status = 0
         self.__index_base = True
+        # 表示中の券種のタブの番号。分からない場合はNone
+        self._baken_type = None
         if select_manually:
             self.get_racecourse_list()
             print('以下の数字からレースを選択し、select_racecourseメソッドを使用してください')
@@ -505,47 +1275,24 @@ class RealTimeOddsScraper(SeleniumScraperBase):
     def get_tansho_odds(self) -> pd.DataFrame:
         assert self.status == 3
         self._select_baken_type(0)
-        dfs = self._get_odds_list()
-        d = {'馬番': 'First', '単勝': 'Odds'}
-        df = dfs[0][['馬番', '単勝']].rename(columns=d)
-        return df
+        columns, rows = self._get_odds_list()[0]
+        i, j = columns.index('馬番'), columns.index('単勝')
+        return pd.DataFrame({'First': [row[i] for row in rows], 'Odds': cells_to_array([row[j] for row in rows])})
 
     def get_umaren_odds(self):
         assert self.status == 3
         self._select_baken_type(1 + self.__index_base)
-        dfs = self._get_odds_list()
-        l = list()
-        for i, df in enumerate(dfs):
-            df.columns = ['Second', 'Odds']
-            df['First'] = i + 1
-            l.append(df)
-        df = pd.concat(l)[['First', 'Second', 'Odds']]
-        df.reset_index(drop=True, inplace=True)
-        return df
+        return self.__get_pair_odds()
 
     def get_wide_odds(self):
         assert self.status == 3
         self._select_baken_type(2 + self.__index_base)
-        dfs = self._get_odds_list()
-        l = list()
-        for i, df in enumerate(dfs):
-            df.columns = ['Second', 'Odds']
-            df['First'] = i + 1
-            l.append(df)
-        df = pd.concat(l)[['First', 'Second', 'Odds']]
-        df.reset_index(drop=True, inplace=True)
-        return df
+        return self.__get_pair_odds()
 
     def get_umatan_odds(self):
         assert self.status == 3
         self._select_baken_type(3 + self.__index_base)
-        dfs = self._get_odds_list()
-        l = list()
-        for i, df in enumerate(dfs):
-            df.columns = ['Second', 'Odds']
-            df['First'] = i + 1
-            l.append(df)
-        df = pd.concat(l)[['First', 'Second', 'Odds']]
+        df = self.__get_pair_odds()
         idx = df.First == df.Second
         df = df[~idx].reset_index(drop=True)
         return df
@@ -553,43 +1300,61 @@ class RealTimeOddsScraper(SeleniumScraperBase):
     def get_renpuku_odds(self):
         assert self.status == 3
         self._select_baken_type(4 + self.__index_base)
-        element = self._get_element(By.ID, 'odds_list')
-        dfs = pd.read_html(element.get_attribute('outerHTML'))
-        horse_num = dfs[0].iloc[:, 0].max()
+        tables = self._get_odds_list()
+        horse_num = self.__max_horse_number(tables)
         itr = itertools.combinations([i+1 for i in range(horse_num-1)], 2)
-        for i, c in enumerate(itr):
-            dfs[i].columns = ['Third', 'Odds']
-            dfs[i]['First'] = int(c[0])
-            dfs[i]['Second'] = int(c[1])
-        df = pd.concat(dfs)[['First', 'Second', 'Third', 'Odds']]
-        df = df.dropna().drop_duplicates()
-        return df.reset_index(drop=True)
+        return self.__get_trio_odds(tables, itr)
 
     def get_rentan_odds(self):
         self._select_baken_type(5 + self.__index_base)
-        element = self._get_element(By.ID, 'odds_list')
-        dfs = pd.read_html(element.get_attribute('outerHTML'))
-        horse_num = dfs[0].iloc[:, 0].max()
+        tables = self._get_odds_list()
+        horse_num = self.__max_horse_number(tables)
         itr = itertools.permutations([i+1 for i in range(horse_num)], 2)
-        for i, c in enumerate(itr):
-            dfs[i].columns = ['Third', 'Odds']
-            dfs[i]['First'] = int(c[0])
-            dfs[i]['Second'] = int(c[1])
-        df = pd.concat(dfs)[['First', 'Second', 'Third', 'Odds']]
+        return self.__get_trio_odds(tables, itr)
+
+    def __get_pair_odds(self) -> pd.DataFrame:
+        # 表の順番が1頭目の馬番で、各行が(2頭目の馬番, オッズ)
+        firsts, seconds, odds = list(), list(), list()
+        for i, (_, rows) in enumerate(self._get_odds_list()):
+            firsts += [i + 1] * len(rows)
+            seconds += [row[0] for row in rows]
+            odds += [row[1] for row in rows]
+        return pd.DataFrame({'First': firsts, 'Second': seconds, 'Odds': cells_to_array(odds)})
+
+    @staticmethod
+    def __max_horse_number(tables) -> int:
+        # 最初の表の1列目に全ての馬番が並ぶ
+        return int(max(row[0] for row in tables[0][1] if row[0] is not None))
+
+    @staticmethod
+    def __get_trio_odds(tables, itr) -> pd.DataFrame:
+        # 表の順番がitrの(1頭目, 2頭目)の順番で、各行が(3頭目の馬番, オッズ)
+        firsts, seconds, thirds, odds = list(), list(), list(), list()
+        for (first, second), (_, rows) in zip(itr, tables):
+            firsts += [first] * len(rows)
+            seconds += [second] * len(rows)
+            thirds += [row[0] for row in rows]
+            odds += [row[1] for row in rows]
+        df = pd.DataFrame({'First': firsts, 'Second': seconds, 'Third': thirds, 'Odds': cells_to_array(odds)})
         df = df.dropna().drop_duplicates()
         return df.reset_index(drop=True)
 
-    def _get_odds_list(self):
+    def _get_odds_list(self) -> List[Tuple[List[str], List[list]]]:
         assert self.status == 3
-        element = self._get_element(By.ID, 'odds_list')
-        dfs = pd.read_html(element.get_attribute('outerHTML'))
-        return dfs
+        return self._get_tables(By.ID, 'odds_list')
 
-    def _select_baken_type(self, idx: int):
+    def _select_baken_type(self, idx: int, sleep_time: float = 0.2):
+        """券種のタブを選び、オッズの表(odds_list)が描画し直されるまで待つ。
+        レースを選んだ直後は表示中のタブが分からず、表が変化しないことがあるので、sleep_timeまでしか待たない。
+        """
         assert self.status == 3
+        before = self._fingerprint(By.ID, 'odds_list')
         elements = self._get_elements(By.CLASS_NAME, 'nav')
         baken_type_list = elements[1].find_elements(By.TAG_NAME, 'li')
         self._click(baken_type_list[idx])
+        changed = self._baken_type is not None and self._baken_type != idx
+        self._wait_for_rerender(By.ID, 'odds_list', before, timeout=None if changed else sleep_time, required=changed)
+        self._baken_type = idx
 
     def get_racecourse_list(self):
         '''
@@ -612,6 +1377,7 @@ class RealTimeOddsScraper(SeleniumScraperBase):
         race_num_list = element.find_elements(By.CLASS_NAME, 'race_num')
         self._click(race_num_list[race_num])
         self.status = 3
+        self._baken_type = None
 
     def select_racecourse(self, idx):
         '''
@@ -709,42 +1475,124 @@ class RealTimeOddsScraper(SeleniumScraperBase):
         df_dict['WIDE'] = self.get_wide_odds()
         return df_dict
 
+    def poll_odds(self, poller: OddsPoller, race_id: Union[str, int], interval: float = 30, n_polls: int = None,
+                  until: float = None, sleep_time: float = 0.3) -> Iterator[Dict[str, pd.DataFrame]]:
+        """レースのオッズを一定間隔で取得し、前回から変化した組番だけを返すジェネレータ。
+        変化した組番はpoller.seriesに追記される。
+
+        Parameters
+        ----------
+        poller : OddsPoller
+        race_id : str or int
+            その週に開催されている(されていた)レースのレースID
+        interval : float, default 30
+            取得を開始する間隔[秒]
+        n_polls : int, default None
+            取得する回数。Noneの場合は制限しない。
+        until : float, default None
+            この時刻(UNIX時間[秒])を過ぎたら終了する
+        sleep_time : float, default 0.3
+            select_race_from_race_idに渡す待機時間
+
+        Examples
+        ----------
+        >>> poller = OddsPoller(OddsSeries('data/odds.bin'))
+        >>> for changes in scraper.poll_odds(poller, race_id, interval=60, until=post_time):
+        ...     print({key: len(df) for key, df in changes.items()})
+        """
+        self.select_race_from_race_id(race_id, sleep_time)
+        return poller.poll(self.get_odds_df_dict, race_id, interval=interval, n_polls=n_polls, until=until)
+
+    @classmethod
+    def get_odds_df_dict_many(cls, pool: DriverPool, race_ids: List[Union[str, int]], sleep_time: float = 0.3,
+                              return_exceptions: bool = False) -> Dict[str, Dict[str, pd.DataFrame]]:
+        """複数のレースのオッズを、DriverPoolのブラウザで並行に取得する。
+
+        Parameters
+        ----------
+        pool : DriverPool
+        race_ids : List[str or int]
+            その週に開催されている(されていた)レースのレースID
+        sleep_time : float, default 0.3
+            select_race_from_race_idに渡す待機時間
+        return_exceptions : bool, default False
+            Trueの場合は、失敗したレースの結果を例外オブジェクトとして返す
+
+        Returns
+        -------
+        Dict[str, Dict[str, pd.DataFrame]]
+            レースIDをキーとする、get_odds_df_dictの戻り値の辞書
+        """
+        def scrape(driver, race_id):
+            scraper = cls(driver=driver, wait_time=pool.wait_time)
+            scraper.select_race_from_race_id(race_id, sleep_time)
+            return scraper.get_odds_df_dict()
+        results = pool.map(scrape, race_ids, return_exceptions=return_exceptions)
+        return {str(race_id): result for race_id, result in zip(race_ids, results)}
+
 
 class OddsScraper(SeleniumScraperBase):
-    def __init__(self, executable_path, visible=False, wait_time=10):
+    def __init__(self, executable_path=None, visible=False, wait_time=10, driver: WebDriver = None):
         super().__init__(executable_path=executable_path,
-                         visible=visible, wait_time=wait_time)
+                         visible=visible, wait_time=wait_time, driver=driver)
         self.ODDS_URL = 'https://race.netkeiba.com/odds/index.html?race_id={}&rf=race_submenu'
+        # 表示中の券種のタブのID。ページを開いた直後など、分からない場合はNone
+        self._tab = None
 
     def visit_page(self, race_id: Union[str, int]):
         self._visit_page(self.ODDS_URL.format(race_id))
+        self._tab = None
+
+    def _select_tab(self, tab_id: str, by, text, sleep_time: float = 0.2) -> None:
+        """券種のタブを選び、オッズの表(by, text)が描画し直されるまで待つ。
+        表示中のタブが分からない場合や同じタブを選び直す場合は、表が変化しないことがあるので、
+        sleep_timeまでしか待たない。
+        """
+        before = self._fingerprint(by, text)
+        self._click(self._get_element(By.ID, tab_id))
+        changed = self._tab is not None and self._tab != tab_id
+        self._wait_for_rerender(by, text, before, timeout=None if changed else sleep_time, required=changed)
+        self._tab = tab_id
+
+    def _select_axis(self, axis_horse_number: int) -> None:
+        """3連複・3連単の軸馬を選び、オッズの表が描画し直されるまで待つ"""
+        dropdown = self._get_element(By.ID, "list_select_horse")
+        select = Select(dropdown)
+        if select.first_selected_option.get_attribute('value') == str(axis_horse_number):
+            return
+        before = self._fingerprint(By.CLASS_NAME, "GraphOdds")
+        select.select_by_value(str(axis_horse_number))
+        self._wait_for_rerender(By.CLASS_NAME, "GraphOdds", before, required=True)
 
     def get_tansho_odds(self, sleep_time=0.2) -> pd.DataFrame:
         # 単勝/複勝
-        element = self._get_element(By.ID, "odds_navi_b1")
-        self._click(element)
-        time.sleep(sleep_time)
+        self._select_tab("odds_navi_b1", By.CLASS_NAME, "RaceOdds_HorseList_Table", sleep_time)
         tansho_df = self.__get_tanpuku_odds(0)
         return tansho_df
 
     def get_fukusho_odds(self, sleep_time=0.2) -> pd.DataFrame:
         # 複勝
-        element = self._get_element(By.ID, "odds_navi_b1")
-        self._click(element)
-        time.sleep(sleep_time)
+        self._select_tab("odds_navi_b1", By.CLASS_NAME, "RaceOdds_HorseList_Table", sleep_time)
         tansho_df = self.__get_tanpuku_odds(1)
         return tansho_df
 
     def __get_tanpuku_odds(self, idx) -> pd.DataFrame:
         # 0なら単勝、1なら複勝のテーブルを取得
-        elements = self._get_elements(
-            By.CLASS_NAME, "RaceOdds_HorseList_Table")
-        df = pd.read_html(elements[idx].get_attribute('outerHTML'))[0]
-        cols = [col.replace(' ', '') for col in df.columns]
-        df.columns = cols
-        tanpuku_df = df[['馬番', 'オッズ']]
-        tanpuku_df.columns = ['First', 'Odds']
-        return tanpuku_df
+        columns, rows = self._get_tables(
+            By.XPATH, "(//*[contains(concat(' ', normalize-space(@class), ' '), ' RaceOdds_HorseList_Table ')])"
+                      f"[{idx + 1}]")[0]
+        cols = [col.replace(' ', '') for col in columns]
+        i, j = cols.index('馬番'), cols.index('オッズ')
+        return pd.DataFrame({'First': [row[i] for row in rows], 'Odds': cells_to_array([row[j] for row in rows])})
+
+    def __get_graph_odds(self) -> Tuple[list, list, list]:
+        # GraphOddsの表ごとに、見出しの馬番と、各行の(相手の馬番, オッズ)を並べる
+        heads, legs, odds = list(), list(), list()
+        for columns, rows in self._get_tables(By.CLASS_NAME, "GraphOdds"):
+            heads += [int(columns[0])] * len(rows)
+            legs += [row[0] for row in rows]
+            odds += [row[1] for row in rows]
+        return heads, legs, odds
 
     def get_wakuren_odds(self) -> pd.DataFrame:
         # 枠連
@@ -754,125 +1602,55 @@ class OddsScraper(SeleniumScraperBase):
 
     def get_umaren_odds(self, sleep_time: float = 0.2) -> pd.DataFrame:
         # 馬連
-        element = self._get_element(By.ID, "odds_navi_b4")
-        self._click(element)
-        time.sleep(sleep_time)
-        element = self._get_element(By.CLASS_NAME, "GraphOdds")
-        dfs = pd.read_html(element.get_attribute('outerHTML'))
-        first_list = [int(df.columns.values[0]) for df in dfs]
-        umaren_df_list = [df.iloc[:, :2] for df in dfs]
-        for i in range(len(umaren_df_list)):
-            umaren_df_list[i].columns = ['Second', 'Odds']
-            umaren_df_list[i]['First'] = first_list[i]
-            umaren_df_list[i] = umaren_df_list[i][['First', 'Second', 'Odds']]
-        umaren_df = pd.concat(umaren_df_list, axis=0)
+        self._select_tab("odds_navi_b4", By.CLASS_NAME, "GraphOdds", sleep_time)
+        first, second, odds = self.__get_graph_odds()
+        umaren_df = pd.DataFrame({'First': first, 'Second': second, 'Odds': cells_to_array(odds)})
         return umaren_df
 
     def get_wide_odds(self, sleep_time: float = 0.2) -> pd.DataFrame:
         # ワイド
-        element = self._get_element(By.ID, "odds_navi_b5")
-        self._click(element)
-        time.sleep(sleep_time)
-        element = self._get_element(By.CLASS_NAME, 'GraphOdds')
-        dfs = pd.read_html(element.get_attribute('outerHTML'))
-        first_list = [int(df.columns.values[0]) for df in dfs]
-        wide_df_list = [df.iloc[:, :2] for df in dfs]
-        for i in range(len(wide_df_list)):
-            wide_df_list[i].columns = ['Second', 'Odds']
-            wide_df_list[i]['First'] = first_list[i]
-            wide_df_list[i] = wide_df_list[i][['First', 'Second', 'Odds']]
-        wide_df = pd.concat(wide_df_list, axis=0)
+        self._select_tab("odds_navi_b5", By.CLASS_NAME, "GraphOdds", sleep_time)
+        first, second, odds = self.__get_graph_odds()
+        wide_df = pd.DataFrame({'First': first, 'Second': second, 'Odds': cells_to_array(odds)})
         return wide_df
 
     def get_umatan_odds(self, sleep_time: float = 0.2) -> pd.DataFrame:
         # 馬単
-        element = self._get_element(By.ID, "odds_navi_b6")
-        self._click(element)
-        time.sleep(sleep_time)
-        element = self._get_element(By.CLASS_NAME, "GraphOdds")
-        dfs = pd.read_html(element.get_attribute('outerHTML'))
-        first_list = [int(df.columns.values[0]) for df in dfs]
-        batan_df_list = [df.iloc[:, :2] for df in dfs]
-        for i in range(len(batan_df_list)):
-            batan_df_list[i].columns = ['Second', 'Odds']
-            batan_df_list[i]['First'] = first_list[i]
-            batan_df_list[i] = batan_df_list[i][['First', 'Second', 'Odds']]
-        batan_df = pd.concat(batan_df_list, axis=0)
+        self._select_tab("odds_navi_b6", By.CLASS_NAME, "GraphOdds", sleep_time)
+        first, second, odds = self.__get_graph_odds()
+        batan_df = pd.DataFrame({'First': first, 'Second': second, 'Odds': cells_to_array(odds)})
         return batan_df
 
-    def get_renpuku_odds(self, sleep_time: float = 0.2) -> pd.DataFrame:
-        # 3連複
-        element = self._get_element(By.ID, "odds_navi_b7")
-        self._click(element)
+    def __get_trio_odds(self) -> pd.DataFrame:
+        # 軸馬ごとにGraphOddsを読み、(軸馬, 見出しの馬番, 行の馬番, オッズ)を並べる
         dropdown = self._get_element(By.ID, "list_select_horse")
         select = Select(dropdown)
         num = len(select.options)
-        # スクレイピング
-        dfs_list = list()
+        firsts, seconds, thirds, odds = list(), list(), list(), list()
         for axis_horse_number in range(1, num):
             if axis_horse_number > 1:
                 # 軸馬の選択・変更 dropdown select状態にする
-                dropdown = self._get_element(By.ID, "list_select_horse")
-                select = Select(dropdown)
-                select.select_by_value(str(axis_horse_number))
-            time.sleep(sleep_time)
-            element = self._get_element(By.CLASS_NAME, "GraphOdds")
-            dfs = pd.read_html(element.get_attribute('outerHTML'))
-            dfs_list.append(dfs)
-        # 整形
-        renpuku_concat_df_list = list()
-        for uma, dfs in enumerate(dfs_list):
-            uma += 1
-            second_list = [int(df.columns.values[0]) for df in dfs]
-            renpuku_df_list = [df.iloc[:, :2] for df in dfs]
-            for i in range(len(renpuku_df_list)):
-                renpuku_df_list[i].columns = ['Third', 'Odds']
-                renpuku_df_list[i]['First'] = uma
-                renpuku_df_list[i]['Second'] = second_list[i]
-                renpuku_df_list[i] = renpuku_df_list[i][[
-                    'First', 'Second', 'Third', 'Odds']]
-            renpuku_concat_df_list.append(pd.concat(renpuku_df_list, axis=0))
-        renpuku_df = pd.concat(renpuku_concat_df_list, axis=0)
+                self._select_axis(axis_horse_number)
+            heads, legs, values = self.__get_graph_odds()
+            firsts += [axis_horse_number] * len(heads)
+            seconds += heads
+            thirds += legs
+            odds += values
+        return pd.DataFrame({'First': firsts, 'Second': seconds, 'Third': thirds, 'Odds': cells_to_array(odds)})
+
+    def get_renpuku_odds(self, sleep_time: float = 0.2) -> pd.DataFrame:
+        # 3連複
+        self._select_tab("odds_navi_b7", By.CLASS_NAME, "GraphOdds", sleep_time)
+        renpuku_df = self.__get_trio_odds()
         # 着順をソートして重複を削除
-        values = renpuku_df.iloc[:, :3].values
-        values.sort()
-        renpuku_df[renpuku_df.columns[:3]] = values
+        renpuku_df[renpuku_df.columns[:3]] = np.sort(renpuku_df.iloc[:, :3].to_numpy(), axis=1)
         renpuku_df = renpuku_df.drop_duplicates().reset_index(drop=True)
         return renpuku_df
 
     def get_rentan_odds(self, sleep_time: float = 0.2) -> pd.DataFrame:
         # 3連単
-        element = self._get_element(By.ID, "odds_navi_b8")
-        self._click(element)
-        dropdown = self._get_element(By.ID, "list_select_horse")
-        select = Select(dropdown)
-        num = len(select.options)
-        # スクレイピング
-        dfs_list = list()
-        for axis_horse_number in range(1, num):
-            if axis_horse_number > 1:
-                # 軸馬の選択・変更 dropdown select状態にする
-                dropdown = self._get_element(By.ID, "list_select_horse")
-                select = Select(dropdown)
-                select.select_by_value(str(axis_horse_number))
-            time.sleep(sleep_time)
-            element = self._get_element(By.CLASS_NAME, "GraphOdds")
-            dfs = pd.read_html(element.get_attribute('outerHTML'))
-            dfs_list.append(dfs)
-        # 整形
-        tan3concat_df_list = list()
-        for uma, dfs in enumerate(dfs_list):
-            uma += 1
-            second_list = [int(df.columns.values[0]) for df in dfs]
-            tan3_df_list = [df.iloc[:, :2] for df in dfs]
-            for i in range(len(tan3_df_list)):
-                tan3_df_list[i].columns = ['Third', 'Odds']
-                tan3_df_list[i]['First'] = uma
-                tan3_df_list[i]['Second'] = second_list[i]
-                tan3_df_list[i] = tan3_df_list[i][[
-                    'First', 'Second', 'Third', 'Odds']]
-            tan3concat_df_list.append(pd.concat(tan3_df_list, axis=0))
-        tan3_df = pd.concat(tan3concat_df_list, axis=0)
+        self._select_tab("odds_navi_b8", By.CLASS_NAME, "GraphOdds", sleep_time)
+        tan3_df = self.__get_trio_odds()
         return tan3_df
 
     def get_odds_df_dict(self, sleep_time: float = 0.2) -> Dict[str, pd.DataFrame]:
@@ -891,6 +1669,177 @@ class OddsScraper(SeleniumScraperBase):
         df_dict['WIDE'] = self.get_wide_odds(sleep_time)
         return df_dict
 
+    @classmethod
+    def get_odds_df_dict_many(cls, pool: DriverPool, race_ids: List[Union[str, int]], sleep_time: float = 0.2,
+                              return_exceptions: bool = False) -> Dict[str, Dict[str, pd.DataFrame]]:
+        """複数のレースのオッズを、DriverPoolのブラウザで並行に取得する。
+        ページ遷移はホストごとのレート制限に従い、レースごとの処理はブラウザの数だけ同時に進む。
+
+        Parameters
+        ----------
+        pool : DriverPool
+        race_ids : List[str or int]
+        sleep_time : float, default 0.2
+            get_odds_df_dictに渡す、表示中のタブが分からない場合に表の描画を待つ時間の上限
+        return_exceptions : bool, default False
+            Trueの場合は、失敗したレースの結果を例外オブジェクトとして返す
+
+        Returns
+        -------
+        Dict[str, Dict[str, pd.DataFrame]]
+            レースIDをキーとする、get_odds_df_dictの戻り値の辞書
+
+        Examples
+        ----------
+        >>> with DriverPool('chromedriver', size=4) as pool:
+        ...     odds = OddsScraper.get_odds_df_dict_many(pool, race_ids)
+        """
+        def scrape(driver, race_id):
+            scraper = cls(driver=driver, wait_time=pool.wait_time)
+            scraper.visit_page(race_id)
+            return scraper.get_odds_df_dict(sleep_time)
+        results = pool.map(scrape, race_ids, return_exceptions=return_exceptions)
+        return {str(race_id): result for race_id, result in zip(race_ids, results)}
+
+
+def parse_odds(odds: Dict[str, List[str]], n_legs: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """オッズのAPIが返す{組番: [オッズ, オッズの上限, 人気]}の辞書を、型の決まった配列にする。
+
+    Parameters
+    ----------
+    odds : Dict[str, List[str]]
+        '0102'のように馬番を2桁ずつ繋いだ組番をキーとする辞書
+    n_legs : int
+        組番の頭数。単勝は1、馬連は2、3連単は3。
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+        (組番(件数, n_legs)のint8, オッズのfloat64, オッズの上限のfloat64, 人気のint16)。
+        組番の昇順に並べる。オッズが無い組番(取消など)はNaN、人気は0。
+    """
+    if len(odds) == 0:
+        return (np.zeros((0, n_legs), dtype=np.int8), np.zeros(0), np.zeros(0), np.zeros(0, dtype=np.int16))
+    codes = np.fromiter(map(int, odds.keys()), dtype=np.int64, count=len(odds))
+    order = np.argsort(codes, kind='stable')
+    codes = codes[order]
+    legs = np.stack([codes // 100 ** (n_legs - 1 - j) % 100 for j in range(n_legs)], axis=1).astype(np.int8)
+    values = list(odds.values())
+    columns = [_to_float_array([v[i] if len(v) > i else '' for v in values])[order] for i in range(3)]
+    popularity = np.nan_to_num(columns[2], nan=0).astype(np.int16)
+    return legs, columns[0], columns[1], popularity
+
+
+def _to_float_array(values: List[str]) -> np.ndarray:
+    try:
+        return np.array(values, dtype=np.float64)
+    except ValueError:
+        pass
+    # 空文字列や'---'(取消)が含まれる場合は、数字で始まらないものをNaNにしてから変換する
+    values = [v if v[:1].isdigit() else 'nan' for v in values]
+    try:
+        return np.array(values, dtype=np.float64)
+    except ValueError:
+        return pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').to_numpy(dtype=np.float64)
+
+
+class OddsApiScraper(object):
+    '''
+    race.netkeiba.comのオッズを、ブラウザを使わずに取得するクラス。
+    OddsScraperがオッズのページで表示しているデータの取得元を直接呼び出し、
+    券種ごとに1回のリクエストで全ての組番のオッズを取得する。
+
+    Examples
+    ----------
+    >>> scraper = OddsApiScraper()
+    >>> df_dict = scraper.get_odds_df_dict(202105021211)
+    >>> # ローカルに立てた代わりのサーバーから取得する場合
+    >>> scraper = OddsApiScraper(api_url='http://localhost:8000/api/api_get_jra_odds.html')
+    '''
+    API_URL = 'https://race.netkeiba.com/api/api_get_jra_odds.html'
+    # get_odds_df_dictのキー: (APIのtype, 返されるoddsのキー, 組番の頭数)。単勝と複勝はtype=1でまとめて返る
+    ODDS_TYPES = {
+        'TANSHO': (1, '1', 1), 'FUKUSHO': (1, '2', 1), 'WAKUREN': (3, '3', 2), 'UMAREN': (4, '4', 2),
+        'WIDE': (5, '5', 2), 'UMATAN': (6, '6', 2), 'RENPUKU': (7, '7', 3), 'RENTAN': (8, '8', 3)}
+    # OddsScraper.get_odds_df_dictと同じ券種
+    DEFAULT_KEYS = ('TANSHO', 'UMATAN', 'RENTAN', 'UMAREN', 'RENPUKU', 'WIDE')
+    LEG_COLUMNS = ('First', 'Second', 'Third')
+
+    def __init__(self, transport: HttpTransport = None, api_url: str = None):
+        """
+        Parameters
+        ----------
+        transport : HttpTransport, default None
+            ページの取得に利用するHttpTransport
+        api_url : str, default None
+            オッズのデータの取得元。Noneの場合はAPI_URL。
+        """
+        self.transport = get_default_transport() if transport is None else transport
+        self.api_url = self.API_URL if api_url is None else api_url
+
+    def _url(self, race_id: Union[str, int], odds_type: int) -> str:
+        return f'{self.api_url}?race_id={race_id}&type={odds_type}&action=init'
+
+    @staticmethod
+    def _odds_of(page: Page) -> Dict[str, Dict[str, List[str]]]:
+        page.raise_for_status()
+        payload = json.loads(page.text)
+        data = payload.get('data')
+        # 発売前などでオッズが無い場合は、dataが空文字列になる
+        if not isinstance(data, dict):
+            return dict()
+        return data.get('odds') or dict()
+
+    def _to_frame(self, odds: Dict[str, List[str]], key: str) -> pd.DataFrame:
+        _, _, n_legs = self.ODDS_TYPES[key]
+        legs, values, upper, popularity = parse_odds(odds, n_legs)
+        data = {self.LEG_COLUMNS[j]: legs[:, j] for j in range(n_legs)}
+        data['Odds'] = values
+        if key in ('FUKUSHO', 'WIDE'):
+            # 複勝とワイドはオッズに幅がある。Oddsは下限
+            data['OddsMax'] = upper
+        data['Popularity'] = popularity
+        return pd.DataFrame(data)
+
+    async def aget_odds_df_dict(self, race_id: Union[str, int],
+                                keys: Iterable[str] = DEFAULT_KEYS) -> Dict[str, pd.DataFrame]:
+        """`get_odds_df_dict`の非同期版"""
+        keys = list(keys)
+        odds_types = sorted({self.ODDS_TYPES[key][0] for key in keys})
+        pages = await get_fetcher(self.transport).gather(
+            [self._url(race_id, odds_type) for odds_type in odds_types], encoding='utf-8')
+        odds = dict()
+        for page in pages:
+            odds.update(self._odds_of(page))
+        return {key: self._to_frame(odds.get(self.ODDS_TYPES[key][1], dict()), key) for key in keys}
+
+    def get_odds_df_dict(self, race_id: Union[str, int],
+                         keys: Iterable[str] = DEFAULT_KEYS) -> Dict[str, pd.DataFrame]:
+        """レースのオッズを券種ごとに取得する。券種ごとのリクエストは並行に行う。
+
+        Parameters
+        ----------
+        race_id : str or int
+        keys : Iterable[str], default DEFAULT_KEYS
+            取得する券種。ODDS_TYPESのキー。
+
+        Returns
+        -------
+        Dict[str, pd.DataFrame]
+            OddsScraper.get_odds_df_dictと同じキーの辞書。
+            DataFrameはFirst, Second, Third(組番の頭数分)、Odds、Popularityの列を持ち、組番の昇順に並ぶ。
+            複勝とワイドはオッズの上限のOddsMaxの列も持つ。オッズが無い場合は空のDataFrame。
+        """
+        return run_sync(self.aget_odds_df_dict(race_id, keys))
+
+    def get_odds_df_dict_many(self, race_ids: List[Union[str, int]], keys: Iterable[str] = DEFAULT_KEYS
+                              ) -> Dict[str, Dict[str, pd.DataFrame]]:
+        """複数のレースのオッズを並行に取得する。レースIDをキーとする、get_odds_df_dictの戻り値の辞書を返す。"""
+        async def gather():
+            return await asyncio.gather(*[self.aget_odds_df_dict(race_id, keys) for race_id in race_ids])
+        results = run_sync(gather())
+        return {str(race_id): result for race_id, result in zip(race_ids, results)}
+
 
 class AutoBuyer(SeleniumScraperBase):
     """
@@ -1183,23 +2132,30 @@ class AutoBuyer(SeleniumScraperBase):
 
 class LocalRaceidScraper(SeleniumScraperBase):
     '''
-    地方競馬のレースIDスクレイピング用クラス
+    地方競馬のレースIDスクレイピング用クラス。
+    ブラウザを使わずに取得する場合はLocalRaceidHttpScraperを使う。
     '''
     RACECOURSE_ID_DICT = {
         65: '帯広', 30: '門別', 35: '盛岡', 36: '水沢', 42: '浦和', 43: '船橋',
         44: '大井', 45: '川崎', 46: '金沢', 47: '笠松', 48: '名古屋',
         50: '園田', 51: '姫路', 54: '高知', 55: '佐賀'}
 
-    def __init__(self, executable_path, visible=False, wait_time=2):
+    def __init__(self, executable_path, visible=False, wait_time=2, rate_limiter=None):
         super().__init__(
-            executable_path=executable_path, visible=visible, wait_time=wait_time)
+            executable_path=executable_path, visible=visible, wait_time=wait_time,
+            rate_limiter=rate_limiter)
         self.base_url = "https://nar.netkeiba.com/racecourse/racecourse_page.html?jyo_cd={}&kaisai_id={}"
 
     def visit_page(self, racecourse_id, year, month, date):
         kaisai_id = f'{year:04}{racecourse_id:02}{month:02}{date:02}'
-        self.driver.get(self.base_url.format(racecourse_id, kaisai_id))
+        self._visit_page(self.base_url.format(racecourse_id, kaisai_id))
 
     def get_raceID_list_from_date(self, today: datetime.date, sleep_time=0.2) -> list:
+        # 従来のsleep_time引数との互換用。このメソッドの間だけ、ページ遷移の間隔の下限とする
+        with self.rate_limiter.override_interval(urlsplit(self.base_url).hostname, sleep_time):
+            return self._get_raceID_list_from_date(today)
+
+    def _get_raceID_list_from_date(self, today: datetime.date) -> list:
         race_id_list = list()
         for racecourse_id in self.RACECOURSE_ID_DICT.keys():
             self.visit_page(racecourse_id, today.year, today.month, today.day)
@@ -1216,22 +2172,159 @@ class LocalRaceidScraper(SeleniumScraperBase):
                     'outerHTML'), "html.parser")
                 race_id = re.findall('\d{12}', soup.find('a').get('href'))[0]
                 race_id_list.append(race_id)
-            time.sleep(sleep_time)
         return list(set(race_id_list))
 
-    def get_monthly_raceID_list(self, year, month, sleep_time, leave=True) -> list:
+    def get_monthly_raceID_list(self, year, month, sleep_time=0.2, leave=True) -> list:
         today = datetime.date(year, month, 1)
         race_id_list = list()
         for _ in tqdm(range(31), leave=leave):
             race_id_list += self.get_raceID_list_from_date(today, sleep_time)
-            today = today + relativedelta(days=1)
-            time.sleep(sleep_time)
+            today = today + relativedelta.relativedelta(days=1)
         return race_id_list
 
     def get_yearly_raceID_list(
-            self, year, sleep_time, leave=True) -> list:
+            self, year, sleep_time=0.2, leave=True) -> list:
         race_id_list = list()
         for i in range(12):
             race_id_list += self.get_monthly_raceID_list(
                 year, month=i+1, sleep_time=sleep_time, leave=leave)
         return race_id_list
+
+
+class LocalRaceidHttpScraper(NetkeibaSoupScraperBase):
+    '''
+    地方競馬のレースIDスクレイピング用クラス。
+    LocalRaceidScraperと異なりブラウザを使わず、開催場×日付ごとのレース一覧をHTTPで並行に取得する。
+    '''
+    RACECOURSE_ID_DICT = LocalRaceidScraper.RACECOURSE_ID_DICT
+    # 開催場ページのレース一覧の取得元。kaisai_idはYYYY+場コード+MMDD
+    RACE_LIST_URL = "https://nar.netkeiba.com/top/race_list_sub.html?kaisai_id={}&kaisai_date={}"
+    # 開催場×日付ごとのページの取得に失敗した場合に再試行する回数と、1回目の再試行までの待ち時間[秒]
+    MAX_RETRIES = 2
+    RETRY_BACKOFF = 1.0
+
+    def __init__(self, transport: HttpTransport = None):
+        super().__init__(base_url=self.RACE_LIST_URL, transport=transport)
+
+    @staticmethod
+    def _kaisai_id(racecourse_id: int, date: datetime.date) -> int:
+        return int(f'{date.year:04}{racecourse_id:02}{date.month:02}{date.day:02}')
+
+    @staticmethod
+    def _parse_raceID_list(text: str, kaisai_id: int) -> List[int]:
+        # 地方競馬のレースIDはkaisai_idにレース番号2桁を付けたもの。
+        # 開催が無い日は別の開催のレースが表示されることがあるので、kaisai_idが一致するものだけを残す
+        race_ids = {int(s) for s in re.findall(r'race_id=([0-9]{12})', text)}
+        return sorted(race_id for race_id in race_ids if race_id // 100 == kaisai_id)
+
+    async def _aget_raceID_list(self, racecourse_id: int, date: datetime.date) -> List[int]:
+        kaisai_id = self._kaisai_id(racecourse_id, date)
+        url = self.RACE_LIST_URL.format(kaisai_id, f'{date:%Y%m%d}')
+        for attempt in itertools.count():
+            try:
+                page = await self.fetcher.fetch(url, encoding='EUC-JP', session=self.session)
+            except Exception:
+                if attempt >= self.MAX_RETRIES:
+                    raise
+            else:
+                if page.ok:
+                    # ページ全体は保持せず、レースIDだけを返す
+                    return self._parse_raceID_list(page.text, kaisai_id)
+                # 404などは再試行しても変わらないので、サーバー側の一時的なエラーだけを再試行する
+                if attempt >= self.MAX_RETRIES or not (page.status_code >= 500 or page.status_code == 429):
+                    page.raise_for_status()
+            await asyncio.sleep(self.RETRY_BACKOFF * 2 ** attempt)
+
+    async def aget_raceID_dict(self, start: datetime.date, end: datetime.date, racecourse_ids: List[int] = None,
+                               failures: Dict[Tuple[datetime.date, int], Exception] = None
+                               ) -> Dict[datetime.date, List[int]]:
+        """start以上end以下の日付ごとのレースIDを、日付をキーとする辞書で返す。レースが無い日は含まない。
+
+        Parameters
+        ----------
+        start : datetime.date
+        end : datetime.date
+        racecourse_ids : List[int], default None
+            対象の場コード。Noneの場合はRACECOURSE_ID_DICTの全ての場。
+        failures : Dict[Tuple[datetime.date, int], Exception], default None
+            指定した場合は、再試行しても取得できなかった(日付, 場コード)と例外をこの辞書に入れ、
+            残りの結果を返す。Noneの場合は、全ての取得が終わった後で最初の例外を送出する。
+        """
+        racecourse_ids = list(self.RACECOURSE_ID_DICT) if racecourse_ids is None else racecourse_ids
+        dates = [start + datetime.timedelta(days=i) for i in range((end - start).days + 1)]
+        keys = list(itertools.product(dates, racecourse_ids))
+        # 1つの失敗で他の開催場×日付の結果を捨てないように、全て終わるまで待つ
+        results = await asyncio.gather(
+            *[self._aget_raceID_list(course, date) for date, course in keys], return_exceptions=True)
+        errors = [(key, e) for key, e in zip(keys, results) if isinstance(e, Exception)]
+        if failures is None and len(errors) > 0:
+            raise errors[0][1]
+        if failures is not None:
+            failures.update(errors)
+        race_id_dict = dict()
+        for (date, _), race_ids in zip(keys, results):
+            if isinstance(race_ids, Exception):
+                continue
+            if len(race_ids) > 0:
+                race_id_dict.setdefault(date, list()).extend(race_ids)
+        return race_id_dict
+
+    async def aget_raceID_list(self, start: datetime.date, end: datetime.date, racecourse_ids: List[int] = None,
+                               failures: Dict[Tuple[datetime.date, int], Exception] = None) -> List[int]:
+        """`get_raceID_list`の非同期版"""
+        race_id_dict = await self.aget_raceID_dict(start, end, racecourse_ids, failures=failures)
+        return list(itertools.chain.from_iterable(race_id_dict.values()))
+
+    def get_raceID_list(self, start: datetime.date, end: datetime.date, racecourse_ids: List[int] = None,
+                        sleep_time: float = None,
+                        failures: Dict[Tuple[datetime.date, int], Exception] = None) -> List[int]:
+        """start以上end以下の期間に開催された地方競馬の全レースのレースIDを取得する。
+        開催場×日付の組み合わせごとのレース一覧を、ホストごとのレート制限の範囲で並行に取得する。
+
+        Parameters
+        ----------
+        start : datetime.date
+            期間の初日
+        end : datetime.date
+            期間の最終日
+        racecourse_ids : List[int], default None
+            対象の場コード。Noneの場合はRACECOURSE_ID_DICTの全ての場。
+        sleep_time : float, default None
+            このメソッドの間だけ使うリクエスト間隔の下限[秒]。Noneの場合は既存のレート制限の設定に従う。
+        failures : Dict[Tuple[datetime.date, int], Exception], default None
+            指定した場合は、取得できなかった(日付, 場コード)と例外をこの辞書に入れ、残りのレースIDを返す。
+            Noneの場合は、1つでも取得できなければ例外を送出する。
+
+        Returns
+        -------
+        List[int]
+            日付順に並べたレースIDのリスト
+
+        Examples
+        ----------
+        >>> scraper = LocalRaceidHttpScraper()
+        >>> failures = dict()
+        >>> race_ids = scraper.get_raceID_list(
+        ...     datetime.date(2021, 4, 1), datetime.date(2021, 4, 30), failures=failures)
+        >>> # 失敗した開催場×日付だけを取得し直す
+        >>> for date, course in failures:
+        ...     race_ids += scraper.get_raceID_list(date, date, racecourse_ids=[course])
+        """
+        with self._request_interval(sleep_time, self.RACE_LIST_URL):
+            return run_sync(self.aget_raceID_list(start, end, racecourse_ids, failures=failures))
+
+    def get_raceID_list_from_date(self, today: datetime.date, sleep_time: float = None) -> List[int]:
+        """指定した日付に開催された地方競馬のレースID"""
+        return self.get_raceID_list(today, today, sleep_time=sleep_time)
+
+    def get_monthly_raceID_list(self, year: int, month: int, sleep_time: float = None) -> List[int]:
+        return self.get_raceID_list(
+            datetime.date(year, month, 1),
+            datetime.date(year, month, calendar.monthrange(year, month)[1]),
+            sleep_time=sleep_time)
+
+    def get_yearly_raceID_list(self, year: int, sleep_time: float = None, leave: bool = True) -> List[int]:
+        race_id_list = list()
+        for i in tqdm(range(12), leave=leave):
+            race_id_list += self.get_monthly_raceID_list(year, i + 1, sleep_time=sleep_time)
+        return race_id_list
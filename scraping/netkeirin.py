@@ -1,24 +1,34 @@
 import re
-import time
+from typing import Dict, List, Union
 
+import numpy as np
 import pandas as pd
 from selenium.webdriver.common.by import By
+from selenium.webdriver.remote.webdriver import WebDriver
 from selenium.webdriver.support.select import Select
 
 from .base import SeleniumScraperBase, SoupScraperBase
+from .driver_pool import DriverPool
+from .table import cells_to_array
+from .transport import HttpTransport
+
+# 2車複・2車単、3連複・3連単のオッズの表を含む要素
+PAIR_ODDS_XPATH = '//*[@id="root-app"]/div[1]/article/div[1]'
+TRIO_ODDS_XPATH = '//*[@id="root-app"]/div[1]/article/div[2]/div'
 
 
 class NetkeirinSeleniumScraperBase(SeleniumScraperBase):
-    def __init__(self, base_url, executable_path, visible=False, wait_time=10):
-        super().__init__(executable_path, visible, wait_time)
+    def __init__(self, base_url, executable_path=None, visible=False, wait_time=10, driver: WebDriver = None):
+        super().__init__(executable_path, visible, wait_time, driver=driver)
         self.base_url = base_url
 
     def visit_page(self, race_id):
-        self.driver.get(self.base_url.format(race_id))
+        self._visit_page(self.base_url.format(race_id))
 
 
 class NetkeirinSoupScraperBase(SoupScraperBase):
-    def __init__(self, base_url):
+    def __init__(self, base_url, transport: HttpTransport = None):
+        super().__init__(transport=transport)
         self.base_url = base_url
         self.soup = None
 
@@ -31,14 +41,44 @@ class OddsScraper(NetkeirinSeleniumScraperBase):
     オッズをスクレイピングするクラス
     '''
 
-    def __init__(self, excutable_path, visible=False, wait_time=10):
+    def __init__(self, excutable_path=None, visible=False, wait_time=10, driver: WebDriver = None):
         super().__init__(
             base_url='https://keirin.netkeiba.com/race/odds/?race_id={}',
-            executable_path=excutable_path, visible=visible, wait_time=wait_time)
+            executable_path=excutable_path, visible=visible, wait_time=wait_time, driver=driver)
+        # 表示中の券種のタブの番号。ページを開いた直後など、分からない場合はNone
+        self._tab = None
+
+    def visit_page(self, race_id):
+        super().visit_page(race_id)
+        self._tab = None
+
+    def _select_tab(self, tab: int, target: str, sleep_time: float = 0.2) -> None:
+        """券種のタブ(li[tab])と表形式の表示を選び、オッズの表(targetのXPath)が描画し直されるまで待つ。
+        表示中のタブが分からない場合や同じタブを選び直す場合は、表が変化しないことがあるので、
+        sleep_timeまでしか待たない。
+        """
+        before = self._fingerprint(By.XPATH, target)
+        element = self._get_element(
+            By.XPATH, f'//*[@id="root-app"]/div[1]/div[1]/div[1]/nav/ul/li[{tab}]/button')
+        self._click(element)
+        element = self._get_element(
+            By.XPATH, '//*[@id="root-app"]/div[1]/div[1]/div[2]/nav/ul/li[2]/button')
+        self._click(element)
+        changed = self._tab is not None and self._tab != tab
+        self._wait_for_rerender(By.XPATH, target, before, timeout=None if changed else sleep_time, required=changed)
+        self._tab = tab
+
+    def _select_axis(self, select: Select, value: str, target: str) -> None:
+        """3連複・3連単の軸を選び、オッズの表(targetのXPath)が描画し直されるまで待つ"""
+        if select.first_selected_option.get_attribute('value') == value:
+            return
+        before = self._fingerprint(By.XPATH, target)
+        select.select_by_value(value)
+        self._wait_for_rerender(By.XPATH, target, before, required=True)
 
     def odds_is_exist(self):
-        elements = self.driver.find_elements_by_xpath(
-            '//*[@id="root-app"]/div[1]/div[1]/div[1]/nav/ul/li[1]')
+        elements = self.driver.find_elements(
+            By.XPATH, '//*[@id="root-app"]/div[1]/div[1]/div[1]/nav/ul/li[1]')
         if len(elements) > 0:
             return True
         else:
@@ -48,141 +88,116 @@ class OddsScraper(NetkeirinSeleniumScraperBase):
         # 枠連
         raise NotImplementedError()
 
-    def get_2shafuku_odds_table(self):
+    def get_2shafuku_odds_table(self, sleep_time=0.2):
         # 2車複
-        element = self._get_element(
-            By.XPATH, '//*[@id="root-app"]/div[1]/div[1]/div[1]/nav/ul/li[4]/button')
-        self._click(element)
-        element = self._get_element(
-            By.XPATH, '//*[@id="root-app"]/div[1]/div[1]/div[2]/nav/ul/li[2]/button')
-        self._click(element)
-        element = self._get_element(
-            By.XPATH, '//*[@id="root-app"]/div[1]/article/div[1]')
-        dfs = pd.read_html(element.get_attribute('outerHTML'))
-        target_df = dfs[2].copy().iloc[:, :-1]
-        target_df.columns = [i + 1 for i in range(len(target_df))]
-        target_df['Second'] = [i + 2 for i in range(len(target_df))]
-        df_list = list()
-        for first in range(1, len(target_df) + 1):
-            tmp = target_df[['Second', first]].copy().rename(
-                columns={first: 'Odds'})
-            tmp['First'] = first
-            df_list.append(tmp[['First', 'Second', 'Odds']])
-        shafuku_df = pd.concat(df_list).dropna().reset_index(drop=True)
+        self._select_tab(4, PAIR_ODDS_XPATH, sleep_time)
+        _, rows = self._get_tables(By.XPATH, PAIR_ODDS_XPATH)[2]
+        # 最後の列を除き、列が1車目、行が2車目(2から)の行列
+        shafuku_df = self.__melt_pair([row[:-1] for row in rows], 2)
         return shafuku_df
 
     def get_wide_odds_table(self):
         # ワイド
         raise NotImplementedError
 
-    def get_2shatan_odds_table(self):
+    def get_2shatan_odds_table(self, sleep_time=0.2):
         # 2車単
-        element = self._get_element(
-            By.XPATH, '//*[@id="root-app"]/div[1]/div[1]/div[1]/nav/ul/li[2]/button')
-        self._click(element)
-        element = self._get_element(
-            By.XPATH, '//*[@id="root-app"]/div[1]/div[1]/div[2]/nav/ul/li[2]/button')
-        self._click(element)
-        element = self._get_element(
-            By.XPATH, '//*[@id="root-app"]/div[1]/article/div[1]')
-        dfs = pd.read_html(element.get_attribute('outerHTML'))
-        target_df = dfs[2].copy()
-        target_df.columns = [i + 1 for i in range(len(target_df))]
-        target_df['Second'] = [i + 1 for i in range(len(target_df))]
-        df_list = list()
-        for first in range(1, len(target_df) + 1):
-            tmp = target_df[['Second', first]].copy().rename(
-                columns={first: 'Odds'})
-            tmp['First'] = first
-            df_list.append(tmp[['First', 'Second', 'Odds']])
-        shatan_df = pd.concat(df_list).dropna().reset_index(drop=True)
+        self._select_tab(2, PAIR_ODDS_XPATH, sleep_time)
+        _, rows = self._get_tables(By.XPATH, PAIR_ODDS_XPATH)[2]
+        # 列が1車目、行が2車目(1から)の行列
+        shatan_df = self.__melt_pair(rows, 1)
         return shatan_df
 
+    @staticmethod
+    def __melt_pair(rows: List[list], start: int) -> pd.DataFrame:
+        n = len(rows)
+        firsts = [first for first in range(1, n + 1) for _ in range(n)]
+        seconds = [i + start for _ in range(n) for i in range(n)]
+        odds = [row[first] for first in range(n) for row in rows]
+        df = pd.DataFrame({'First': firsts, 'Second': seconds, 'Odds': cells_to_array(odds)})
+        return df.dropna().reset_index(drop=True)
+
+    def __get_trio_odds(self, drop_last: bool) -> pd.DataFrame:
+        # 軸(1車目)ごとに表を読み、列が2車目、行が3車目の行列を縦に並べる
+        element = self._get_element(By.XPATH, '//*[@id="entry_axis"]')
+        select = Select(element)
+        firsts, seconds, thirds, odds = list(), list(), list(), list()
+        for first in range(1, len(select.options) + 1):
+            self._select_axis(select, f'{first - 1}', TRIO_ODDS_XPATH)
+            tables = self._get_tables(By.XPATH, TRIO_ODDS_XPATH)
+            columns, rows = tables[2]
+            third_list = [int(i) for i in list(tables[1][0][1][3:])]
+            if drop_last:
+                columns, rows = columns[:-1], [row[:-1] for row in rows]
+                second_list = [int(re.search(r'\d', col).group()) for col in columns]
+            else:
+                second_list = third_list
+            for j, second in enumerate(second_list):
+                firsts += [first] * len(third_list)
+                seconds += [second] * len(third_list)
+                thirds += third_list
+                odds += [row[j] for row in rows]
+        df = pd.DataFrame({'First': firsts, 'Second': seconds, 'Third': thirds, 'Odds': cells_to_array(odds)})
+        return df.dropna().reset_index(drop=True)
+
     def get_3renpuku_odds_table(self, sleep_time=0.2):
         # 3連複
-        element = self._get_element(
-            By.XPATH, '//*[@id="root-app"]/div[1]/div[1]/div[1]/nav/ul/li[3]/button')
-        self._click(element)
-        self._get_element(
-            By.XPATH, '//*[@id="root-app"]/div[1]/div[1]/div[2]/nav/ul/li[2]/button')
-        self._click(element)
-        element = self.driver.find_element_by_xpath('//*[@id="entry_axis"]')
-        select = Select(element)
-        renpuku_list = list()
-        for first in range(1, select.options.__len__() + 1):
-            select.select_by_value(f'{first - 1}')
-            time.sleep(sleep_time)
-            element = self._get_element(
-                By.XPATH, '//*[@id="root-app"]/div[1]/article/div[2]/div')
-            dfs = pd.read_html(element.get_attribute('outerHTML'))
-            target_df = dfs[2].copy().iloc[:, :-1]
-            third_list = [int(i) for i in list(dfs[1].columns[1][3:])]
-            second_list = [int(re.search(r'\d', i).group())
-                           for i in target_df.columns]
-            target_df.columns = second_list
-            target_df.index = third_list
-            target_df['First'] = first
-            tmp_list = list()
-            for i in second_list:
-                tmp = target_df[['First', i]].rename(columns={i: 'Odds'})
-                tmp['Second'] = i
-                tmp_list.append(tmp)
-            target_df = pd.concat(tmp_list).reset_index().rename(
-                columns={'index': 'Third'})
-            target_df = target_df[[
-                'First', 'Second', 'Third', 'Odds']].dropna()
-            renpuku_list.append(target_df)
-        renpuku_df = pd.concat(renpuku_list).reset_index(drop=True)
-        values = renpuku_df.iloc[:, :3].values
-        values.sort()
-        renpuku_df.iloc[:, :3] = values
+        self._select_tab(3, TRIO_ODDS_XPATH, sleep_time)
+        renpuku_df = self.__get_trio_odds(drop_last=True)
+        renpuku_df.iloc[:, :3] = np.sort(renpuku_df.iloc[:, :3].to_numpy(), axis=1)
         renpuku_df = renpuku_df.drop_duplicates().reset_index(drop=True)
         return renpuku_df
 
     def get_3rentan_odds_table(self, sleep_time=0.2):
         # 3連単
-        self._get_element(
-            By.XPATH, '//*[@id="root-app"]/div[1]/div[1]/div[1]/nav/ul/li[1]/button')
-        self._click(element)
-        self._get_element(
-            By.XPATH, '//*[@id="root-app"]/div[1]/div[1]/div[2]/nav/ul/li[2]/button')
-        self._click(element)
-        element = self.driver.find_element_by_xpath('//*[@id="entry_axis"]')
-        select = Select(element)
-        rentan_list = list()
-        for first in range(1, select.options.__len__() + 1):
-            select.select_by_value(f'{first - 1}')
-            time.sleep(sleep_time)
-            element = self._get_element(
-                By.XPATH, '//*[@id="root-app"]/div[1]/article/div[2]/div')
-            dfs = pd.read_html(element.get_attribute('outerHTML'))
-            target_df = dfs[2].copy()
-            uma_list = [int(i) for i in list(dfs[1].columns[1][3:])]
-            target_df.columns = uma_list
-            target_df.index = uma_list
-            target_df['First'] = first
-            tmp_list = list()
-            for i in uma_list:
-                tmp = target_df[['First', i]].rename(columns={i: 'Odds'})
-                tmp['Second'] = i
-                tmp_list.append(tmp)
-            target_df = pd.concat(tmp_list).reset_index().rename(
-                columns={'index': 'Third'})
-            target_df = target_df[[
-                'First', 'Second', 'Third', 'Odds']].dropna()
-            rentan_list.append(target_df)
-        rentan_df = pd.concat(rentan_list).reset_index(drop=True)
+        self._select_tab(1, TRIO_ODDS_XPATH, sleep_time)
+        rentan_df = self.__get_trio_odds(drop_last=False)
         return rentan_df
 
+    def get_odds_df_dict(self, sleep_time: float = 0.2) -> Dict[str, pd.DataFrame]:
+        df_dict = dict()
+        # 2車複
+        df_dict['2SHAFUKU'] = self.get_2shafuku_odds_table(sleep_time)
+        # 2車単
+        df_dict['2SHATAN'] = self.get_2shatan_odds_table(sleep_time)
+        # 3連複
+        df_dict['3RENPUKU'] = self.get_3renpuku_odds_table(sleep_time)
+        # 3連単
+        df_dict['3RENTAN'] = self.get_3rentan_odds_table(sleep_time)
+        return df_dict
+
+    @classmethod
+    def get_odds_df_dict_many(cls, pool: DriverPool, race_ids: List[Union[str, int]], sleep_time: float = 0.2,
+                              return_exceptions: bool = False) -> Dict[str, Dict[str, pd.DataFrame]]:
+        """複数のレースのオッズを、DriverPoolのブラウザで並行に取得する。オッズが無いレースはNone。
+
+        Parameters
+        ----------
+        pool : DriverPool
+        race_ids : List[str or int]
+        sleep_time : float, default 0.2
+            get_odds_df_dictに渡す、表示中のタブが分からない場合に表の描画を待つ時間の上限
+        return_exceptions : bool, default False
+            Trueの場合は、失敗したレースの結果を例外オブジェクトとして返す
+        """
+        def scrape(driver, race_id):
+            scraper = cls(driver=driver, wait_time=pool.wait_time)
+            scraper.visit_page(race_id)
+            if not scraper.odds_is_exist():
+                return None
+            return scraper.get_odds_df_dict(sleep_time)
+        results = pool.map(scrape, race_ids, return_exceptions=return_exceptions)
+        return {str(race_id): result for race_id, result in zip(race_ids, results)}
+
 
 class DatabaseScraper(NetkeirinSoupScraperBase):
     '''
     Databaseから情報を取得するクラス
     '''
 
-    def __init__(self):
+    def __init__(self, transport: HttpTransport = None):
         super().__init__(
-            base_url='https://keirin.netkeiba.com/db/result/?race_id={}')
+            base_url='https://keirin.netkeiba.com/db/result/?race_id={}', transport=transport)
 
     def get_main_table(self):
         assert self.soup is not None
@@ -0,0 +1,262 @@
+import os
+import time
+from typing import Callable, Dict, Iterator, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .payout import BET_TYPES, MAX_LEGS, pack_combinations
+from .sink import split_odds
+
+# get_odds_df_dictのキーとpayout.BET_TYPESの番号の対応
+ODDS_KEYS = {
+    'TANSHO': BET_TYPES['単勝'], 'FUKUSHO': BET_TYPES['複勝'], 'WAKUREN': BET_TYPES['枠連'],
+    'UMAREN': BET_TYPES['馬連'], 'WIDE': BET_TYPES['ワイド'], 'UMATAN': BET_TYPES['馬単'],
+    'RENPUKU': BET_TYPES['三連複'], 'RENTAN': BET_TYPES['三連単']}
+LEG_COLUMNS = ('First', 'Second', 'Third')
+# 1件あたり25バイト。timeはUNIX時間[ミリ秒]、comboはpayout.pack_combinationsで作った組番の番号
+SERIES_DTYPE = np.dtype([
+    ('time', np.int64),
+    ('race_id', np.int64),
+    ('bet_type', np.int8),
+    ('combo', np.int32),
+    ('odds', np.float32),
+])
+
+
+def combo_codes(df: pd.DataFrame, bet_type: int) -> np.ndarray:
+    """First, Second, Thirdの列から、payout.pack_combinationsで組番の番号を作る。
+    無い列は0とし、順序を問わない券種は馬番号を昇順に並べるので、表示の順番によらず同じ番号になる。
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+    bet_type : int
+        payout.BET_TYPESの番号
+    """
+    legs = np.zeros((len(df), MAX_LEGS), dtype=np.int64)
+    for j, col in enumerate(LEG_COLUMNS):
+        if col in df.columns:
+            legs[:, j] = pd.to_numeric(df[col], errors='coerce').fillna(0).to_numpy(dtype=np.int64)
+    return pack_combinations(legs, np.full(len(df), bet_type)).astype(np.int32)
+
+
+def _odds_values(df: pd.DataFrame) -> np.ndarray:
+    # 複勝とワイドの'1.5-1.8'のような範囲は下限を使う。'取消'などオッズが無いものはNaN
+    return split_odds(df['Odds'])[0].to_numpy(dtype=np.float32, na_value=np.nan)
+
+
+class OddsSeries(object):
+    '''
+    オッズの変化を(時刻, レースID, 券種, 組番, オッズ)の行として追記していく時系列。
+    行はSERIES_DTYPEの構造化配列に溜め、pathを指定した場合は同じ形式でファイルにも追記する。
+    オッズが無くなった組番(取消など)はNaNの行として記録する。
+
+    Examples
+    ----------
+    >>> series = OddsSeries('data/odds_202105021211.bin')
+    >>> poller = OddsPoller(series)
+    >>> for changes in poller.poll(lambda: scraper.get_odds_df_dict(race_id), race_id, interval=30):
+    ...     print({key: len(df) for key, df in changes.items()})
+    >>> series.snapshot(race_id, 'RENTAN')
+    '''
+
+    def __init__(self, path: str = None):
+        """
+        Parameters
+        ----------
+        path : str, default None
+            追記先のファイル。既にある場合は読み込んでから追記する。Noneの場合はメモリ上にだけ保持する。
+        """
+        self.path = None if path is None else os.path.expanduser(path)
+        self._data = np.zeros(0, dtype=SERIES_DTYPE)
+        self._size = 0
+        if self.path is not None and os.path.exists(self.path):
+            data = np.fromfile(self.path, dtype=SERIES_DTYPE)
+            self._data, self._size = data, len(data)
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def data(self) -> np.ndarray:
+        """追記した全ての行"""
+        return self._data[:self._size]
+
+    @property
+    def nbytes(self) -> int:
+        return self._size * SERIES_DTYPE.itemsize
+
+    def append(self, race_id: Union[str, int], bet_type: int, combos: np.ndarray, odds: np.ndarray,
+               timestamp: float = None) -> None:
+        """同じ時刻の行をまとめて追記する
+
+        Parameters
+        ----------
+        race_id : str or int
+        bet_type : int
+            payout.BET_TYPESの番号
+        combos : np.ndarray
+            組番の番号
+        odds : np.ndarray
+        timestamp : float, default None
+            UNIX時間[秒]。Noneの場合は現在時刻。
+        """
+        n = len(combos)
+        if n == 0:
+            return
+        rows = np.empty(n, dtype=SERIES_DTYPE)
+        rows['time'] = int(round((time.time() if timestamp is None else timestamp) * 1000))
+        rows['race_id'] = int(race_id)
+        rows['bet_type'] = bet_type
+        rows['combo'] = combos
+        rows['odds'] = odds
+        if self._size + n > len(self._data):
+            # 配列は倍々に伸ばして、追記の計算量を償却する
+            capacity = max(1024, 2 * len(self._data), self._size + n)
+            data = np.zeros(capacity, dtype=SERIES_DTYPE)
+            data[:self._size] = self._data[:self._size]
+            self._data = data
+        self._data[self._size:self._size + n] = rows
+        self._size += n
+        if self.path is not None:
+            with open(self.path, 'ab') as f:
+                rows.tofile(f)
+
+    def _select(self, race_id: Union[str, int], bet_type: int = None, until: float = None) -> np.ndarray:
+        data = self.data
+        mask = data['race_id'] == int(race_id)
+        if bet_type is not None:
+            mask &= data['bet_type'] == bet_type
+        if until is not None:
+            mask &= data['time'] <= int(round(until * 1000))
+        return data[mask]
+
+    def snapshot(self, race_id: Union[str, int], bet_type: Union[str, int], at: float = None) -> pd.DataFrame:
+        """ある時刻のオッズを、それまでの変化から組み立て直す
+
+        Parameters
+        ----------
+        race_id : str or int
+        bet_type : str or int
+            'RENTAN'などget_odds_df_dictのキー、またはpayout.BET_TYPESの番号
+        at : float, default None
+            UNIX時間[秒]。Noneの場合は最新。
+
+        Returns
+        -------
+        pd.DataFrame
+            comboとOddsの列を持ち、組番の昇順に並ぶ。オッズが無くなった組番は含まない。
+        """
+        bet_type = ODDS_KEYS[bet_type] if isinstance(bet_type, str) else bet_type
+        rows = self._select(race_id, bet_type, at)
+        # 組番ごとに最後の行を残す。追記順は時刻順なので、安定ソートの最後の要素が最新
+        order = np.argsort(rows['combo'], kind='stable')
+        rows = rows[order]
+        last = np.ones(len(rows), dtype=bool)
+        last[:-1] = rows['combo'][1:] != rows['combo'][:-1]
+        rows = rows[last]
+        rows = rows[~np.isnan(rows['odds'])]
+        return pd.DataFrame({'combo': rows['combo'], 'Odds': rows['odds']})
+
+    def to_frame(self, race_id: Union[str, int] = None) -> pd.DataFrame:
+        """行をDataFrameにする。timeはdatetime64に変換する。
+
+        Parameters
+        ----------
+        race_id : str or int, default None
+            Noneの場合は全てのレース
+        """
+        data = self.data if race_id is None else self._select(race_id)
+        df = pd.DataFrame({name: data[name] for name in SERIES_DTYPE.names})
+        df['time'] = pd.to_datetime(df['time'], unit='ms')
+        return df
+
+
+class OddsPoller(object):
+    '''
+    レース・券種ごとに前回のオッズを保持し、オッズが変化した組番だけをOddsSeriesに追記するクラス。
+    組番が前回と同じ並びであれば、オッズの配列同士を比較するだけで差分を取り出す。
+    '''
+
+    def __init__(self, series: OddsSeries = None):
+        self.series = OddsSeries() if series is None else series
+        # (race_id, 券種の番号) -> (組番の番号の昇順の配列, オッズの配列)
+        self._last: Dict[Tuple[int, int], Tuple[np.ndarray, np.ndarray]] = dict()
+
+    def _diff(self, key: Tuple[int, int], combos: np.ndarray, odds: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        order = np.argsort(combos, kind='stable')
+        combos, odds = combos[order], odds[order]
+        last = self._last.get(key)
+        self._last[key] = (combos, odds)
+        if last is None:
+            return combos, odds
+        last_combos, last_odds = last
+        if len(last_combos) == len(combos) and np.array_equal(last_combos, combos):
+            changed = (odds != last_odds) & ~(np.isnan(odds) & np.isnan(last_odds))
+            return combos[changed], odds[changed]
+        # 組番が増減した場合は、前回の配列から対応する位置を二分探索で求める。前回に無い組番のオッズはNaN
+        padded = np.append(last_odds, np.float32(np.nan))
+        pos = np.searchsorted(last_combos, combos)
+        found = np.zeros(len(combos), dtype=bool)
+        inside = pos < len(last_combos)
+        found[inside] = last_combos[pos[inside]] == combos[inside]
+        prev = padded[np.where(found, pos, len(last_combos))]
+        changed = ~found | ((odds != prev) & ~(np.isnan(odds) & np.isnan(prev)))
+        # 無くなった組番は、オッズをNaNとして記録する。既にNaNだったものは記録しない
+        gone = ~np.isin(last_combos, combos) & ~np.isnan(last_odds)
+        new_combos = np.concatenate([combos[changed], last_combos[gone]])
+        new_odds = np.concatenate([odds[changed], np.full(gone.sum(), np.nan, dtype=np.float32)])
+        order = np.argsort(new_combos, kind='stable')
+        return new_combos[order], new_odds[order]
+
+    def update(self, race_id: Union[str, int], df_dict: Dict[str, pd.DataFrame],
+               timestamp: float = None) -> Dict[str, pd.DataFrame]:
+        """get_odds_df_dictの結果を前回と比較し、変化した組番をOddsSeriesに追記する
+
+        Parameters
+        ----------
+        race_id : str or int
+        df_dict : Dict[str, pd.DataFrame]
+            RealTimeOddsScraper、OddsScraper、OddsApiScraperのget_odds_df_dictの戻り値
+        timestamp : float, default None
+            UNIX時間[秒]。Noneの場合は現在時刻。
+
+        Returns
+        -------
+        Dict[str, pd.DataFrame]
+            券種ごとの、変化した組番のcomboとOddsの列を持つDataFrame。初回は全ての組番。
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        changes = dict()
+        for name, df in df_dict.items():
+            bet_type = ODDS_KEYS[name]
+            combos, odds = self._diff((int(race_id), bet_type), combo_codes(df, bet_type), _odds_values(df))
+            self.series.append(race_id, bet_type, combos, odds, timestamp)
+            changes[name] = pd.DataFrame({'combo': combos, 'Odds': odds})
+        return changes
+
+    def poll(self, fetch: Callable[[], Dict[str, pd.DataFrame]], race_id: Union[str, int], interval: float = 30,
+             n_polls: int = None, until: float = None) -> Iterator[Dict[str, pd.DataFrame]]:
+        """fetchを一定間隔で呼び出し、updateの結果を返すジェネレータ
+
+        Parameters
+        ----------
+        fetch : Callable[[], Dict[str, pd.DataFrame]]
+            get_odds_df_dictの結果を返す関数
+        race_id : str or int
+        interval : float, default 30
+            取得を開始する間隔[秒]
+        n_polls : int, default None
+            取得する回数。Noneの場合は制限しない。
+        until : float, default None
+            この時刻(UNIX時間[秒])を過ぎたら終了する。発走時刻を指定するとよい。
+        """
+        i = 0
+        while (n_polls is None or i < n_polls) and (until is None or time.time() < until):
+            started = time.time()
+            yield self.update(race_id, fetch(), started)
+            i += 1
+            if n_polls is not None and i >= n_polls:
+                break
+            time.sleep(max(0.0, interval - (time.time() - started)))
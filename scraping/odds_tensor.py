@@ -0,0 +1,193 @@
+from typing import Dict, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from .odds_series import ODDS_KEYS, OddsSeries, _odds_values
+
+# 券種ごとの(組番の頭数, 着順通りに的中する必要があるか)。キーはnetkeibaのget_odds_df_dictと同じ
+BET_SHAPES = {
+    'TANSHO': (1, True), 'FUKUSHO': (1, True), 'WAKUREN': (2, False), 'UMAREN': (2, False),
+    'WIDE': (2, False), 'UMATAN': (2, True), 'RENPUKU': (3, False), 'RENTAN': (3, True)}
+# netkeirinのget_odds_df_dictのキーや、boatraceの券種名
+BET_ALIASES = {
+    '単勝': 'TANSHO', '複勝': 'FUKUSHO', '枠連': 'WAKUREN', '馬連': 'UMAREN', 'ワイド': 'WIDE', '馬単': 'UMATAN',
+    '三連複': 'RENPUKU', '三連単': 'RENTAN', '3連複': 'RENPUKU', '3連単': 'RENTAN',
+    '2連複': 'UMAREN', '2連単': 'UMATAN', '拡連複': 'WIDE',
+    '2SHAFUKU': 'UMAREN', '2SHATAN': 'UMATAN', '3RENPUKU': 'RENPUKU', '3RENTAN': 'RENTAN'}
+LEG_COLUMNS = ('First', 'Second', 'Third')
+
+
+def bet_key(name: str) -> str:
+    """券種の名前をBET_SHAPESのキーにそろえる"""
+    key = BET_ALIASES.get(name, name)
+    if key not in BET_SHAPES:
+        raise KeyError(f'unknown bet type: {name}')
+    return key
+
+
+class OddsTensor(object):
+    '''
+    1レースのオッズを、券種ごとに馬番(艇番、車番)を添字とする密なfloat32の配列で保持するクラス。
+    単勝・複勝は(n,)、馬連・馬単・ワイドは(n, n)、3連複・3連単は(n, n, n)の配列で、
+    馬番iの添字はi-1とする。順序を問わない券種は添字が昇順の要素(a[0, 4]など)にだけ値を持ち、
+    それ以外とオッズが無い組番はNaNとする。同じ組番を二重に数えないので、全体の和がそのまま使える。
+
+    Examples
+    ----------
+    >>> odds = OddsTensor.from_frames(scraper.get_odds_df_dict(race_id))
+    >>> odds.get('UMAREN', (5, 2))
+    >>> odds.overround('TANSHO')
+    >>> # モデルが出した3連単の確率(n, n, n)から、全ての組番の期待値を一度に計算する
+    >>> ev = odds.expected_value('RENTAN', prob)
+    '''
+
+    def __init__(self, n_runners: int, arrays: Dict[str, np.ndarray] = None):
+        """
+        Parameters
+        ----------
+        n_runners : int
+            頭数。配列の各軸の長さ。
+        arrays : Dict[str, np.ndarray], default None
+            券種ごとの配列。BET_SHAPESの頭数と同じ次元で、各軸の長さがn_runnersのもの。
+        """
+        self.n_runners = n_runners
+        self.arrays: Dict[str, np.ndarray] = dict()
+        for name, array in (arrays or dict()).items():
+            key = bet_key(name)
+            n_legs, _ = BET_SHAPES[key]
+            array = np.asarray(array, dtype=np.float32)
+            if array.shape != (n_runners,) * n_legs:
+                raise ValueError(f'{key} must have shape {(n_runners,) * n_legs}: {array.shape}')
+            self.arrays[key] = array
+
+    def __contains__(self, name: str) -> bool:
+        return bet_key(name) in self.arrays
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.arrays[bet_key(name)]
+
+    def keys(self):
+        return self.arrays.keys()
+
+    @staticmethod
+    def _legs(df: pd.DataFrame, n_legs: int) -> np.ndarray:
+        return np.stack([pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=np.float64)
+                         for col in LEG_COLUMNS[:n_legs]], axis=1)
+
+    @classmethod
+    def from_frames(cls, df_dict: Dict[str, pd.DataFrame], n_runners: int = None) -> 'OddsTensor':
+        """get_odds_df_dictのような、券種ごとのFirst, Second, Third, Oddsの列を持つDataFrameから作る。
+        複勝とワイドの'1.5 - 1.8'のような範囲のオッズは下限を使う。
+
+        Parameters
+        ----------
+        df_dict : Dict[str, pd.DataFrame]
+            券種の名前(BET_SHAPESのキーまたはBET_ALIASESのキー)とDataFrameの辞書。Noneの値は無視する。
+        n_runners : int, default None
+            頭数。Noneの場合は組番に現れる最大の番号。
+        """
+        frames = {bet_key(name): df for name, df in df_dict.items() if df is not None}
+        legs = {key: cls._legs(df, BET_SHAPES[key][0]) for key, df in frames.items()}
+        if n_runners is None:
+            n_runners = max([int(np.nanmax(v)) for v in legs.values() if np.isfinite(v).any()], default=0)
+        arrays = dict()
+        for key, df in frames.items():
+            n_legs, ordered = BET_SHAPES[key]
+            array = np.full((n_runners,) * n_legs, np.nan, dtype=np.float32)
+            index = legs[key]
+            odds = _odds_values(df)
+            # 組番が欠けている行や、範囲外の番号の行は使わない
+            valid = np.isfinite(index).all(axis=1) & (index >= 1).all(axis=1) & (index <= n_runners).all(axis=1)
+            index = index[valid].astype(np.intp) - 1
+            if not ordered:
+                index = np.sort(index, axis=1)
+            array[tuple(index.T)] = odds[valid]
+            arrays[key] = array
+        return cls(n_runners, arrays)
+
+    @classmethod
+    def from_series(cls, series: OddsSeries, race_id: Union[str, int], at: float = None,
+                    n_runners: int = None) -> 'OddsTensor':
+        """OddsSeriesに記録したある時刻のオッズから作る
+
+        Parameters
+        ----------
+        series : OddsSeries
+        race_id : str or int
+        at : float, default None
+            UNIX時間[秒]。Noneの場合は最新。
+        n_runners : int, default None
+            頭数。Noneの場合は組番に現れる最大の番号。
+        """
+        df_dict = dict()
+        for key, bet_type in ODDS_KEYS.items():
+            snapshot = series.snapshot(race_id, bet_type, at)
+            if len(snapshot) == 0:
+                continue
+            combo = snapshot['combo'].to_numpy()
+            df_dict[key] = pd.DataFrame({
+                'First': combo // 10000, 'Second': combo // 100 % 100, 'Third': combo % 100,
+                'Odds': snapshot['Odds'].to_numpy()})
+        return cls.from_frames(df_dict, n_runners)
+
+    def to_frames(self) -> Dict[str, pd.DataFrame]:
+        """券種ごとにFirst, Second, Third(組番の頭数分), Oddsの列を持つDataFrameに戻す。
+        オッズが無い組番は含まず、組番の昇順に並べる。順序を問わない券種の組番は昇順になる。
+        OddsMaxやPopularityなど、Odds以外の列は保持していないので含まない。
+        """
+        df_dict = dict()
+        for key, array in self.arrays.items():
+            index = np.nonzero(~np.isnan(array))
+            data = {LEG_COLUMNS[j]: (index[j] + 1).astype(np.int64) for j in range(array.ndim)}
+            data['Odds'] = array[index]
+            df_dict[key] = pd.DataFrame(data)
+        return df_dict
+
+    def get(self, name: str, combination: Sequence[int]) -> float:
+        """1つの組番のオッズ。順序を問わない券種は組番の順序を問わない。オッズが無い場合はNaN。
+
+        Parameters
+        ----------
+        name : str
+            券種の名前
+        combination : Sequence[int]
+            (5, 2)のような馬番の組
+        """
+        key = bet_key(name)
+        n_legs, ordered = BET_SHAPES[key]
+        combination = [int(i) for i in combination]
+        if len(combination) != n_legs:
+            raise ValueError(f'{key} takes {n_legs} runners: {combination}')
+        # 負の添字で配列の末尾を参照しないように、範囲外の番号はここで弾く
+        if not all(1 <= i <= self.n_runners for i in combination):
+            raise ValueError(f'runner numbers must be between 1 and {self.n_runners}: {combination}')
+        combination = combination if ordered else sorted(combination)
+        return float(self.arrays[key][tuple(i - 1 for i in combination)])
+
+    def implied_probability(self, name: str) -> np.ndarray:
+        """オッズの逆数。オッズが無い組番はNaN。"""
+        with np.errstate(divide='ignore'):
+            return np.float32(1) / self[name]
+
+    def overround(self, name: str) -> float:
+        """全ての組番のオッズの逆数の和。控除率をtとすると、単勝や馬連などでは1/(1-t)に近い値になる。
+        複勝とワイドは的中する組番が複数あるので、的中数倍程度の値になる。
+        """
+        return float(np.nansum(self.implied_probability(name), dtype=np.float64))
+
+    def normalized_probability(self, name: str) -> np.ndarray:
+        """オッズの逆数をoverroundで割り、和が1になるようにした確率"""
+        return self.implied_probability(name) / np.float32(self.overround(name))
+
+    def expected_value(self, name: str, probability: np.ndarray) -> np.ndarray:
+        """全ての組番について、確率×オッズ(100円あたりの払戻の期待値/100)を計算する
+
+        Parameters
+        ----------
+        name : str
+            券種の名前
+        probability : np.ndarray
+            券種の配列と同じ形の、的中確率の配列。順序を問わない券種では、添字が昇順の要素だけを使う。
+        """
+        return np.asarray(probability, dtype=np.float32) * self[name]
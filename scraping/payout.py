@@ -0,0 +1,184 @@
+from typing import Iterable, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .sink import to_int, to_money
+
+# 券種の番号。キーに埋め込むので1桁に収める
+BET_TYPES = {'単勝': 1, '複勝': 2, '枠連': 3, '馬連': 4, 'ワイド': 5, '馬単': 6, '三連複': 7, '三連単': 8}
+# 表記の揺れ
+BET_TYPE_ALIASES = {'3連複': '三連複', '3連単': '三連単', '馬複': '馬連', '枠複': '枠連'}
+# 着順通りに的中する必要がある券種。それ以外は組番を昇順に並べて比較する
+ORDERED_BET_TYPES = {BET_TYPES['馬単'], BET_TYPES['三連単']}
+MAX_LEGS = 3
+
+
+def bet_type_code(bet_type: Union[str, int]) -> int:
+    """券種の名前をBET_TYPESの番号にする。番号を渡した場合はそのまま返す。"""
+    if isinstance(bet_type, (int, np.integer)):
+        return int(bet_type)
+    bet_type = BET_TYPE_ALIASES.get(bet_type, bet_type)
+    return BET_TYPES[bet_type]
+
+
+def pack_combinations(legs: np.ndarray, bet_codes: np.ndarray) -> np.ndarray:
+    """組番を1つの整数にする。順序を問わない券種は昇順に並べてから、1頭目*10000+2頭目*100+3頭目とする。
+
+    Parameters
+    ----------
+    legs : np.ndarray
+        (件数, 3)の整数の配列。2頭以下の組番は残りを0とする。
+    bet_codes : np.ndarray
+        券種の番号の配列
+    """
+    legs = np.asarray(legs, dtype=np.int64).reshape(-1, MAX_LEGS)
+    unordered = ~np.isin(bet_codes, list(ORDERED_BET_TYPES))
+    # 0(該当なし)が後ろに来るように並べる
+    sortable = np.where(legs > 0, legs, np.iinfo(np.int64).max)
+    legs = np.where(unordered[:, None], np.sort(sortable, axis=1), sortable)
+    legs = np.where(legs == np.iinfo(np.int64).max, 0, legs)
+    return legs[:, 0] * 10000 + legs[:, 1] * 100 + legs[:, 2]
+
+
+def normalize_payouts(pay_df: pd.DataFrame) -> pd.DataFrame:
+    """DatabaseScraper.get_pay_dfの結果を、型の決まった列に変換する。複数のレースを縦に結合したものでもよい。
+
+    Returns
+    -------
+    pd.DataFrame
+        race_id : int64
+        券種 : category
+        bet_type : int8。BET_TYPESの番号
+        組番 : 馬番号を整数のtupleにしたもの。順序を問わない券種は昇順に並べる
+        combination : int64。組番をpack_combinationsで1つの整数にしたもの
+        払戻 : int64。100円あたりの払戻金[円]
+        人気 : Int32
+    """
+    bet_names = pay_df['券種'].astype('string').str.strip().replace(BET_TYPE_ALIASES)
+    bet_codes = bet_names.map(BET_TYPES).fillna(0).to_numpy(dtype=np.int8)
+    # '2 - 5 - 6'や'5 → 2 → 6'を数字だけに分け、足りない部分は0で埋める。
+    # 結合した表はインデックスが重複していることがあるので、行の位置をインデックスにしてから分ける
+    numbers = pay_df['馬番号'].astype('string').reset_index(drop=True)
+    legs = numbers.str.extractall(r'(\d+)')[0].astype(np.int64)
+    match = legs.index.get_level_values(1).to_numpy(dtype=np.int64)
+    positions = legs.index.get_level_values(0).to_numpy(dtype=np.int64)
+    keep = match < MAX_LEGS
+    leg_array = np.zeros((len(pay_df), MAX_LEGS), dtype=np.int64)
+    leg_array[positions[keep], match[keep]] = legs.to_numpy()[keep]
+    combinations = pack_combinations(leg_array, bet_codes)
+    return pd.DataFrame({
+        'race_id': pd.to_numeric(pay_df['race_id']).to_numpy(dtype=np.int64),
+        '券種': pd.Categorical(bet_names, categories=list(BET_TYPES)),
+        'bet_type': bet_codes,
+        '組番': _unpack(combinations),
+        'combination': combinations,
+        '払戻': to_money(pay_df['払戻']).fillna(0).to_numpy(dtype=np.int64),
+        '人気': to_int(pay_df['人気']).array,
+    })
+
+
+def _unpack(combinations: np.ndarray) -> list:
+    legs = np.stack([combinations // 10000, combinations // 100 % 100, combinations % 100], axis=1)
+    return [tuple(int(v) for v in row if v > 0) for row in legs]
+
+
+class PayoutIndex(object):
+    '''
+    (レースID, 券種, 組番)から払戻金を引くための索引。
+    3つを1つのint64のキー((race_id * 10 + 券種) * 1000000 + 組番)にまとめ、昇順に並べた配列を二分探索する。
+    lookupで配列をまとめて問い合わせれば、1秒間に数百万件を処理できる。
+
+    Examples
+    ----------
+    >>> index = PayoutIndex(normalize_payouts(pay_df))
+    >>> index.get(202105021211, '馬連', (2, 5))
+    >>> index.lookup(bets['race_id'], bets['bet_type'], bets['combination'])
+    '''
+
+    def __init__(self, payouts: pd.DataFrame):
+        """
+        Parameters
+        ----------
+        payouts : pd.DataFrame
+            normalize_payoutsの戻り値
+        """
+        keys = self.make_keys(
+            payouts['race_id'].to_numpy(), payouts['bet_type'].to_numpy(), payouts['combination'].to_numpy())
+        order = np.argsort(keys, kind='stable')
+        self.keys = keys[order]
+        self.payouts = payouts['払戻'].to_numpy(dtype=np.int64)[order]
+        # 1件ずつ引く場合は、numpyの配列を二分探索するより辞書の方が速い
+        self._map = dict(zip(self.keys.tolist(), self.payouts.tolist()))
+
+    @staticmethod
+    def make_keys(race_ids: np.ndarray, bet_types: np.ndarray, combinations: np.ndarray) -> np.ndarray:
+        race_ids = np.asarray(race_ids, dtype=np.int64)
+        bet_types = np.asarray(bet_types, dtype=np.int64)
+        return (race_ids * 10 + bet_types) * 1000000 + np.asarray(combinations, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _find(self, keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        pos = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+        return pos, self.keys[pos] == keys
+
+    def lookup(self, race_ids: np.ndarray, bet_types: np.ndarray, combinations: np.ndarray,
+               normalized: bool = True) -> np.ndarray:
+        """まとめて払戻金を引く。的中していない組番は0。
+
+        Parameters
+        ----------
+        race_ids : np.ndarray
+        bet_types : np.ndarray
+            BET_TYPESの番号の配列
+        combinations : np.ndarray
+            pack_combinationsで作った組番の配列。normalized=Falseの場合は(件数, 3)の配列でもよい。
+        normalized : bool, default True
+            Falseの場合は、順序を問わない券種の組番を昇順に並べ直してから引く
+
+        Returns
+        -------
+        np.ndarray
+            100円あたりの払戻金[円]の配列
+        """
+        bet_types = np.asarray(bet_types, dtype=np.int64)
+        combinations = np.asarray(combinations, dtype=np.int64)
+        if not normalized:
+            if combinations.ndim == 1:
+                combinations = np.stack(
+                    [combinations // 10000, combinations // 100 % 100, combinations % 100], axis=1)
+            combinations = pack_combinations(combinations, bet_types)
+        keys = self.make_keys(race_ids, bet_types, combinations)
+        if len(self.keys) == 0:
+            return np.zeros(len(keys), dtype=np.int64)
+        pos, found = self._find(keys)
+        return np.where(found, self.payouts[pos], 0)
+
+    def get(self, race_id: Union[str, int], bet_type: Union[str, int], combination: Sequence[int]) -> int:
+        """1件の払戻金を引く。組番の順序は券種に応じて並べ直す。的中していない場合は0。
+
+        Parameters
+        ----------
+        race_id : str or int
+        bet_type : str or int
+            '馬連'などの券種の名前、またはBET_TYPESの番号
+        combination : Sequence[int]
+            (2, 5)のような馬番号、枠番号の組
+        """
+        code = bet_type_code(bet_type)
+        legs = list(combination)
+        if code not in ORDERED_BET_TYPES:
+            legs = sorted(legs)
+        legs = legs + [0] * (MAX_LEGS - len(legs))
+        key = (int(race_id) * 10 + code) * 1000000 + legs[0] * 10000 + legs[1] * 100 + legs[2]
+        return self._map.get(key, 0)
+
+    @classmethod
+    def from_records(cls, records: Iterable) -> 'PayoutIndex':
+        """DatabaseScraper.parse_raceやscrape_manyで取得したRaceRecordのpay_dfからまとめて作る"""
+        dfs = [record.pay_df for record in records if record is not None and record.pay_df is not None]
+        if len(dfs) == 0:
+            dfs = [pd.DataFrame(columns=['race_id', '券種', '馬番号', '払戻', '人気'], dtype=str)]
+        return cls(normalize_payouts(pd.concat(dfs, ignore_index=True)))
@@ -0,0 +1,248 @@
+import os
+import re
+from typing import Dict, List, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from bs4 import BeautifulSoup
+
+from .table import iter_tags
+
+# 5代血統表で、各世代のセルが何行にまたがるか
+PED_SPANS = (16, 8, 4, 2, 1)
+
+
+def parse_ped_table(table: BeautifulSoup) -> List[Tuple[int, int, str, str]]:
+    """db.netkeiba.comの血統表(table.blood_table)から祖先を取り出す。
+
+    Parameters
+    ----------
+    table : BeautifulSoup
+        blood_tableのtable要素
+
+    Returns
+    -------
+    List[Tuple[int, int, str, str]]
+        (世代, 世代内の位置, 馬ID, 馬名)のリスト。
+        世代内の位置は父系が先になるように数えたもので、位置kの父は1つ前の世代の位置k//2、
+        kが偶数なら父、奇数なら母にあたる。馬IDが無いセルは含まない。
+    """
+    entries = list()
+    for r, row in enumerate(iter_tags(table, ('tr',))):
+        # r行目に現れるのは、r行目から始まる世代のセルだけで、古い世代ほど後ろに並ぶ
+        spans = [span for span in PED_SPANS if r % span == 0]
+        cells = [cell for cell in row.children if getattr(cell, 'name', None) == 'td']
+        for span, cell in zip(spans, cells):
+            gen = PED_SPANS.index(span) + 1
+            for a_tag in iter_tags(cell, ('a',)):
+                ret = re.findall(r'/horse/([0-9a-zA-Z]{10})', a_tag.get('href', ''))
+                if len(ret) != 0:
+                    entries.append((gen, r // span, ret[0], a_tag.text.split('\n')[0]))
+                    break
+    return entries
+
+
+class PedigreeGraph(object):
+    '''
+    血統を、馬ごとに整数の番号を振り、父と母の番号の配列として保持するクラス。
+    同じ祖先は1つの番号にまとめるので、有名な種牡馬が何千頭の血統に現れても1回分しか保存しない。
+    祖先や子孫の検索、近交係数の計算は、番号の配列に対する演算で行う。
+
+    Examples
+    ----------
+    >>> graph = PedigreeGraph.load('data/pedigree.npz') if os.path.exists('data/pedigree.npz') else PedigreeGraph()
+    >>> HorseDataScraper().crawl_pedigrees(graph, horse_ids)
+    >>> graph.save('data/pedigree.npz')
+    >>> graph.inbreeding('2018105027')
+    '''
+    UNKNOWN = -1
+
+    def __init__(self):
+        self.ids: List[str] = list()
+        self.names: List[str] = list()
+        self._index: Dict[str, int] = dict()
+        self._sire = np.full(0, self.UNKNOWN, dtype=np.int32)
+        self._dam = np.full(0, self.UNKNOWN, dtype=np.int32)
+        # 血統表から分かっている世代数。血統表を取得した馬は5、その父母は4、...
+        self._depth = np.zeros(0, dtype=np.int8)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, horse_id: str) -> bool:
+        return str(horse_id) in self._index
+
+    @property
+    def sire(self) -> np.ndarray:
+        """番号iの馬の父の番号。不明な場合は-1。"""
+        return self._sire[:len(self)]
+
+    @property
+    def dam(self) -> np.ndarray:
+        """番号iの馬の母の番号。不明な場合は-1。"""
+        return self._dam[:len(self)]
+
+    @property
+    def depth(self) -> np.ndarray:
+        """番号iの馬について、血統表から分かっている世代数"""
+        return self._depth[:len(self)]
+
+    def index(self, horse_id: str) -> int:
+        """馬IDに対応する番号。登録されていない場合はKeyError。"""
+        return self._index[str(horse_id)]
+
+    def _node(self, horse_id: str, name: str = None) -> int:
+        i = self._index.get(horse_id)
+        if i is not None:
+            if name and not self.names[i]:
+                self.names[i] = name
+            return i
+        i = len(self.ids)
+        if i == len(self._sire):
+            # 配列は倍々に伸ばして、追加の計算量を償却する
+            capacity = max(1024, 2 * i)
+            self._sire = np.concatenate([self._sire, np.full(capacity - i, self.UNKNOWN, dtype=np.int32)])
+            self._dam = np.concatenate([self._dam, np.full(capacity - i, self.UNKNOWN, dtype=np.int32)])
+            self._depth = np.concatenate([self._depth, np.zeros(capacity - i, dtype=np.int8)])
+        self._index[horse_id] = i
+        self.ids.append(horse_id)
+        self.names.append(name or '')
+        return i
+
+    def add_pedigree(self, horse_id: Union[str, int], entries: List[Tuple[int, int, str, str]]) -> None:
+        """parse_ped_tableで取り出した血統表を追加する
+
+        Parameters
+        ----------
+        horse_id : str or int
+            血統表の馬の馬ID
+        entries : List[Tuple[int, int, str, str]]
+            parse_ped_tableの戻り値
+        """
+        subject = self._node(str(horse_id))
+        n_gens = max([gen for gen, _, _, _ in entries], default=0)
+        nodes = {(0, 0): subject}
+        for gen, k, ancestor_id, name in sorted(entries):
+            i = self._node(ancestor_id, name)
+            nodes[(gen, k)] = i
+            child = nodes.get((gen - 1, k // 2))
+            if child is not None:
+                (self._sire if k % 2 == 0 else self._dam)[child] = i
+            self._depth[i] = max(self._depth[i], n_gens - gen)
+        self._depth[subject] = max(self._depth[subject], n_gens)
+
+    def known_depth(self, horse_id: Union[str, int]) -> int:
+        """血統が何世代分分かっているか。父母の血統が分かっている場合はそれも考慮する。"""
+        i = self._index.get(str(horse_id))
+        if i is None:
+            return 0
+        depth = int(self._depth[i])
+        s, d = self._sire[i], self._dam[i]
+        if s != self.UNKNOWN and d != self.UNKNOWN:
+            depth = max(depth, 1 + min(int(self._depth[s]), int(self._depth[d])))
+        return depth
+
+    def parents(self, horse_id: Union[str, int]) -> Tuple[str, str]:
+        """(父の馬ID, 母の馬ID)。不明な場合はNone。"""
+        i = self.index(horse_id)
+        s, d = self._sire[i], self._dam[i]
+        return (None if s == self.UNKNOWN else self.ids[s],
+                None if d == self.UNKNOWN else self.ids[d])
+
+    def _expand(self, i: int, generations: int) -> Tuple[np.ndarray, np.ndarray]:
+        # iから親をたどった経路ごとに(祖先の番号, 世代)を返す。同じ祖先が複数の経路で現れることがある
+        frontier = np.array([i], dtype=np.int32)
+        nodes, gens = list(), list()
+        for gen in range(1, generations + 1):
+            # 父、母の順に交互に並べて、血統表と同じ順番にする
+            frontier = np.stack([self._sire[frontier], self._dam[frontier]], axis=1).ravel()
+            frontier = frontier[frontier != self.UNKNOWN]
+            if len(frontier) == 0:
+                break
+            nodes.append(frontier)
+            gens.append(np.full(len(frontier), gen, dtype=np.int8))
+        if len(nodes) == 0:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int8)
+        return np.concatenate(nodes), np.concatenate(gens)
+
+    def pedigree(self, horse_id: Union[str, int], generations: int = 5) -> pd.DataFrame:
+        """get_pedsと同じ形式で、generations世代分の祖先を返す。同じ祖先は経路ごとに現れる。"""
+        nodes, gens = self._expand(self.index(horse_id), generations)
+        return pd.DataFrame({
+            'name': [self.names[i] for i in nodes],
+            'horse_id': [self.ids[i] for i in nodes],
+            'gen': gens.astype(int)})
+
+    def generation(self, horse_id: Union[str, int], gen: int) -> List[str]:
+        """ちょうどgen世代前の祖先の馬IDを、血統表と同じ順番で返す"""
+        nodes, gens = self._expand(self.index(horse_id), gen)
+        return [self.ids[i] for i in nodes[gens == gen]]
+
+    def ancestors(self, horse_id: Union[str, int], generations: int = 5) -> List[str]:
+        """generations世代以内の祖先の馬ID。重複は除く。"""
+        nodes, _ = self._expand(self.index(horse_id), generations)
+        return [self.ids[i] for i in np.unique(nodes)]
+
+    def descendants(self, horse_id: Union[str, int]) -> List[str]:
+        """登録されている馬のうち、horse_idの子孫であるものの馬ID"""
+        n = len(self)
+        # 末尾に常にFalseの要素を置き、-1(不明)で参照した場合にFalseとなるようにする
+        mask = np.zeros(n + 1, dtype=bool)
+        mask[self.index(horse_id)] = True
+        sire, dam = self.sire, self.dam
+        while True:
+            new = (mask[sire] | mask[dam]) & ~mask[:n]
+            if not new.any():
+                break
+            mask[:n] |= new
+        mask[self.index(horse_id)] = False
+        return [self.ids[i] for i in np.flatnonzero(mask[:n])]
+
+    def inbreeding(self, horse_id: Union[str, int], generations: int = 5) -> float:
+        """generations世代以内の祖先から計算した近交係数。
+        祖先を親より子が後になるように並べ、血縁係数の表を1頭ずつ行単位で埋める方法で計算する。
+        """
+        i = self.index(horse_id)
+        nodes, gens = self._expand(i, generations)
+        s, d = self._sire[i], self._dam[i]
+        if s == self.UNKNOWN or d == self.UNKNOWN:
+            return 0.0
+        # 子から祖先までの最長の世代数が大きい順に並べると、親は必ず子より前に来る
+        members, inverse = np.unique(nodes, return_inverse=True)
+        max_gen = np.zeros(len(members), dtype=np.int8)
+        np.maximum.at(max_gen, inverse, gens)
+        members = members[np.argsort(-max_gen, kind='stable')]
+        pos = np.full(len(self) + 1, -1, dtype=np.int32)
+        pos[members] = np.arange(len(members))
+        k = len(members)
+        # 最後の行と列は不明な親を表し、常に0とする
+        f = np.zeros((k + 1, k + 1))
+        for j, node in enumerate(members):
+            ps, pd_ = pos[self._sire[node]], pos[self._dam[node]]
+            # 世代数の上限で切った場合、子より後に並んだ親は不明として扱う
+            ps, pd_ = (ps if ps < j else -1), (pd_ if pd_ < j else -1)
+            row = 0.5 * (f[ps, :j] + f[pd_, :j])
+            f[j, :j] = row
+            f[:j, j] = row
+            f[j, j] = 0.5 * (1 + f[ps, pd_])
+        return float(f[pos[s], pos[d]])
+
+    def save(self, path: str) -> None:
+        """.npz形式で保存する"""
+        path = os.path.expanduser(path)
+        tmp_path = f'{path}.{os.getpid()}.tmp.npz'
+        np.savez(tmp_path, ids=np.array(self.ids, dtype=str), names=np.array(self.names, dtype=str),
+                 sire=self.sire, dam=self.dam, depth=self.depth)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'PedigreeGraph':
+        graph = cls()
+        with np.load(os.path.expanduser(path)) as data:
+            graph.ids = data['ids'].tolist()
+            graph.names = data['names'].tolist()
+            graph._sire = data['sire'].astype(np.int32)
+            graph._dam = data['dam'].astype(np.int32)
+            graph._depth = data['depth'].astype(np.int8)
+        graph._index = {horse_id: i for i, horse_id in enumerate(graph.ids)}
+        return graph
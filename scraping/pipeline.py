@@ -0,0 +1,201 @@
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, Tuple
+
+
+def _timed(func: Callable, arg: Any) -> Tuple[Any, float]:
+    # プロセスプールに渡すのでモジュールのトップレベルに置く
+    start = time.perf_counter()
+    result = func(arg)
+    return result, time.perf_counter() - start
+
+
+class StageStats(object):
+    '''パイプラインの1段分の処理件数と処理時間'''
+
+    def __init__(self, name: str, workers: int):
+        self.name = name
+        self.workers = workers
+        self.count = 0
+        self.errors = 0
+        self.busy = 0.0
+        self.last_done = None
+
+    def summary(self, started_at: float) -> dict:
+        """
+        Returns
+        -------
+        dict
+            count : 完了した件数
+            errors : 例外が発生した件数
+            busy_seconds : ワーカーが処理に費やした時間の合計
+            items_per_sec : パイプライン開始から最後の完了までの、1秒あたりの完了件数
+            utilization : ワーカーが処理中だった時間の割合。1に近い段がボトルネック
+        """
+        elapsed = 0.0 if self.last_done is None else self.last_done - started_at
+        done = self.count + self.errors
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'busy_seconds': self.busy,
+            'items_per_sec': done / elapsed if elapsed > 0 else 0.0,
+            'utilization': self.busy / (elapsed * self.workers) if elapsed > 0 and self.workers > 0 else 0.0,
+        }
+
+
+class PipelineStats(object):
+    '''
+    run_pipelineの段ごとのスループットを集計するクラス。
+    各段のutilizationを比べることで、どちらのプールを大きくすべきか判断できる。
+
+    Examples
+    ----------
+    >>> stats = PipelineStats()
+    >>> records = list(scraper.scrape_many(race_ids, stats=stats))
+    >>> print(stats)
+    '''
+
+    def __init__(self):
+        self.stages: Dict[str, StageStats] = dict()
+        self.started_at = None
+        self._lock = threading.Lock()
+
+    def start(self, workers: Dict[str, int]) -> None:
+        with self._lock:
+            self.started_at = time.perf_counter()
+            self.stages = {name: StageStats(name, n) for name, n in workers.items()}
+
+    def record(self, stage: str, elapsed: float = None) -> None:
+        """1件の完了を記録する。elapsedがNoneの場合は例外が発生したものとして数える。"""
+        with self._lock:
+            s = self.stages[stage]
+            if elapsed is None:
+                s.errors += 1
+            else:
+                s.count += 1
+                s.busy += elapsed
+            s.last_done = time.perf_counter()
+
+    def summary(self) -> Dict[str, dict]:
+        with self._lock:
+            if self.started_at is None:
+                return dict()
+            return {name: s.summary(self.started_at) for name, s in self.stages.items()}
+
+    def __str__(self) -> str:
+        lines = list()
+        for name, s in self.summary().items():
+            lines.append(
+                f"{name}: {s['count']} ok, {s['errors']} errors, "
+                f"{s['items_per_sec']:.1f} items/s, utilization {s['utilization']:.0%}")
+        return '\n'.join(lines)
+
+
+def run_pipeline(items: Iterable, fetch: Callable, parse: Callable,
+                 fetch_workers: int = 8, parse_workers: int = None, ordered: bool = True,
+                 return_exceptions: bool = False, stats: PipelineStats = None,
+                 max_pending: int = None) -> Iterator[Tuple[Any, Any]]:
+    """fetchをスレッドプールで、parseをプロセスプールで実行し、結果を順次返す。
+    通信待ちとパースを別々のプールで並行に進めるので、パースがGILに律速されない。
+
+    Parameters
+    ----------
+    items : Iterable
+        fetchに渡す値
+    fetch : Callable
+        itemを受け取り、parseに渡す値を返す関数。スレッドで実行する。
+    parse : Callable
+        fetchの戻り値を受け取る関数。プロセスプールで実行するので、pickle可能である必要がある。
+    fetch_workers : int, default 8
+        取得に利用するスレッド数
+    parse_workers : int, default None
+        パースに利用するプロセス数。Noneの場合はCPUのコア数。0の場合は呼び出し元のプロセスでパースする。
+    ordered : bool, default True
+        Trueの場合はitemsと同じ順番で、Falseの場合は完了した順番で返す
+    return_exceptions : bool, default False
+        Trueの場合は、発生した例外を結果の代わりに返す
+    stats : PipelineStats, default None
+        段ごとのスループットを記録するPipelineStats
+    max_pending : int, default None
+        同時に処理中にする件数の上限。Noneの場合はワーカー数の2倍。
+        ordered=Trueで先頭の取得が遅れている間、完了して返す順番を待っている結果もこの件数に含める。
+
+    Yields
+    -------
+    Tuple[Any, Any]
+        (item, parseの戻り値)
+    """
+    items = list(items)
+    if parse_workers is None:
+        parse_workers = os.cpu_count() or 1
+    if max_pending is None:
+        max_pending = 2 * (fetch_workers + max(parse_workers, 1))
+    max_pending = max(max_pending, 1)
+    stats = PipelineStats() if stats is None else stats
+    fetch_pool = ThreadPoolExecutor(max_workers=fetch_workers, thread_name_prefix='pipeline-fetch')
+    parse_pool = None
+    pending = dict()
+    try:
+        if parse_workers > 0:
+            parse_pool = ProcessPoolExecutor(max_workers=parse_workers)
+            # forkで子プロセスを作る場合に備えて、通信スレッドが動き出す前にワーカーを起動しておく
+            parse_pool.submit(int).result()
+        stats.start({'fetch': fetch_workers, 'parse': max(parse_workers, 1)})
+        queue = iter(enumerate(items))
+        finished = dict()
+        next_index = 0
+
+        def refill():
+            # 処理中の件数と、返す順番を待っている結果の件数の合計がmax_pendingを超えないようにする
+            while len(pending) + len(finished) < max_pending:
+                entry = next(queue, None)
+                if entry is None:
+                    return
+                i, item = entry
+                pending[fetch_pool.submit(_timed, fetch, item)] = (i, 'fetch')
+
+        refill()
+        while pending:
+            done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+            for future in done:
+                i, stage = pending.pop(future)
+                try:
+                    value, elapsed = future.result()
+                except Exception as e:
+                    stats.record(stage)
+                    value = e
+                else:
+                    stats.record(stage, elapsed)
+                    if stage == 'fetch':
+                        if parse_pool is not None:
+                            pending[parse_pool.submit(_timed, parse, value)] = (i, 'parse')
+                            continue
+                        try:
+                            value, elapsed = _timed(parse, value)
+                        except Exception as e:
+                            stats.record('parse')
+                            value = e
+                        else:
+                            stats.record('parse', elapsed)
+                finished[i] = value
+                if ordered:
+                    while next_index in finished:
+                        yield _emit(items[next_index], finished.pop(next_index), return_exceptions)
+                        next_index += 1
+                else:
+                    yield _emit(items[i], finished.pop(i), return_exceptions)
+                refill()
+    finally:
+        for future in pending:
+            future.cancel()
+        fetch_pool.shutdown(wait=False, cancel_futures=True)
+        if parse_pool is not None:
+            parse_pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _emit(item: Any, value: Any, return_exceptions: bool) -> Tuple[Any, Any]:
+    if isinstance(value, Exception) and not return_exceptions:
+        raise value
+    return item, value
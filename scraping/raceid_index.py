@@ -0,0 +1,247 @@
+import datetime
+import os
+import warnings
+from typing import Iterable, List, Union
+
+import numpy as np
+import pandas as pd
+
+from .journal import load_ids
+
+# レースID(YYYYCCKKDDRR)を分解した列を持つ構造化配列の型
+# date は開催日をYYYYMMDDの整数で表したもの。不明な場合は0。
+INDEX_DTYPE = np.dtype([
+    ('race_id', np.int64),
+    ('date', np.int32),
+    ('year', np.int16),
+    ('course', np.int8),
+    ('kai', np.int8),
+    ('day', np.int8),
+    ('race', np.int8),
+])
+
+
+def decode_race_ids(race_ids: Iterable[Union[str, int]], dates: Iterable[int] = None) -> np.ndarray:
+    """レースIDを分解し、INDEX_DTYPEの構造化配列を作る。並べ替えや重複の除去はしない。
+
+    Parameters
+    ----------
+    race_ids : Iterable[str or int]
+        12桁のレースID
+    dates : Iterable[int], default None
+        レースIDと同じ長さの、YYYYMMDD形式の開催日。Noneの場合は全て0(不明)とする。
+    """
+    ids = np.asarray([int(race_id) for race_id in race_ids], dtype=np.int64)
+    arr = np.zeros(len(ids), dtype=INDEX_DTYPE)
+    arr['race_id'] = ids
+    if dates is not None:
+        arr['date'] = np.asarray(list(dates), dtype=np.int32)
+    arr['year'] = ids // 10 ** 8
+    arr['course'] = ids // 10 ** 6 % 100
+    arr['kai'] = ids // 10 ** 4 % 100
+    arr['day'] = ids // 100 % 100
+    arr['race'] = ids % 100
+    return arr
+
+
+def _date_to_int(date: datetime.date) -> int:
+    return date.year * 10000 + date.month * 100 + date.day
+
+
+class RaceIdIndex(object):
+    '''
+    レースIDを昇順に並べ、年・場・開催・日目・レース番号・開催日の列と合わせて保持するクラス。
+    .npy形式で保存し、メモリマップで読み込むので、読み込みにはほとんど時間がかからない。
+    レースIDの上位の桁ほど大きな単位を表すので、年や開催による絞り込みは二分探索で行える。
+
+    .npyファイルはリポジトリには含めていない。resources/netkeiba_race_id/*.txtから作り、各自の環境に保存する。
+    テキストファイルには開催日が無いので、作った直後はdateが全て0(不明)となり、betweenはそれらのレースを返さない。
+    開催日はRaceidScraper.backfill_indexで年ごとに取得して埋める。
+    以降はupdate_indexでlast_dateの翌日から取得を再開できる。
+
+    Examples
+    ----------
+    >>> path = os.path.expanduser('~/.cache/netkeiba_race_id.npy')
+    >>> if os.path.exists(path):
+    ...     index = RaceIdIndex.load(path)
+    ... else:
+    ...     index = RaceIdIndex.from_text(glob.glob('resources/netkeiba_race_id/*.txt'))
+    >>> scraper = RaceidScraper()
+    >>> # 開催日が不明なレースIDがある年の開催日を埋める。2回目以降は何もしない
+    >>> scraper.backfill_index(index, years=range(2019, 2022))
+    >>> # 最後に記録した開催日の翌日以降だけを取得して追加する
+    >>> scraper.update_index(index)
+    >>> index.save(path)
+    >>> index.meeting(2021, 5, 2)  # 2021年 2回東京の全レース
+    >>> index.between(datetime.date(2021, 5, 1), datetime.date(2021, 5, 31))
+    '''
+
+    def __init__(self, data: np.ndarray = None):
+        """
+        Parameters
+        ----------
+        data : np.ndarray, default None
+            INDEX_DTYPEの構造化配列。race_idの昇順に並べ、重複の無いものを渡すこと。
+        """
+        self.data = None
+        self._set_data(np.zeros(0, dtype=INDEX_DTYPE) if data is None else data)
+
+    def _set_data(self, data: np.ndarray) -> None:
+        self.data = data
+        # 構造化配列の列は飛び飛びに並んでいて二分探索のたびにコピーされるので、連続した配列を持っておく
+        self._ids = np.ascontiguousarray(data['race_id'])
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> 'RaceIdIndex':
+        """saveで保存したファイルを読み込む。
+
+        Parameters
+        ----------
+        path : str
+        mmap : bool, default True
+            Trueの場合はメモリマップで読み込み、参照した部分だけをディスクから読む
+        """
+        data = np.load(os.path.expanduser(path), mmap_mode='r' if mmap else None)
+        if data.dtype != INDEX_DTYPE:
+            raise ValueError(f'{path} is not a race id index: {data.dtype}')
+        return cls(data)
+
+    @classmethod
+    def from_text(cls, paths: Union[str, Iterable[str]]) -> 'RaceIdIndex':
+        """resources/netkeiba_race_id/*.txtのような、1行に1つずつレースIDを書いたファイルから作る。
+        ファイルには開催日が無いので、dateは0(不明)となる。開催日はRaceidScraper.backfill_indexで埋める。
+        """
+        index = cls()
+        index.add(load_ids(paths))
+        return index
+
+    def save(self, path: str) -> None:
+        """.npy形式で保存する。書き込み中に停止しても元のファイルが壊れないように、一時ファイルから置き換える。"""
+        path = os.path.expanduser(path)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.save(f, np.ascontiguousarray(self.data))
+        os.replace(tmp_path, path)
+
+    def add(self, race_ids: Iterable[Union[str, int]], dates: Iterable[Union[datetime.date, int]] = None) -> int:
+        """レースIDを追加する。登録済みのIDは、開催日が不明だった場合だけ開催日を更新する。
+
+        Parameters
+        ----------
+        race_ids : Iterable[str or int]
+        dates : Iterable[datetime.date or int], default None
+            レースIDと同じ長さの開催日のリスト
+
+        Returns
+        -------
+        int
+            新たに追加したIDの数
+        """
+        if dates is not None:
+            dates = [d if isinstance(d, (int, np.integer)) else _date_to_int(d) for d in dates]
+        new = decode_race_ids(race_ids, dates)
+        n_before = len(self.data)
+        merged = np.concatenate([self.data, new])
+        # 同じIDの中では開催日が分かっているものを先頭にして、先頭だけを残す
+        order = np.lexsort((-merged['date'], merged['race_id']))
+        merged = merged[order]
+        keep = np.ones(len(merged), dtype=bool)
+        keep[1:] = merged['race_id'][1:] != merged['race_id'][:-1]
+        self._set_data(merged[keep])
+        return len(self.data) - n_before
+
+    @property
+    def race_ids(self) -> np.ndarray:
+        return self._ids
+
+    @property
+    def last_date(self) -> datetime.date:
+        """開催日が分かっているレースのうち、最も新しい開催日。無い場合はNone。"""
+        dates = self.data['date']
+        if len(dates) == 0 or dates.max() == 0:
+            return None
+        return datetime.datetime.strptime(str(dates.max()), '%Y%m%d').date()
+
+    @property
+    def last_year(self) -> int:
+        """登録されているレースIDの最も新しい年。無い場合はNone。"""
+        return int(self.data['year'][-1]) if len(self.data) > 0 else None
+
+    def undated_years(self) -> List[int]:
+        """開催日が不明なレースIDを含む年を昇順に返す"""
+        return np.unique(self.data['year'][self.data['date'] == 0]).tolist()
+
+    def _prefix_slice(self, prefix: int, n_digits: int) -> np.ndarray:
+        # レースIDの上位の桁がprefixと一致する範囲は、昇順に並べた配列の連続した区間になる
+        scale = 10 ** (12 - n_digits)
+        lo, hi = np.searchsorted(self._ids, [prefix * scale, (prefix + 1) * scale])
+        return self.data[lo:hi]
+
+    def year(self, year: int) -> np.ndarray:
+        """指定した年のレースIDを返す"""
+        return self._prefix_slice(year, 4)['race_id']
+
+    def meeting(self, year: int, course: int, kai: int = None, day: int = None) -> np.ndarray:
+        """指定した年・場・開催・日目のレースIDを返す。
+
+        Parameters
+        ----------
+        year : int
+        course : int
+            場コード。DatabaseScraper.RACECOURSE_DICTのキー。
+        kai : int, default None
+            N回。Noneの場合はその年のその場の全てのレース。
+        day : int, default None
+            N日目。Noneの場合は開催の全てのレース。kaiを指定した場合のみ有効。
+        """
+        prefix, n_digits = year * 100 + course, 6
+        if kai is not None:
+            prefix, n_digits = prefix * 100 + kai, 8
+            if day is not None:
+                prefix, n_digits = prefix * 100 + day, 10
+        return self._prefix_slice(prefix, n_digits)['race_id']
+
+    def between(self, start: datetime.date, end: datetime.date, course: int = None) -> np.ndarray:
+        """開催日がstart以上end以下のレースIDを返す。
+        開催日が不明なレースは含まないので、startからendの年に開催日が不明なレースがある場合は警告を出す。
+
+        Parameters
+        ----------
+        start : datetime.date
+        end : datetime.date
+        course : int, default None
+            指定した場合は、その場のレースだけを返す
+        """
+        # 年はレースIDの上位4桁なので、先に二分探索で範囲を狭めてから日付で絞り込む
+        lo, hi = np.searchsorted(self._ids, [start.year * 10 ** 8, (end.year + 1) * 10 ** 8])
+        data = self.data[lo:hi]
+        undated = data['date'] == 0
+        if course is not None:
+            undated &= data['course'] == course
+        if undated.any():
+            years = np.unique(data['year'][undated]).tolist()
+            warnings.warn(f'{int(undated.sum())} race ids in {years} have no date and are excluded; '
+                          'fill them with RaceidScraper.backfill_index', stacklevel=2)
+        mask = (data['date'] >= _date_to_int(start)) & (data['date'] <= _date_to_int(end))
+        if course is not None:
+            mask &= data['course'] == course
+        return self._ids[lo:hi][mask]
+
+    def to_frame(self) -> pd.DataFrame:
+        """全ての列をDataFrameとして返す。dateはdatetime64に変換し、不明な場合はNaTとする。"""
+        df = pd.DataFrame({name: self.data[name] for name in INDEX_DTYPE.names})
+        df['date'] = pd.to_datetime(df['date'].where(df['date'] > 0).astype('Int64').astype(str),
+                                    format='%Y%m%d', errors='coerce')
+        return df
+
+    def __contains__(self, race_id: Union[str, int]) -> bool:
+        race_id = int(race_id)
+        ids = self._ids
+        i = np.searchsorted(ids, race_id)
+        return bool(i < len(ids) and ids[i] == race_id)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __iter__(self):
+        return iter(self._ids.tolist())
@@ -0,0 +1,233 @@
+import contextlib
+import os
+import threading
+import time
+from typing import Dict
+from urllib.parse import urlsplit
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class TokenBucket(object):
+    '''
+    トークンバケット方式のレート制限。
+    1秒あたりrate個のトークンが補充され、最大burst個まで貯められる。
+    '''
+
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        Parameters
+        ----------
+        rate : float
+            1秒あたりに許可するリクエスト数
+        burst : int, default 1
+            連続して許可するリクエスト数の上限
+        """
+        assert rate > 0
+        assert burst >= 1
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens: float, updated_at: float, now: float):
+        # トークンを補充してから1つ予約し、(待ち時間, 新しいトークン数)を返す
+        tokens = min(self.burst, tokens + (now - updated_at) * self.rate)
+        tokens -= 1
+        wait = 0 if tokens >= 0 else -tokens / self.rate
+        return wait, tokens
+
+    def acquire(self) -> float:
+        """トークンを1つ取得する。足りない場合は補充されるまで待機する。
+
+        Returns
+        -------
+        float
+            待機した時間[秒]
+        """
+        with self._lock:
+            now = time.monotonic()
+            wait, self._tokens = self._reserve(self._tokens, self._updated_at, now)
+            self._updated_at = now
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class FileTokenBucket(TokenBucket):
+    '''
+    状態をファイルに保存し、複数のプロセスで共有するトークンバケット。
+    ファイルロックで排他制御するので、同じマシン上のプロセス間で制限を共有できる。
+    '''
+
+    def __init__(self, path: str, rate: float, burst: int = 1):
+        """
+        Parameters
+        ----------
+        path : str
+            状態を保存するファイルのパス
+        rate : float
+            1秒あたりに許可するリクエスト数
+        burst : int, default 1
+            連続して許可するリクエスト数の上限
+        """
+        super().__init__(rate, burst)
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def _lock_file(self, f) -> None:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+    def _unlock_file(self, f) -> None:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def acquire(self) -> float:
+        # プロセス間で時刻を比較するので、monotonicではなくtimeを使う
+        with self._lock, open(self.path, 'a+') as f:
+            self._lock_file(f)
+            try:
+                f.seek(0)
+                state = f.read().split()
+                now = time.time()
+                if len(state) == 2:
+                    tokens, updated_at = float(state[0]), float(state[1])
+                else:
+                    tokens, updated_at = float(self.burst), now
+                wait, tokens = self._reserve(tokens, updated_at, now)
+                f.seek(0)
+                f.truncate()
+                f.write(f'{tokens} {now}')
+                f.flush()
+            finally:
+                self._unlock_file(f)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class RateLimiter(object):
+    '''
+    ホストごとにトークンバケットを持ち、リクエストの頻度を制限するクラス。
+    HttpTransportはネットワークにアクセスする直前にこのクラスのacquireを呼び出す。
+
+    Examples
+    ----------
+    >>> limiter = RateLimiter()
+    >>> limiter.set_rate('db.netkeiba.com', rate=2, burst=4)
+    >>> # 複数のプロセスで制限を共有する場合
+    >>> limiter = RateLimiter(state_dir='~/.cache/scraping/ratelimit')
+    '''
+
+    def __init__(self, default_rate: float = None, default_burst: int = 1, state_dir: str = None):
+        """
+        Parameters
+        ----------
+        default_rate : float, default None
+            個別に設定していないホストに対する1秒あたりのリクエスト数。Noneの場合は制限しない。
+        default_burst : int, default 1
+            個別に設定していないホストに対するバースト数
+        state_dir : str, default None
+            指定した場合は、このディレクトリに状態を保存してプロセス間で制限を共有する
+        """
+        self.default_rate = default_rate
+        self.default_burst = default_burst
+        self.state_dir = None if state_dir is None else os.path.abspath(os.path.expanduser(state_dir))
+        self._buckets: Dict[str, TokenBucket] = dict()
+        self._lock = threading.Lock()
+
+    def _make_bucket(self, host: str, rate: float, burst: int) -> TokenBucket:
+        if self.state_dir is None:
+            return TokenBucket(rate, burst)
+        return FileTokenBucket(os.path.join(self.state_dir, f'{host}.bucket'), rate, burst)
+
+    def set_rate(self, host: str, rate: float, burst: int = 1) -> None:
+        """ホストごとのレートを設定する。
+
+        Parameters
+        ----------
+        host : str
+            db.netkeiba.comなどのホスト名
+        rate : float
+            1秒あたりに許可するリクエスト数。Noneの場合は制限しない。
+        burst : int, default 1
+            連続して許可するリクエスト数の上限
+        """
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is not None and bucket.rate == rate and bucket.burst == burst:
+                # 同じ設定の場合は、貯まっているトークンを捨てないようにそのまま使う
+                return
+            self._buckets[host] = None if rate is None else self._make_bucket(host, rate, burst)
+
+    def set_interval(self, host: str, interval: float) -> None:
+        """リクエスト間隔の下限[秒]でレートを設定する。"""
+        self.set_rate(host, 1 / interval if interval else None)
+
+    @contextlib.contextmanager
+    def override_interval(self, hosts, interval: float):
+        """withの間だけ、hostsのリクエスト間隔の下限をintervalにする。従来のsleep_time引数との互換用。
+        終了後は元のトークンバケット(貯まっているトークンを含む)に戻すので、他の処理の設定には影響しない。
+
+        Parameters
+        ----------
+        hosts : str or Iterable[str]
+            ホスト名
+        interval : float
+            リクエスト間隔の下限[秒]。Noneの場合は何もしない。
+        """
+        if interval is None:
+            yield
+            return
+        hosts = {hosts} if isinstance(hosts, str) else set(hosts)
+        with self._lock:
+            saved = {host: self._buckets[host] for host in hosts if host in self._buckets}
+            for host in hosts:
+                self._buckets[host] = self._make_bucket(host, 1 / interval, 1) if interval else None
+        try:
+            yield
+        finally:
+            with self._lock:
+                for host in hosts:
+                    if host in saved:
+                        self._buckets[host] = saved[host]
+                    else:
+                        self._buckets.pop(host, None)
+
+    def _get_bucket(self, host: str) -> TokenBucket:
+        with self._lock:
+            if host not in self._buckets:
+                self._buckets[host] = None if self.default_rate is None else \
+                    self._make_bucket(host, self.default_rate, self.default_burst)
+            return self._buckets[host]
+
+    def acquire(self, url: str) -> float:
+        """urlのホストに対するトークンを取得する。
+
+        Parameters
+        ----------
+        url : str
+            URLまたはホスト名
+
+        Returns
+        -------
+        float
+            待機した時間[秒]
+        """
+        host = urlsplit(url).hostname if '://' in url else url
+        bucket = self._get_bucket(host or '')
+        if bucket is None:
+            return 0
+        return bucket.acquire()
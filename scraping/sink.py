@@ -0,0 +1,400 @@
+import json
+import os
+import threading
+import uuid
+from typing import Callable, Dict, List, Union
+
+import pandas as pd
+
+# 列名ごとの変換方法。スクレイパーが返す列名をそのまま使い、存在する列だけを変換する。
+COLUMN_TYPES = {
+    # 整数
+    '着順': 'int', '枠番': 'int', '馬番': 'int', '人気': 'int', '頭数': 'int', 'R': 'int',
+    'ﾀｲﾑ指数': 'int', '馬場指数': 'int', '着': 'int', '枠': 'int',
+    'First': 'int', 'Second': 'int', 'Third': 'int',
+    '開催': 'int', 'N日目': 'int', 'Nレース目': 'int', 'コース長': 'int', '年': 'int', '月': 'int', '日': 'int',
+    # 小数
+    '斤量': 'float', '上り': 'float', '賞金(万円)': 'float', '賞金': 'float',
+    # オッズ。複勝のように範囲で表示されるものは下限と上限に分ける
+    '単勝': 'odds', 'オッズ': 'odds', 'Odds': 'odds',
+    # 払戻金
+    '払戻': 'money', '払戻金': 'money',
+    # その他
+    'タイム': 'time', 'レースタイム': 'time',
+    '馬体重': 'weight',
+    '性齢': 'sex_age',
+    '距離': 'distance',
+    '日付': 'date',
+    # 種類の少ない文字列
+    '馬場': 'category', '天気': 'category', '券種': 'category', '勝式': 'category',
+    'レース種別': 'category', '周回方向': 'category', 'コース状態': 'category',
+    'レースランク': 'category', 'G123': 'category', '性別': 'category', 'コース種別': 'category',
+}
+
+_RE_TIME = r"^\s*(?:(\d+)[:'])?(\d+)(?:[.\"](\d+))?\s*$"
+_RE_ODDS = r'^\s*(\d+(?:\.\d+)?)(?:\s*-\s*(\d+(?:\.\d+)?))?'
+
+
+def _normalize(s: pd.Series) -> pd.Series:
+    # 全角数字やカンマを含む文字列を、数値に変換できる形にそろえる
+    return s.astype('string').str.normalize('NFKC').str.replace(',', '', regex=False).str.strip()
+
+
+def to_int(s: pd.Series, dtype: str = 'Int32') -> pd.Series:
+    """先頭の整数部分を取り出す。'1(降)'は1、'中'や'取'は欠損値になる。"""
+    if pd.api.types.is_integer_dtype(s):
+        return s.astype(dtype)
+    return pd.to_numeric(_normalize(s).str.extract(r'^([+-]?\d+)', expand=False), errors='coerce').astype(dtype)
+
+
+def to_float(s: pd.Series) -> pd.Series:
+    if pd.api.types.is_float_dtype(s):
+        return s.astype('float64')
+    return pd.to_numeric(_normalize(s), errors='coerce').astype('float64')
+
+
+def to_money(s: pd.Series) -> pd.Series:
+    """'¥1,230'や'431,054'のような金額を整数にする"""
+    if pd.api.types.is_integer_dtype(s):
+        return s.astype('Int64')
+    digits = _normalize(s).str.replace(r'[^\d]', '', regex=True).replace('', pd.NA)
+    return pd.to_numeric(digits, errors='coerce').astype('Int64')
+
+
+def to_seconds(s: pd.Series) -> pd.Series:
+    """'2:22.9'(netkeiba)や'1'50"3'(boatrace)のようなタイムを秒に変換する"""
+    if pd.api.types.is_float_dtype(s):
+        return s
+    parts = _normalize(s).str.extract(_RE_TIME)
+    minutes = pd.to_numeric(parts[0], errors='coerce').fillna(0)
+    seconds = pd.to_numeric(parts[1], errors='coerce')
+    fraction = pd.to_numeric('0.' + parts[2].fillna('0'), errors='coerce')
+    return (minutes * 60 + seconds + fraction).astype('float64')
+
+
+def split_odds(s: pd.Series) -> pd.DataFrame:
+    """オッズを数値に変換する。'1.1 - 1.3'のような範囲の場合は上限を2列目に入れる。"""
+    if pd.api.types.is_numeric_dtype(s):
+        return pd.DataFrame({0: s.astype('float64'), 1: s.astype('float64')}, index=s.index)
+    parts = _normalize(s).str.extract(_RE_ODDS)
+    low = pd.to_numeric(parts[0], errors='coerce').astype('float64')
+    high = pd.to_numeric(parts[1], errors='coerce').astype('float64')
+    return pd.DataFrame({0: low, 1: high.fillna(low)}, index=s.index)
+
+
+def split_weight(s: pd.Series) -> pd.DataFrame:
+    """'488(-7)'を馬体重と増減に分ける。'計不'は欠損値になる。"""
+    parts = _normalize(s).str.extract(r'^(\d+)(?:\(([+-]?\d+)\))?')
+    return pd.DataFrame({
+        0: pd.to_numeric(parts[0], errors='coerce').astype('Int16'),
+        1: pd.to_numeric(parts[1], errors='coerce').astype('Int16')}, index=s.index)
+
+
+def convert_frame(df: pd.DataFrame, column_types: Dict[str, str] = None) -> pd.DataFrame:
+    """スクレイパーが返した文字列のDataFrameを、列名に応じた型に変換する。
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        DatabaseScraper、HorseResultsScraper、各OddsScraper、boatraceの各Scraperが返すDataFrame
+    column_types : Dict[str, str], default None
+        列名と変換方法の対応。Noneの場合はCOLUMN_TYPESを使う。
+
+    Returns
+    -------
+    pd.DataFrame
+        タイムは秒、馬体重は'馬体重'と'体重増減'、性齢は'性別'と'年齢'、
+        距離は'コース種別'と'距離'、範囲で表示されたオッズは'<列名>'と'<列名>上限'に分ける。
+    """
+    column_types = COLUMN_TYPES if column_types is None else column_types
+    out = dict()
+    for col in df.columns:
+        s = df[col]
+        kind = column_types.get(col)
+        if kind == 'int':
+            out[col] = to_int(s)
+        elif kind == 'float':
+            out[col] = to_float(s)
+        elif kind == 'money':
+            out[col] = to_money(s)
+        elif kind == 'time':
+            out[col] = to_seconds(s)
+        elif kind == 'odds':
+            odds = split_odds(s)
+            out[col] = odds[0]
+            if not odds[0].equals(odds[1]):
+                out[f'{col}上限'] = odds[1]
+        elif kind == 'weight':
+            weight = split_weight(s)
+            out[col], out['体重増減'] = weight[0], weight[1]
+        elif kind == 'sex_age':
+            parts = _normalize(s).str.extract(r'^(\D*)(\d*)')
+            out['性別'] = parts[0].astype('category')
+            out['年齢'] = to_int(parts[1], 'Int8')
+        elif kind == 'distance':
+            parts = _normalize(s).str.extract(r'^(\D*)(\d+)')
+            out['コース種別'] = parts[0].astype('category')
+            out[col] = to_int(parts[1])
+        elif kind == 'date':
+            out[col] = pd.to_datetime(_normalize(s).str.replace('/', '-', regex=False), errors='coerce')
+        elif kind == 'category':
+            out[col] = s.astype('string').astype('category')
+        elif pd.api.types.is_object_dtype(s) or pd.api.types.is_string_dtype(s):
+            out[col] = s.astype('string')
+        else:
+            out[col] = s
+    return pd.DataFrame(out, index=df.index)
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError('pyarrowをインストールしてください: pip install pyarrow') from e
+    return pyarrow
+
+
+def _netkeiba_partition(race_id: pd.Series) -> pd.DataFrame:
+    # レースIDの先頭4桁が年、5-6桁目が競馬場のコード
+    from .netkeiba import DatabaseScraper
+    race_id = race_id.astype('string')
+    code = pd.to_numeric(race_id.str[4:6], errors='coerce')
+    return pd.DataFrame({
+        'year': pd.to_numeric(race_id.str[:4], errors='coerce').astype('Int16'),
+        'racecourse': code.map(DatabaseScraper.RACECOURSE_DICT).fillna(race_id.str[4:6]).astype('string'),
+    }, index=race_id.index)
+
+
+class ParquetSink(object):
+    '''
+    スクレイピングした表を型変換し、年と競馬場(競艇場)で分割したParquetに追記していくクラス。
+    受け取った表は変換せずに表ごとに溜めておき、row_group_size行に達するたびに
+    まとめて型変換してから新しいファイルとして書き出す。
+    1レース分のような小さな表を1つずつ変換するとpandasの呼び出しのコストが大半を占めるため。
+    pyarrowが必要。
+
+    Examples
+    ----------
+    >>> with ParquetSink('data/netkeiba') as sink:
+    ...     for record in scraper.scrape_many(race_ids):
+    ...         sink.add_race_record(record)
+    >>> results = sink.read('results', filters=[('year', '=', 2021), ('racecourse', '=', '東京')])
+    '''
+
+    def __init__(self, root: str, row_group_size: int = 100000, compression: str = 'zstd',
+                 partition_cols: List[str] = ('year', 'racecourse')):
+        """
+        Parameters
+        ----------
+        root : str
+            出力先のディレクトリ。表ごとにサブディレクトリを作る。
+        row_group_size : int, default 100000
+            この行数が溜まるたびにファイルに書き出す
+        compression : str, default 'zstd'
+            Parquetの圧縮方式
+        partition_cols : List[str], default ('year', 'racecourse')
+            ディレクトリを分ける列
+        """
+        _import_pyarrow()
+        self.root = os.path.abspath(os.path.expanduser(root))
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self.partition_cols = list(partition_cols)
+        # 表の名前ごとに、(溜めている表のリスト, 行数, 溜めた表を型変換済みの1つの表にする関数)
+        self._buffers: Dict[str, list] = dict()
+        self._lock = threading.Lock()
+
+    def write(self, name: str, df: pd.DataFrame) -> None:
+        """型変換済みで、partition_colsの列を持つDataFrameを表nameに追記する"""
+        self._append(name, df, len(df), self._concat)
+
+    def _append(self, name: str, part, rows: int, build: Callable) -> None:
+        if part is None or rows == 0:
+            return
+        with self._lock:
+            buffer = self._buffers.setdefault(name, [list(), 0, build])
+            buffer[0].append(part)
+            buffer[1] += rows
+            if buffer[1] >= self.row_group_size:
+                self._flush(name)
+
+    @staticmethod
+    def _concat(parts: List[pd.DataFrame]) -> pd.DataFrame:
+        df = pd.concat(parts, ignore_index=True)
+        # 結合するとカテゴリの種類が異なる列はcategoryでなくなるので、ここでそろえる
+        for col in df.columns:
+            if any(isinstance(p[col].dtype, pd.CategoricalDtype) for p in parts if col in p.columns):
+                df[col] = df[col].astype('string').astype('category')
+        return df
+
+    def _flush(self, name: str) -> None:
+        buffer = self._buffers.pop(name, None)
+        if buffer is None:
+            return
+        parts, _, build = buffer
+        df = build(parts)
+        missing = [col for col in self.partition_cols if col not in df.columns]
+        assert not missing, f'{missing} is not in columns'
+        pa = _import_pyarrow()
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        # 分割に使う列はディレクトリ名から復元されるので、pandasの型情報から除いておく
+        meta = json.loads(table.schema.metadata[b'pandas'])
+        meta['columns'] = [c for c in meta['columns'] if c['name'] not in self.partition_cols]
+        # 文字列の列は結合前のDataFrameごとに分かれたままなので、1つにまとめないと小さな行グループが大量にできる
+        table = table.replace_schema_metadata({b'pandas': json.dumps(meta).encode()}).combine_chunks()
+        pa.parquet.write_to_dataset(
+            table, root_path=os.path.join(self.root, name), partition_cols=self.partition_cols,
+            basename_template=f'part-{uuid.uuid4().hex}-{{i}}.parquet',
+            existing_data_behavior='overwrite_or_ignore', compression=self.compression)
+
+    def flush(self) -> None:
+        """溜めている全ての表をファイルに書き出す"""
+        with self._lock:
+            for name in list(self._buffers):
+                self._flush(name)
+
+    def close(self) -> None:
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def read(self, name: str, **kwargs) -> pd.DataFrame:
+        """書き出した表を読み込む。kwargsはpd.read_parquetに渡す。"""
+        self.flush()
+        return pd.read_parquet(os.path.join(self.root, name), **kwargs)
+
+    def add_race_record(self, record) -> None:
+        """`DatabaseScraper.parse_race`や`scrape_many`が返したRaceRecordを追記する。
+        results(馬ごとの成績)、races(レース情報)、payouts(払い戻し)の表に書き出す。
+        """
+        if record is None:
+            return
+        self.add_main_df(record.main_df)
+        self.add_race_info(record.race_info)
+        if record.pay_df is not None:
+            self.add_pay_df(record.pay_df)
+
+    def add_main_df(self, main_df: pd.DataFrame) -> None:
+        """`DatabaseScraper.get_main_df`の結果を追記する"""
+        self._append('results', main_df, len(main_df), self._build_results)
+
+    def add_race_info(self, race_info: dict) -> None:
+        """`DatabaseScraper.get_race_info`の結果を追記する"""
+        self._append('races', race_info, 1, self._build_races)
+
+    def add_pay_df(self, pay_df: pd.DataFrame) -> None:
+        """`DatabaseScraper.get_pay_df`の結果を追記する"""
+        self._append('payouts', pay_df, len(pay_df), self._build_payouts)
+
+    def add_horse_results(self, df: pd.DataFrame) -> None:
+        """`HorseResultsScraper.get_horseresults`の結果を追記する。
+        レースの日付と開催から年と競馬場を決める。
+        """
+        self._append('horse_results', df, len(df), self._build_horse_results)
+
+    def add_odds(self, race_id: Union[str, int], bet_type: str, odds_df: pd.DataFrame,
+                 fetched_at: pd.Timestamp = None) -> None:
+        """netkeibaのOddsScraperやRealTimeOddsScraperが返したオッズを追記する。
+
+        Parameters
+        ----------
+        race_id : str or int
+            12桁のレースID
+        bet_type : str
+            'TANSHO'、'UMAREN'などの券種。get_odds_df_dictのキーと同じもの。
+        odds_df : pd.DataFrame
+            First, Second, Third, Oddsのうち必要な列を持つDataFrame
+        fetched_at : pd.Timestamp, default None
+            オッズを取得した時刻。Noneの場合は現在時刻。
+        """
+        if odds_df is None:
+            return
+        key = {'race_id': int(race_id)}
+        self._append('odds', self._odds_part(odds_df, key, bet_type, fetched_at), len(odds_df), self._build_odds)
+
+    def add_boatrace_result(self, result_df: pd.DataFrame, return_df: pd.DataFrame,
+                            race_number: int, jcd: Union[str, int], hold_date: Union[str, int]) -> None:
+        """boatraceのResultScraper.get_resultの結果を追記する。年と競艇場コードで分割する。"""
+        key = self._boatrace_key(race_number, jcd, hold_date)
+        if result_df is not None:
+            self._append('boatrace_results', result_df.assign(**key), len(result_df), self._build_boatrace)
+        if return_df is not None:
+            self._append('boatrace_payouts', return_df.assign(**key), len(return_df), self._build_boatrace)
+
+    def add_boatrace_odds(self, bet_type: str, odds_df: pd.DataFrame, race_number: int,
+                          jcd: Union[str, int], hold_date: Union[str, int], fetched_at: pd.Timestamp = None) -> None:
+        """boatraceのOddsScraperが返したオッズを追記する"""
+        if odds_df is None:
+            return
+        key = self._boatrace_key(race_number, jcd, hold_date)
+        part = self._odds_part(odds_df, key, bet_type, fetched_at)
+        self._append('boatrace_odds', part, len(part), self._build_boatrace_odds)
+
+    @staticmethod
+    def _boatrace_key(race_number, jcd, hold_date) -> dict:
+        return {'hold_date': str(hold_date), 'jcd': str(jcd).zfill(2), 'race_number': int(race_number)}
+
+    @staticmethod
+    def _odds_part(odds_df: pd.DataFrame, key: dict, bet_type: str, fetched_at: pd.Timestamp) -> pd.DataFrame:
+        fetched_at = pd.Timestamp.now() if fetched_at is None else pd.Timestamp(fetched_at)
+        return odds_df.assign(券種=bet_type, fetched_at=fetched_at, **key)
+
+    def _build_results(self, parts: List[pd.DataFrame]) -> pd.DataFrame:
+        from .netkeiba import DatabaseScraper
+        df = pd.concat(parts, ignore_index=True)
+        # ログインの有無で列がそろわないと読み込み時にスキーマが合わないので、常に全ての列を持たせる
+        for col in DatabaseScraper.PLEMIUS_COLUMNS:
+            if col not in df.columns:
+                df[col] = pd.NA
+        df = convert_frame(df)
+        return df.join(_netkeiba_partition(df['race_id']))
+
+    def _build_races(self, parts: List[dict]) -> pd.DataFrame:
+        df = convert_frame(pd.DataFrame(parts))
+        return df.join(_netkeiba_partition(df['race_id']))
+
+    def _build_payouts(self, parts: List[pd.DataFrame]) -> pd.DataFrame:
+        df = convert_frame(pd.concat(parts, ignore_index=True))
+        return df.join(_netkeiba_partition(df['race_id']))
+
+    def _build_horse_results(self, parts: List[pd.DataFrame]) -> pd.DataFrame:
+        # 開催は'2東京12'のような形式なので、数字に変換せずに数字以外の部分を競馬場とする
+        df = convert_frame(pd.concat(parts, ignore_index=True), dict(COLUMN_TYPES, 開催=None))
+        df['year'] = df['日付'].dt.year.astype('Int16')
+        place = df['開催'] if '開催' in df.columns else pd.Series(pd.NA, index=df.index, dtype='string')
+        df['racecourse'] = place.str.replace(r'\d', '', regex=True).fillna('')
+        return df
+
+    def _convert_odds(self, parts: List[pd.DataFrame], key_cols: List[str]) -> pd.DataFrame:
+        df = pd.concat(parts, ignore_index=True)
+        # 券種によって列がそろわないので、常にFirst, Second, Thirdを持たせる
+        for col in ['First', 'Second', 'Third']:
+            if col not in df.columns:
+                df[col] = pd.NA
+        df = convert_frame(df[key_cols + ['券種', 'First', 'Second', 'Third', 'Odds', 'fetched_at']])
+        if 'Odds上限' not in df.columns:
+            df.insert(df.columns.get_loc('Odds') + 1, 'Odds上限', df['Odds'])
+        return df
+
+    def _build_odds(self, parts: List[pd.DataFrame]) -> pd.DataFrame:
+        df = self._convert_odds(parts, ['race_id'])
+        return df.join(_netkeiba_partition(df['race_id']))
+
+    def _build_boatrace(self, parts: List[pd.DataFrame]) -> pd.DataFrame:
+        df = convert_frame(pd.concat(parts, ignore_index=True))
+        return self._boatrace_partition(df)
+
+    def _build_boatrace_odds(self, parts: List[pd.DataFrame]) -> pd.DataFrame:
+        df = self._convert_odds(parts, ['hold_date', 'jcd', 'race_number'])
+        return self._boatrace_partition(df)
+
+    @staticmethod
+    def _boatrace_partition(df: pd.DataFrame) -> pd.DataFrame:
+        df['year'] = pd.to_numeric(df['hold_date'].str[:4], errors='coerce').astype('Int16')
+        df['racecourse'] = df['jcd']
+        return df
@@ -0,0 +1,156 @@
+import re
+from io import StringIO
+from typing import Iterator, List
+
+import pandas as pd
+import numpy as np
+from bs4 import BeautifulSoup, Tag
+from pandas.io.parsers import TextParser
+
+_RE_WHITESPACE = re.compile(r"[\r\n]+|\s{2,}")
+# pd.read_htmlが既定で欠損値とみなす文字列。pandasの非公開の定数に依存しないように同じものを持っておく
+NA_VALUES = frozenset([
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'])
+
+
+def _cell_text(cell: BeautifulSoup) -> str:
+    # pd.read_htmlと同じ方法で空白を整理する
+    return _RE_WHITESPACE.sub(" ", cell.get_text().strip())
+
+
+def iter_tags(element: BeautifulSoup, names) -> Iterator[Tag]:
+    """elementの子孫のうち、タグ名がnamesに含まれるものを文書順に返す。
+    find_allと同じ結果になるが、検索条件を解釈する処理が無い分だけ速い。
+    """
+    for node in element.descendants:
+        if isinstance(node, Tag) and node.name in names:
+            yield node
+
+
+def table_rows(table: BeautifulSoup) -> List[List[BeautifulSoup]]:
+    """tableに含まれる行ごとに、直下のth, td要素のリストを返す"""
+    return [[cell for cell in tr.children if isinstance(cell, Tag) and cell.name in ('th', 'td')]
+            for tr in iter_tags(table, ('tr',))]
+
+
+def table_texts(table: BeautifulSoup) -> List[list]:
+    """tableの行ごとに、セルの文字列のリストを返す。
+    `pd.read_html`と同じ方法で空白を整理し、colspan, rowspanを展開し、欠損値とみなされる文字列はNaNにする。
+    """
+    rows = table_rows(table)
+    if _is_simple_table(table):
+        texts = [list(map(_cell_text, row)) for row in rows]
+    else:
+        texts = _expand_spans(rows)
+    return [[np.nan if text in NA_VALUES else text for text in row] for row in texts]
+
+
+def _span(cell: Tag, attr: str) -> int:
+    try:
+        return max(int(cell.get(attr) or 1), 1)
+    except ValueError:
+        return 1
+
+
+def _expand_spans(rows: List[List[Tag]]) -> List[List[str]]:
+    # pd.read_htmlと同じ規則で、colspanは右隣に、rowspanは下の行の同じ位置にセルの文字列を複製する
+    texts = list()
+    remainder = list()  # 下の行に持ち越すセルの(列の位置, 文字列, 残りの行数)
+    for row in rows:
+        line, next_remainder, index = list(), list(), 0
+
+        def carry(until):
+            nonlocal index
+            while remainder and remainder[0][0] <= until:
+                _, text, n_rows = remainder.pop(0)
+                line.append(text)
+                if n_rows > 1:
+                    next_remainder.append((index, text, n_rows - 1))
+                index += 1
+
+        for cell in row:
+            carry(index)
+            text, rowspan = _cell_text(cell), _span(cell, 'rowspan')
+            for _ in range(_span(cell, 'colspan')):
+                line.append(text)
+                if rowspan > 1:
+                    next_remainder.append((index, text, rowspan - 1))
+                index += 1
+        carry(float('inf'))
+        texts.append(line)
+        remainder = next_remainder
+    # 表の最後の行より下まで続くrowspan
+    while remainder:
+        line, next_remainder = list(), list()
+        for index, text, n_rows in remainder:
+            line.append(text)
+            if n_rows > 1:
+                next_remainder.append((index, text, n_rows - 1))
+        texts.append(line)
+        remainder = next_remainder
+    return texts
+
+
+def _is_simple_table(table: BeautifulSoup) -> bool:
+    # colspan, rowspanが2以上のセルやtfootを含まない表ならTrue
+    for tag in iter_tags(table, ('th', 'td', 'tfoot')):
+        if tag.name == 'tfoot':
+            return False
+        for attr in ('colspan', 'rowspan'):
+            span = tag.get(attr)
+            if span is not None and span.strip() not in ('', '1'):
+                return False
+    return True
+
+
+def read_table(table: BeautifulSoup) -> pd.DataFrame:
+    """`pd.read_html(str(table))[0]`と同じDataFrameを、HTMLを文字列に戻さずに作る。
+    colspan, rowspan, tfootを含む表の場合は、`pd.read_html`でパースする。
+    theadは、中の行が全てthである場合にのみ対応する。
+
+    Parameters
+    ----------
+    table : BeautifulSoup
+        table要素
+
+    Returns
+    -------
+    pd.DataFrame
+    """
+    if not _is_simple_table(table):
+        return pd.read_html(StringIO(str(table)))[0]
+    rows = table_rows(table)
+    # theadが無い場合、先頭の全てthの行を見出しとして扱う
+    head = list()
+    while rows and all(cell.name == 'th' for cell in rows[0]):
+        head.append(rows.pop(0))
+    head = [[_cell_text(cell) for cell in row] for row in head]
+    body = [[_cell_text(cell) for cell in row] for row in rows]
+    header = None
+    if head:
+        body = head + body
+        if len(head) == 1:
+            header = 0
+        else:
+            header = [i for i, row in enumerate(head) if any(text for text in row)]
+    # 行ごとに列数が異なる場合は空文字で埋める
+    width = max([len(row) for row in body], default=0)
+    body = [row + [''] * (width - len(row)) for row in body]
+    parser = TextParser(
+        body, header=header, index_col=None, skiprows=0, parse_dates=False,
+        thousands=',', decimal='.', converters=None, na_values=None, keep_default_na=True)
+    try:
+        return parser.read()
+    finally:
+        parser.close()
+
+
+def cells_to_array(values: list) -> np.ndarray:
+    """SeleniumScraperBase._get_tablesで取得したセルの値のリストを、列の配列にする。
+    全て数値かNoneの場合はfloat64(NoneはNaN)、'取消'などの文字列を含む場合はobjectの配列とする。
+    """
+    try:
+        return np.array(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        return np.array(values, dtype=object)
@@ -0,0 +1,230 @@
+import threading
+import weakref
+from io import BytesIO
+from typing import Dict, List
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+from .ratelimit import RateLimiter
+
+
+class Page(object):
+    '''HttpTransportで取得したページの内容を保持するクラス'''
+
+    def __init__(self, url: str, content: bytes, encoding: str = None, status_code: int = 200):
+        """
+        Parameters
+        ----------
+        url : str
+            取得したページのURL
+        content : bytes
+            レスポンスボディ
+        encoding : str, default None
+            textに変換する際に利用するエンコーディング
+        status_code : int, default 200
+            HTTPステータスコード
+        """
+        self.url = url
+        self.content = content
+        self.encoding = encoding
+        self.status_code = status_code
+
+    @property
+    def text(self) -> str:
+        # requests.Response.textと同じ方法でデコードする
+        try:
+            return str(self.content, self.encoding, errors='replace')
+        except (LookupError, TypeError):
+            return str(self.content, errors='replace')
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    def raise_for_status(self) -> None:
+        if not self.ok:
+            raise requests.HTTPError(
+                f'{self.status_code} Error for url: {self.url}')
+
+
+class HttpTransport(object):
+    '''
+    ホストごとのコネクションプールとKeep-Aliveを利用してページを取得するクラス。
+    全てのスクレイパーはデフォルトで`get_default_transport`が返すインスタンスを共有する。
+
+    Examples
+    ----------
+    >>> transport = HttpTransport(pool_maxsize=32)
+    >>> transport.configure_host('db.netkeiba.com', pool_maxsize=64)
+    >>> set_default_transport(transport)
+    >>> transport.connection_stats()
+    '''
+
+    def __init__(self, pool_connections: int = 10, pool_maxsize: int = 10,
+                 max_retries: int = 0, timeout: float = None, headers: dict = None,
+                 cache=None, rate_limiter: RateLimiter = None):
+        """
+        Parameters
+        ----------
+        pool_connections : int, default 10
+            保持するホストごとのコネクションプールの数
+        pool_maxsize : int, default 10
+            1ホストあたりに保持するコネクションの最大数
+        max_retries : int, default 0
+            接続に失敗した際のリトライ回数
+        timeout : float, default None
+            リクエストのタイムアウト時間
+        headers : dict, default None
+            全てのリクエストに付与するヘッダ
+        cache : scraping.cache.PageCache, default None
+            指定した場合は、取得したページをディスクにキャッシュする
+        rate_limiter : RateLimiter, default None
+            ネットワークにアクセスする直前に参照するレート制限。
+            指定しない場合はホストごとに個別に設定するまで制限しない。
+        """
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.headers = headers
+        self.cache = cache
+        self.rate_limiter = RateLimiter() if rate_limiter is None else rate_limiter
+        self._adapters = {
+            'http://': self._make_adapter(pool_maxsize),
+            'https://': self._make_adapter(pool_maxsize)}
+        self._sessions = weakref.WeakSet()
+        self._lock = threading.Lock()
+        self.session = self.new_session()
+
+    def _make_adapter(self, pool_maxsize: int) -> HTTPAdapter:
+        return HTTPAdapter(
+            pool_connections=self.pool_connections, pool_maxsize=pool_maxsize,
+            max_retries=self.max_retries)
+
+    def new_session(self) -> requests.Session:
+        """コネクションプールを共有するセッションを作成する。
+        ログインが必要なスクレイパーは、クッキーを分けるためにこのセッションを利用する。
+        """
+        session = requests.Session()
+        with self._lock:
+            for prefix, adapter in self._adapters.items():
+                session.mount(prefix, adapter)
+            self._sessions.add(session)
+        if self.headers is not None:
+            session.headers.update(self.headers)
+        return session
+
+    def configure_host(self, host: str, pool_maxsize: int, scheme: str = 'https') -> None:
+        """特定のホストのみコネクションプールのサイズを変更する。
+
+        Parameters
+        ----------
+        host : str
+            db.netkeiba.comなどのホスト名
+        pool_maxsize : int
+            そのホストに対して保持するコネクションの最大数
+        scheme : str, default 'https'
+        """
+        prefix = f'{scheme}://{host}'
+        adapter = self._make_adapter(pool_maxsize)
+        with self._lock:
+            self._adapters[prefix] = adapter
+            for session in self._sessions:
+                session.mount(prefix, adapter)
+
+    def get(self, url: str, session: requests.Session = None, **kwargs) -> requests.Response:
+        session = self.session if session is None else session
+        kwargs.setdefault('timeout', self.timeout)
+        self.rate_limiter.acquire(url)
+        return session.get(url, **kwargs)
+
+    def fetch(self, url: str, encoding: str = None, session: requests.Session = None) -> Page:
+        """ページを取得する。
+
+        Parameters
+        ----------
+        url : str
+        encoding : str, default None
+            指定しない場合はレスポンスヘッダ、または内容から推定する
+        session : requests.Session, default None
+            ログイン済みのセッションなどを使う場合に指定する
+
+        Returns
+        -------
+        Page
+        """
+        # ログイン済みのページは内容が異なるので、キャッシュを分ける
+        variant = '' if session is None else 'session'
+        if self.cache is not None:
+            page = self.cache.get(url, encoding, variant)
+            if page is not None:
+                return page
+        response = self.get(url, session=session)
+        page_encoding = encoding
+        if page_encoding is None:
+            page_encoding = response.encoding or response.apparent_encoding
+        page = Page(url, response.content, page_encoding, response.status_code)
+        if (self.cache is not None) and page.ok:
+            self.cache.put(page, encoding, variant)
+        return page
+
+    def read_html(self, url: str, encoding: str = None, **kwargs) -> List[pd.DataFrame]:
+        """`pd.read_html(url)`の代わりに、コネクションプールを使ってページを取得してから読み込む"""
+        page = self.fetch(url, encoding=encoding)
+        page.raise_for_status()
+        if encoding is not None:
+            kwargs.setdefault('encoding', encoding)
+        return pd.read_html(BytesIO(page.content), **kwargs)
+
+    def connection_stats(self) -> Dict[str, dict]:
+        """ホストごとのコネクションの再利用状況を取得する。
+
+        Returns
+        -------
+        Dict[str, dict]
+            ホスト名をキーとして、requests(リクエスト数)、connections(新規接続数)、
+            reused(既存の接続を再利用したリクエスト数)を持つ辞書
+        """
+        stats = dict()
+        with self._lock:
+            adapters = list(self._adapters.values())
+        for adapter in adapters:
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                d = stats.setdefault(
+                    pool.host, {'requests': 0, 'connections': 0, 'reused': 0})
+                d['requests'] += pool.num_requests
+                d['connections'] += pool.num_connections
+        for d in stats.values():
+            d['reused'] = max(d['requests'] - d['connections'], 0)
+        return stats
+
+    def close(self) -> None:
+        with self._lock:
+            for adapter in self._adapters.values():
+                adapter.close()
+
+
+_default_transport = None
+_default_transport_lock = threading.Lock()
+
+
+def get_default_transport() -> HttpTransport:
+    '''全スクレイパーが共有するHttpTransportを返す'''
+    global _default_transport
+    with _default_transport_lock:
+        if _default_transport is None:
+            _default_transport = HttpTransport()
+        return _default_transport
+
+
+def set_default_transport(transport: HttpTransport) -> None:
+    '''全スクレイパーが共有するHttpTransportを差し替える'''
+    global _default_transport
+    with _default_transport_lock:
+        _default_transport = transport
@@ -3,6 +3,7 @@ from tqdm import tqdm
 import re
 
 from .base import SoupScraperBase
+from .transport import HttpTransport
 
 
 class AmedasStationScraper(SoupScraperBase):
@@ -14,8 +15,8 @@ class AmedasStationScraper(SoupScraperBase):
     >>> df = AmedasStationScraper().run()
     """
 
-    def __init__(self, encoding='utf-8'):
-        super().__init__()
+    def __init__(self, encoding='utf-8', transport: HttpTransport = None):
+        super().__init__(transport=transport)
         self.encoding = encoding
         url = 'https://www.data.jma.go.jp/obd/stats/etrn/select/prefecture00.php?prec_no=&block_no=&year=&month=&day=&view='
         self.soup = self._get_soup(url, encoding=self.encoding)
@@ -86,8 +87,8 @@ class AmedasStationScraper(SoupScraperBase):
 
 
 class AmedasDatabaseScraper(SoupScraperBase):
-    def __init__(self, timestep='hourly'):
-        super().__init__()
+    def __init__(self, timestep='hourly', transport: HttpTransport = None):
+        super().__init__(transport=transport)
         self.base_url = 'https://www.data.jma.go.jp/obd/stats/etrn/view/{}_{}1.php?prec_no={}&block_no={}&year={}&month={}&day={}&view=p1'
         assert timestep in ['daily', 'hourly', '10min']
         self.timestep = timestep
@@ -107,7 +108,7 @@ class AmedasDatabaseScraper(SoupScraperBase):
         assert self.prec_no is not None
         assert self.block_no is not None
         assert self.station_type is not None
-        df = pd.read_html(self.base_url.format(
+        df = self.transport.read_html(self.base_url.format(
             self.timestep, self.station_type, self.prec_no, self.block_no,
             year, month, day))[0]
         cols = [i[-1] for i in df.columns.to_list()]
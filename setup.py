@@ -9,6 +9,10 @@ install_requires = [
     'selenium',
 ]
 
+extras_require = {
+    'parquet': ['pyarrow'],
+}
+
 packages = [
     'scraping',
 ]
@@ -18,4 +22,5 @@ setup(
     version=VERSION,
     packages=packages,
     install_requires=install_requires,
+    extras_require=extras_require,
 )
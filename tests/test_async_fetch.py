@@ -0,0 +1,83 @@
+import asyncio
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+import pytest
+
+from scraping.async_fetch import AsyncFetcher, get_fetcher, run_sync
+from scraping.transport import Page
+
+
+class FakeTransport(object):
+    '''ホストごとの同時リクエスト数の最大値を記録する'''
+
+    def __init__(self, delay=0.02):
+        self.delay = delay
+        self.active = defaultdict(int)
+        self.max_active = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def fetch(self, url, encoding=None, session=None):
+        host = urlsplit(url).hostname
+        with self._lock:
+            self.active[host] += 1
+            self.max_active[host] = max(self.max_active[host], self.active[host])
+        try:
+            time.sleep(self.delay)
+            if url.endswith('error'):
+                raise ValueError(url)
+            return Page(url, url.encode(), encoding)
+        finally:
+            with self._lock:
+                self.active[host] -= 1
+
+
+def test_gather_keeps_order_and_host_limits():
+    transport = FakeTransport()
+    fetcher = AsyncFetcher(transport, max_per_host=2, max_workers=8, host_limits={'b.example': 1})
+    urls = [f'https://{host}/{i}' for i in range(6) for host in ('a.example', 'b.example')]
+    try:
+        pages = run_sync(fetcher.gather(urls, encoding='utf-8'))
+    finally:
+        fetcher.close()
+    assert [page.url for page in pages] == urls
+    assert pages[0].text == urls[0]
+    assert transport.max_active['a.example'] == 2
+    assert transport.max_active['b.example'] == 1
+
+
+def test_gather_exceptions():
+    fetcher = AsyncFetcher(FakeTransport(delay=0))
+    try:
+        urls = ['https://a.example/1', 'https://a.example/error']
+        with pytest.raises(ValueError):
+            run_sync(fetcher.gather(urls))
+        pages = run_sync(fetcher.gather(urls, return_exceptions=True))
+        assert pages[0].url == urls[0] and isinstance(pages[1], ValueError)
+        # 別のイベントループでも使い回せる
+        fetcher.set_host_limit('a.example', 1)
+        assert run_sync(fetcher.fetch(urls[0])).url == urls[0]
+    finally:
+        fetcher.close()
+
+
+def test_run_sync_inside_running_loop():
+    async def inner():
+        await asyncio.sleep(0)
+        return threading.get_ident()
+
+    async def outer():
+        # イベントループが動いている中から呼んでも、別スレッドで実行して結果を返す
+        return run_sync(inner())
+    assert asyncio.run(outer()) != threading.get_ident()
+
+
+def test_get_fetcher_is_shared_per_transport():
+    first, second = FakeTransport(delay=0), FakeTransport(delay=0)
+    fetcher = get_fetcher(first)
+    assert get_fetcher(first) is fetcher
+    assert get_fetcher(second) is not fetcher
+    assert fetcher.transport is first
+    assert run_sync(fetcher.fetch('https://a.example/1')).url == 'https://a.example/1'
@@ -0,0 +1,91 @@
+import pytest
+
+from scraping import cache as cache_module
+from scraping.cache import CacheMiss, PageCache
+from scraping.transport import HttpTransport, Page
+
+RACE_URL = 'https://db.netkeiba.com/race/202105021211'
+HORSE_URL = 'https://db.netkeiba.com/horse/2018105027'
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = PageCache(str(tmp_path / 'cache'))
+    yield cache
+    cache.close()
+
+
+def test_put_and_get(cache):
+    cache.put(Page(HORSE_URL, 'テスト'.encode('EUC-JP'), 'EUC-JP'), encoding='EUC-JP')
+    page = cache.get(HORSE_URL, encoding='EUC-JP')
+    assert page.text == 'テスト'
+    assert page.status_code == 200
+    # エンコーディングやログインの有無が違うものは別のページとして扱う
+    assert cache.get(HORSE_URL) is None
+    assert cache.get(HORSE_URL, encoding='EUC-JP', variant='session') is None
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 2
+
+
+def test_ttl(cache, monkeypatch):
+    now = [1000000.0]
+    monkeypatch.setattr(cache_module.time, 'time', lambda: now[0])
+    cache.put(Page(HORSE_URL, b'horse'))
+    cache.put(Page(RACE_URL, b'<table class="race_table_01"></table>'))
+    now[0] += PageCache.DAY + 1
+    # 馬のページは1日で期限切れになり、確定したレース結果は期限なし
+    assert cache.get(HORSE_URL) is None
+    assert cache.get(RACE_URL).content == b'<table class="race_table_01"></table>'
+    # リプレイモードでは期限切れのページも使う
+    cache.replay = True
+    assert cache.get(HORSE_URL).content == b'horse'
+
+
+def test_replay_miss(cache):
+    cache.replay = True
+    with pytest.raises(CacheMiss):
+        cache.get(HORSE_URL)
+
+
+def test_race_page_without_results_is_not_cached(cache):
+    cache.put(Page(RACE_URL, b'<html>not finished</html>'))
+    assert cache.get(RACE_URL) is None
+    assert cache.stats()['pages'] == 0
+
+
+def test_evicts_least_recently_used(tmp_path, monkeypatch):
+    now = [1000000.0]
+    monkeypatch.setattr(cache_module.time, 'time', lambda: now[0])
+    cache = PageCache(str(tmp_path / 'cache'), max_bytes=2500, compress_level=0)
+    urls = [f'{HORSE_URL}{i}' for i in range(3)]
+    for url in urls[:2]:
+        cache.put(Page(url, b'x' * 1000))
+        now[0] += 1
+    # 先に保存したページを参照しておくと、後から保存したページが先に削除される
+    assert cache.get(urls[0]) is not None
+    now[0] += 1
+    cache.put(Page(urls[2], b'x' * 1000))
+    assert cache.get(urls[0]) is not None
+    assert cache.get(urls[1]) is None
+    assert cache.get(urls[2]) is not None
+    assert cache.stats()['bytes'] <= 2500
+    cache.close()
+
+
+def test_persists_across_instances(tmp_path):
+    directory = str(tmp_path / 'cache')
+    cache = PageCache(directory)
+    cache.put(Page(HORSE_URL, b'horse'))
+    cache.close()
+    cache = PageCache(directory, replay=True)
+    assert cache.get(HORSE_URL).content == b'horse'
+    assert cache.stats()['pages'] == 1
+    cache.close()
+
+
+def test_transport_replays_from_cache(cache):
+    cache.put(Page(HORSE_URL, b'horse', 'EUC-JP'), encoding='EUC-JP')
+    cache.replay = True
+    transport = HttpTransport(cache=cache)
+    assert transport.fetch(HORSE_URL, encoding='EUC-JP').content == b'horse'
+    with pytest.raises(CacheMiss):
+        transport.fetch(RACE_URL)
@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import fixtures
+from scraping.compact import SCHEMA, CompactResults, InternTable
+from scraping.netkeiba import DatabaseScraper
+from scraping.transport import Page
+
+
+def make_main_df(race_id, horse_ids):
+    n = len(horse_ids)
+    return pd.DataFrame({
+        '着順': ['1', '2', '中'][:n], '枠番': ['1', '2', '3'][:n], '馬番': ['1', '2', '3'][:n],
+        '性齢': ['牡3', '牝4', 'セ5'][:n], '斤量': ['57', '55.0', '56'][:n],
+        'タイム': ['1:33.5', '1:33.7', ''][:n], '上り': ['33.9', '34.2', ''][:n],
+        '単勝': ['2.5', '12.0', '---'][:n], '人気': ['1', '5', '9'][:n],
+        '馬体重': ['480(+4)', '456(-2)', '計不'][:n], '賞金(万円)': ['10,000.0', '4,000.0', ''][:n],
+        'race_id': [race_id] * n, 'horse_id': horse_ids,
+        'jockey_id': ['01001', '01002', ''][:n], 'trainer_id': ['T1', 'T1', 'T2'][:n],
+        'owner_id': ['O1', 'O2', 'O1'][:n],
+    })
+
+
+def test_intern_table():
+    table = InternTable(['a', 'b'])
+    codes = table.encode(['b', 'c', '', None, 'a', 'c'])
+    assert codes.tolist() == [1, 2, -1, -1, 0, 2]
+    assert codes.dtype == np.int32
+    assert table.values == ['a', 'b', 'c'] and len(table) == 3
+    assert table.decode(codes).tolist() == ['b', 'c', None, None, 'a', 'c']
+    assert table.code('c') == 2 and table.code('z') == -1
+
+
+def test_from_main_df():
+    results = CompactResults.from_main_df(make_main_df(202105021211, ['H1', 'H2', 'H3']))
+    assert len(results) == 3
+    assert [results[name].dtype for name, _ in SCHEMA] == [np.dtype(dtype) for _, dtype in SCHEMA]
+    assert results['race_id'].tolist() == [202105021211] * 3
+    assert results['着順'].tolist() == [1, 2, 0]
+    assert results['性別'].tolist() == [0, 1, 2] and results['年齢'].tolist() == [3, 4, 5]
+    assert results['タイム'][:2].tolist() == pytest.approx([93.5, 93.7]) and np.isnan(results['タイム'][2])
+    assert results['単勝'][:2].tolist() == pytest.approx([2.5, 12.0]) and np.isnan(results['単勝'][2])
+    assert results['馬体重'].tolist() == [480, 456, 0]
+    assert results['体重増減'][:2].tolist() == [4, -2]
+    assert results['賞金(万円)'][0] == 10000
+    assert results.ids('jockey_id').tolist() == ['01001', '01002', None]
+    assert results['trainer_id'].tolist() == [0, 0, 1]
+    assert results.nbytes == 3 * sum(np.dtype(dtype).itemsize for _, dtype in SCHEMA)
+
+
+def test_from_main_df_missing_columns():
+    df = pd.DataFrame({'race_id': ['202105021211'], 'horse_id': ['H1']})
+    results = CompactResults.from_main_df(df)
+    assert results['jockey_id'].tolist() == [-1] and results['性別'].tolist() == [-1]
+    assert results['着順'].tolist() == [0] and np.isnan(results['タイム'][0])
+
+
+def test_from_scraped_page():
+    page = Page('https://db.netkeiba.com/race/202105021211',
+                fixtures.make_db_race_page(202105021211, n_horses=10), 'EUC-JP')
+    scraper = DatabaseScraper()
+    scraper.set_soup(scraper._make_soup(page), 202105021211)
+    df = scraper.get_main_df()
+    results = CompactResults.from_main_df(df)
+    assert results.ids('horse_id').tolist() == df['horse_id'].tolist()
+    assert results['馬番'].tolist() == df['馬番'].astype(int).tolist()
+    assert results['単勝'].tolist() == pytest.approx(df['単勝'].astype(float).tolist())
+
+
+def test_concat_shared_and_different_tables():
+    tables = CompactResults.new_tables()
+    a = CompactResults.from_main_df(make_main_df(202105021211, ['H1', 'H2']), tables)
+    b = CompactResults.from_main_df(make_main_df(202105021212, ['H2', 'H3']), tables)
+    # 別のInternTableで作ったものは、先頭のInternTableの番号に振り直す
+    c = CompactResults.from_main_df(make_main_df(202105021201, ['H4', 'H1', 'H3']))
+    results = CompactResults.concat([a, b, c])
+    assert results.tables is tables
+    assert results.ids('horse_id').tolist() == ['H1', 'H2', 'H2', 'H3', 'H4', 'H1', 'H3']
+    assert results.ids('jockey_id').tolist()[-1] is None
+    assert results['race_id'].tolist()[-1] == 202105021201
+    empty = CompactResults.concat([])
+    assert len(empty) == 0 and len(empty.tables['horse_id']) == 0
+
+
+def test_from_records_skips_none():
+    class Record(object):
+        def __init__(self, main_df):
+            self.main_df = main_df
+    results = CompactResults.from_records([Record(make_main_df(202105021211, ['H1'])), None])
+    assert results.ids('horse_id').tolist() == ['H1']
+    assert len(CompactResults.from_records([None])) == 0
+
+
+def test_to_pandas_and_arrow():
+    results = CompactResults.from_main_df(make_main_df(202105021211, ['H1', 'H2', 'H3']))
+    df = results.to_pandas()
+    assert df.columns.tolist() == [name for name, _ in SCHEMA]
+    assert df['horse_id'].astype(str).tolist() == ['H1', 'H2', 'H3']
+    assert df['jockey_id'].isna().tolist() == [False, False, True]
+    assert df['性別'].tolist() == ['牡', '牝', 'セ']
+    assert df['馬体重'].tolist() == [480, 456, 0]
+    pytest.importorskip('pyarrow')
+    table = results.to_arrow()
+    assert table.num_rows == 3
+    assert table.column('jockey_id').to_pylist() == ['01001', '01002', None]
+    assert table.column('性別').to_pylist() == ['牡', '牝', 'セ']
+    assert table.column('単勝').to_pylist()[:2] == pytest.approx([2.5, 12.0])
@@ -0,0 +1,96 @@
+import threading
+
+import pytest
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+from scraping import driver_pool as driver_pool_module
+from scraping.driver_pool import DriverPool, new_chrome_driver
+
+
+class FakeDriver(object):
+    def __init__(self, n):
+        self.n = n
+        self.crashed = False
+        self.quit_called = False
+
+    def execute_script(self, script):
+        if self.crashed or self.quit_called:
+            raise WebDriverException('chrome not reachable')
+        return 1
+
+    def quit(self):
+        self.quit_called = True
+
+
+class FakeFactory(object):
+    def __init__(self):
+        self.drivers = list()
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            driver = FakeDriver(len(self.drivers))
+            self.drivers.append(driver)
+        return driver
+
+
+def test_new_chrome_driver_uses_service(monkeypatch):
+    calls = list()
+
+    class FakeChrome(FakeDriver):
+        def __init__(self, **kwargs):
+            super().__init__(0)
+            calls.append(kwargs)
+
+        def implicitly_wait(self, wait_time):
+            self.wait_time = wait_time
+    monkeypatch.setattr(driver_pool_module, 'Chrome', FakeChrome)
+    driver = new_chrome_driver('/usr/bin/chromedriver', wait_time=3)
+    assert driver.wait_time == 3
+    assert set(calls[0]) == {'service', 'options'}
+    assert calls[0]['service'].path == '/usr/bin/chromedriver'
+    assert '--headless' in calls[0]['options'].arguments
+    new_chrome_driver(None)
+    assert set(calls[1]) == {'options'}
+
+
+def test_reuse_and_restart_crashed_driver():
+    factory = FakeFactory()
+    with DriverPool(size=2, factory=factory) as pool:
+        with pool.driver() as driver:
+            first = driver
+        with pool.driver() as driver:
+            assert driver is first
+            # 貸し出し中にクラッシュした場合
+            driver.crashed = True
+        # 返却後の応答確認で気付き、閉じて新しく起動する
+        with pool.driver() as driver:
+            assert driver is not first and driver.n == 1
+        assert first.quit_called and pool.n_restarts == 1 and len(pool) == 1
+    assert factory.drivers[1].quit_called
+    with pytest.raises(RuntimeError):
+        with pool.driver():
+            pass
+
+
+def test_map_retries_on_crash():
+    factory = FakeFactory()
+    pool = DriverPool(size=1, factory=factory, max_retries=1)
+
+    def visit(driver, item):
+        if item == 'crash' and driver.n == 0:
+            driver.crashed = True
+            raise WebDriverException('tab crashed')
+        if item == 'timeout':
+            # ブラウザが生きている場合はやり直さず、そのまま例外を返す
+            raise TimeoutException('timeout')
+        return (item, driver.n)
+
+    results = pool.map(visit, ['crash', 'timeout'], return_exceptions=True)
+    assert results[0] == ('crash', 1)
+    assert isinstance(results[1], TimeoutException)
+    assert factory.drivers[0].quit_called and pool.n_restarts == 1
+    with pytest.raises(TimeoutException):
+        pool.map(visit, ['ok', 'timeout'])
+    pool.close()
+    assert all(driver.quit_called for driver in factory.drivers)
@@ -0,0 +1,73 @@
+from bs4 import BeautifulSoup
+
+from scraping.fragment import extract_fragments, extract_fragments_from_bytes, find_element_end
+from scraping.netkeiba import DatabaseScraper
+from scraping.transport import Page
+
+import fixtures
+
+HTML = '''<html><body>
+<div class="header"><table class="race_table_01"><tr><td>in header</td></tr></table></div>
+<DIV CLASS='data_intro fc'>
+  <div class="inner"><table class="race_table_01"><tr><td>inner</td></tr></table></div>
+  <p>intro</p>
+</DIV>
+<table summary="ラップタイム"><tr><td>12.5</td></tr></table>
+<table class=pay_table_01><tr><td>1</td></tr></table>
+<br/>
+</body></html>'''
+
+
+def test_find_element_end_nested():
+    markup = '<div><div></div><div/></div><p></p>'
+    assert markup[:find_element_end(markup, 'div', len('<div>'))] == '<div><div></div><div/></div>'
+    # 閉じタグが無い場合は末尾まで
+    assert find_element_end('<div><p>', 'div', len('<div>')) == len('<div><p>')
+
+
+def test_extract_fragments_in_document_order():
+    targets = [('div', 'class', 'data_intro'), ('table', 'summary', 'ラップタイム'),
+               ('table', 'class', 'pay_table_01')]
+    fragments = extract_fragments(HTML, targets)
+    assert len(fragments) == 3
+    # 大文字のタグ名や、空白区切りのclass、引用符の無い属性値にも一致する
+    assert fragments[0].startswith("<DIV CLASS='data_intro fc'>") and fragments[0].endswith('</DIV>')
+    assert '<p>intro</p>' in fragments[0]
+    assert fragments[1] == '<table summary="ラップタイム"><tr><td>12.5</td></tr></table>'
+    assert fragments[2] == '<table class=pay_table_01><tr><td>1</td></tr></table>'
+
+
+def test_extract_fragments_skips_elements_inside_a_match():
+    fragments = extract_fragments(HTML, [('div', 'class', 'data_intro'), ('table', 'class', 'race_table_01')])
+    # 2つ目のrace_table_01はdata_introの中にあるので、個別には切り出さない
+    assert len(fragments) == 2
+    assert 'in header' in fragments[0]
+    assert 'inner' in fragments[1]
+
+
+def test_extract_fragments_limit_and_tag_only():
+    assert extract_fragments(HTML, [('table', None, None)], limit=2) == [
+        '<table class="race_table_01"><tr><td>in header</td></tr></table>',
+        '<table class="race_table_01"><tr><td>inner</td></tr></table>']
+    assert extract_fragments(HTML, [('table', 'class', 'missing')]) == []
+
+
+def test_extract_fragments_from_bytes():
+    content = '<p>前</p><table class="c1"><tr><td>馬柱ソ表</td></tr></table>'.encode('cp932')
+    assert extract_fragments_from_bytes(content, [('table', 'class', 'c1')], 'cp932') == [
+        '<table class="c1"><tr><td>馬柱ソ表</td></tr></table>']
+
+
+def test_partial_parsing_matches_full_page():
+    content = fixtures.make_db_race_page(202105021211, n_horses=12)
+    page = Page('https://db.netkeiba.com/race/202105021211', content, 'EUC-JP')
+    full, partial = DatabaseScraper(), DatabaseScraper(partial=True)
+    full.set_soup(full._make_soup(page), 202105021211)
+    partial.set_soup(partial._make_soup(page), 202105021211)
+    assert partial.get_main_df().equals(full.get_main_df())
+    assert partial.get_race_info() == full.get_race_info()
+    assert partial.get_pay_df().equals(full.get_pay_df())
+    assert partial.get_laptime_df().equals(full.get_laptime_df())
+    # 部分的にパースした場合は、それ以外の要素を含まない
+    assert len(str(partial.soup)) < len(str(full.soup))
+    assert isinstance(partial.soup, BeautifulSoup)
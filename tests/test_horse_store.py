@@ -0,0 +1,52 @@
+import datetime
+
+import pandas as pd
+
+from scraping.horse_store import HorseHistoryStore
+
+D = datetime.date
+
+
+class Record(object):
+    def __init__(self, race_date, horse_ids):
+        self.race_info = {'日付': race_date}
+        self.horse_ids = horse_ids
+
+
+def results(*dates):
+    # 馬のページと同じく新しい順に並べた成績
+    return pd.DataFrame({'日付': list(dates), '着順': [str(i + 1) for i in range(len(dates))]})
+
+
+def test_observe_records(tmp_path):
+    with HorseHistoryStore(str(tmp_path / 'horse_history.sqlite')) as store:
+        n = store.observe_records([
+            Record('2021/05/30', ['H1', 'H2']), None, Record(None, ['H9']), Record('2021/05/02', [1, 'H1'])])
+        assert n == 3 and len(store) == 3
+        assert sorted(store.stale(D(2021, 6, 1))) == ['1', 'H1', 'H2']
+        assert 'H1' not in store
+
+
+def test_incremental_update(tmp_path):
+    path = str(tmp_path / 'store' / 'horse_history.sqlite')
+    with HorseHistoryStore(path, grace_days=7) as store:
+        store.observe(['H1', 'H2'], D(2021, 5, 30))
+        assert store.update('H1', results('2021/05/30', '2021/05/01'), today=D(2021, 5, 31)) == 2
+        # 最新のレースがまだ馬のページに反映されていない
+        assert store.update('H2', results('2021/05/01'), today=D(2021, 5, 31)) == 1
+        assert 'H1' in store
+        assert store.stale(D(2021, 5, 31)) == []
+        assert store.stale(D(2021, 6, 1)) == ['H2']
+        # 反映を待つ期間を過ぎた後に取得しても反映されていなければ、次に出走するまで取得しない
+        assert store.update('H2', results('2021/05/01'), today=D(2021, 6, 7)) == 0
+        assert store.stale(D(2021, 6, 8)) == []
+        store.observe(['H1'], '2021-06-13')
+        assert store.stale(D(2021, 6, 14)) == ['H1']
+        # 保存済みより新しい行だけを追記する
+        assert store.update('H1', results('2021/06/13', '2021/05/30', '2021/05/01'), today=D(2021, 6, 14)) == 1
+    with HorseHistoryStore(path) as store:
+        df = store.get('H1')
+        assert df['日付'].tolist() == ['2021/06/13', '2021/05/30', '2021/05/01']
+        assert df['着順'].tolist() == ['1', '1', '2']
+        assert len(store.to_frame()) == 4
+        assert store.get('H3').empty
@@ -0,0 +1,85 @@
+import pytest
+
+from scraping import journal as journal_module
+from scraping.journal import CrawlJournal, load_ids
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000000.0]
+    monkeypatch.setattr(journal_module.time, 'time', lambda: now[0])
+    return now
+
+
+def test_todo_and_marks(tmp_path, clock):
+    with CrawlJournal(str(tmp_path / 'race.jsonl')) as journal:
+        assert journal.add(['1', '2', '3']) == 3
+        assert journal.add([3, 4]) == 1
+        journal.mark_done(1)
+        journal.mark_empty('2')
+        assert journal.todo() == ['3', '4']
+        # 渡したIDと同じ順番・同じ型で返し、未登録のIDは登録する
+        assert journal.todo([4, 1, 5]) == [4, 5]
+        assert journal.is_finished(1) and journal.is_finished(2) and not journal.is_finished(3)
+        assert journal.counts() == {'pending': 3, 'done': 1, 'failed': 0, 'empty': 1}
+        assert len(journal) == 5 and 5 in journal and 6 not in journal
+        assert journal.status(6) is None
+
+
+def test_failed_backoff_and_max_attempts(tmp_path, clock):
+    with CrawlJournal(str(tmp_path / 'race.jsonl'), max_attempts=3, backoff=10, max_backoff=15) as journal:
+        journal.add(['1'])
+        journal.mark_failed('1', ValueError('timeout'))
+        state = journal.get('1')
+        assert state.status == 'failed' and state.attempts == 1
+        assert state.last_error == 'ValueError: timeout'
+        assert state.retry_at == clock[0] + 10
+        assert journal.todo() == []
+        assert journal.todo(now=clock[0] + 10) == ['1']
+        # 待ち時間は2倍にするが、max_backoffを超えない
+        journal.mark_failed('1')
+        assert journal.next_retry_at() == clock[0] + 15
+        # max_attemptsに達したら再試行しない
+        journal.mark_failed('1')
+        assert journal.get('1').retry_at is None
+        assert journal.todo(now=clock[0] + 10 ** 6) == []
+
+
+def test_resume_from_file(tmp_path, clock):
+    path = str(tmp_path / 'crawl' / 'race.jsonl')
+    with CrawlJournal(path) as journal:
+        journal.add(['1', '2', '3'])
+        journal.mark_done('1')
+        journal.mark_failed('2', 'error')
+    # 書き込み中に停止して、最後の行が途中で切れている場合
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"id": "3", "stat')
+    with CrawlJournal(path) as journal:
+        assert journal.status('1') == 'done'
+        assert journal.get('2').attempts == 1 and journal.get('2').last_error == 'error'
+        assert journal.status('3') == 'pending'
+        assert journal.todo() == ['3']
+
+
+def test_compact_keeps_latest_state(tmp_path, clock):
+    path = tmp_path / 'race.jsonl'
+    with CrawlJournal(str(path), compact_every=4) as journal:
+        journal.add(['1', '2'])
+        journal.mark_failed('1')
+        journal.mark_done('1')
+        # 4行追記した時点で、IDごとに1行に書き直される
+        assert len(path.read_text(encoding='utf-8').splitlines()) == 2
+        journal.mark_done('2')
+        journal.compact()
+        assert len(path.read_text(encoding='utf-8').splitlines()) == 2
+    with CrawlJournal(str(path)) as journal:
+        assert journal.counts()['done'] == 2
+        assert journal.get('1').attempts == 2
+
+
+def test_load_ids(tmp_path):
+    (tmp_path / '2020.txt').write_text('202001010101\n202001010102\n\n', encoding='utf-8')
+    (tmp_path / '2021.txt').write_text('202001010102\n202101010101\n', encoding='utf-8')
+    assert load_ids(str(tmp_path / '2020.txt')) == ['202001010101', '202001010102']
+    assert load_ids([str(tmp_path / '2020.txt'), str(tmp_path / '2021.txt')]) == [
+        '202001010101', '202001010102', '202101010101']
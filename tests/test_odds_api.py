@@ -0,0 +1,114 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pytest
+import requests
+
+from scraping.netkeiba import OddsApiScraper, parse_odds
+from scraping.transport import HttpTransport
+
+# APIのtypeごとに返すodds。キーは組番、値は[オッズ, オッズの上限, 人気]
+ODDS = {
+    1: {'1': {'03': ['2.5', '', '1'], '01': ['12.0', '', '3'], '02': ['---', '', '']},
+        '2': {'01': ['1.5', '1.8', '2'], '03': ['1.1', '1.3', '1'], '02': ['---', '', '']}},
+    4: {'4': {'0103': ['8.5', '', '1'], '0102': ['15.2', '', '2']}},
+    5: {'5': {'0103': ['2.0', '2.4', '1'], '0102': ['3.1', '4.0', '2']}},
+    8: {'8': {'030102': ['101.5', '', '2'], '010203': ['55.0', '', '1']}},
+}
+
+
+class OddsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        query = parse_qs(urlsplit(self.path).query)
+        odds_type = int(query['type'][0])
+        if query['race_id'][0] == '404':
+            self.send_error(404)
+            return
+        if odds_type in ODDS:
+            payload = {'status': 'middle', 'data': {'odds': ODDS[odds_type]}}
+        else:
+            # 発売前はdataが空文字列になる
+            payload = {'status': 'yoso', 'data': ''}
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope='module')
+def api_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), OddsHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}/api/api_get_jra_odds.html'
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def scraper(api_url, monkeypatch):
+    # 環境変数のプロキシを経由せずにローカルのサーバーへ繋ぐ
+    monkeypatch.setenv('NO_PROXY', '127.0.0.1')
+    return OddsApiScraper(transport=HttpTransport(), api_url=api_url)
+
+
+def test_parse_odds_sorts_by_combination():
+    legs, odds, upper, popularity = parse_odds({'0103': ['2.0', '2.4', '1'], '0102': ['3.1', '4.0', '2']}, 2)
+    assert legs.tolist() == [[1, 2], [1, 3]]
+    assert odds.tolist() == [3.1, 2.0]
+    assert upper.tolist() == [4.0, 2.4]
+    assert popularity.tolist() == [2, 1]
+
+
+def test_parse_odds_missing_values():
+    legs, odds, upper, popularity = parse_odds({'01': ['12.0', '', '3'], '02': ['---', '', '']}, 1)
+    assert legs.tolist() == [[1], [2]]
+    assert odds[0] == 12.0 and np.isnan(odds[1])
+    assert np.isnan(upper).all()
+    assert popularity.tolist() == [3, 0]
+
+
+def test_parse_odds_empty():
+    legs, odds, upper, popularity = parse_odds(dict(), 3)
+    assert legs.shape == (0, 3)
+    assert len(odds) == len(upper) == len(popularity) == 0
+
+
+def test_get_odds_df_dict(scraper):
+    df_dict = scraper.get_odds_df_dict(202105021211, keys=['TANSHO', 'FUKUSHO', 'UMAREN', 'WIDE', 'RENTAN'])
+    tansho = df_dict['TANSHO']
+    assert list(tansho.columns) == ['First', 'Odds', 'Popularity']
+    assert tansho['First'].tolist() == [1, 2, 3]
+    assert tansho['Odds'].tolist()[0] == 12.0 and np.isnan(tansho['Odds'][1])
+    wide = df_dict['WIDE']
+    assert list(wide.columns) == ['First', 'Second', 'Odds', 'OddsMax', 'Popularity']
+    assert wide[['First', 'Second']].values.tolist() == [[1, 2], [1, 3]]
+    assert wide['OddsMax'].tolist() == [4.0, 2.4]
+    assert df_dict['FUKUSHO']['Odds'].tolist()[::2] == [1.5, 1.1]
+    rentan = df_dict['RENTAN']
+    assert rentan[['First', 'Second', 'Third']].values.tolist() == [[1, 2, 3], [3, 1, 2]]
+
+
+def test_get_odds_df_dict_before_sale(scraper):
+    df = scraper.get_odds_df_dict(202105021211, keys=['RENPUKU'])['RENPUKU']
+    assert len(df) == 0
+    assert list(df.columns) == ['First', 'Second', 'Third', 'Odds', 'Popularity']
+
+
+def test_get_odds_df_dict_many(scraper):
+    results = scraper.get_odds_df_dict_many([202105021211, 202105021212], keys=['UMAREN'])
+    assert list(results) == ['202105021211', '202105021212']
+    assert results['202105021212']['UMAREN']['Odds'].tolist() == [15.2, 8.5]
+
+
+def test_get_odds_df_dict_http_error(scraper):
+    with pytest.raises(requests.HTTPError, match='404'):
+        scraper.get_odds_df_dict('404', keys=['TANSHO'])
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+
+from scraping.odds_series import OddsPoller, OddsSeries
+
+KEY = (202105021211, 1)
+
+
+def diff(poller, combos, odds):
+    combos, odds = poller._diff(KEY, np.array(combos, dtype=np.int32), np.array(odds, dtype=np.float32))
+    return combos.tolist(), odds.tolist()
+
+
+def test_diff_first_call_returns_everything_sorted():
+    poller = OddsPoller()
+    assert diff(poller, [30000, 10000, 20000], [5.0, 1.5, 3.0]) == ([10000, 20000, 30000], [1.5, 3.0, 5.0])
+
+
+def test_diff_same_combinations():
+    poller = OddsPoller()
+    diff(poller, [10000, 20000, 30000], [1.5, 3.0, np.nan])
+    assert diff(poller, [10000, 20000, 30000], [1.5, 3.0, np.nan]) == ([], [])
+    assert diff(poller, [30000, 20000, 10000], [np.nan, 3.2, 1.5]) == ([20000], [np.float32(3.2)])
+
+
+def test_diff_added_and_removed_combinations():
+    poller = OddsPoller()
+    diff(poller, [10000, 20000, 30000], [1.5, 3.0, 5.0])
+    combos, odds = diff(poller, [10000, 30000, 40000], [1.5, 5.5, 9.0])
+    # 20000は無くなったのでNaN、40000は新しく増えた組番
+    assert combos == [20000, 30000, 40000]
+    assert np.isnan(odds[0]) and odds[1:] == [5.5, 9.0]
+    # 無くなったままの組番は、再び記録しない
+    assert diff(poller, [10000, 30000, 40000], [1.5, 5.5, 9.0]) == ([], [])
+
+
+def test_diff_keeps_state_per_key():
+    poller = OddsPoller()
+    diff(poller, [10000], [1.5])
+    combos, _ = poller._diff((202105021211, 2), np.array([10000], dtype=np.int32), np.array([1.5], dtype=np.float32))
+    assert combos.tolist() == [10000]
+
+
+def test_update_ranged_odds_and_unordered_legs():
+    series = OddsSeries()
+    poller = OddsPoller(series)
+    first = pd.DataFrame({'First': ['1', '3'], 'Second': ['2', '1'], 'Odds': ['1.5 - 1.8', '2.0-2.4']})
+    changes = poller.update(202105021211, {'WIDE': first}, timestamp=0)
+    assert changes['WIDE']['combo'].tolist() == [10200, 10300]
+    assert changes['WIDE']['Odds'].tolist() == [1.5, 2.0]
+    # 組番の表示順が変わっても同じ組番として比較する
+    second = pd.DataFrame({'First': ['2', '1'], 'Second': ['1', '3'], 'Odds': ['1.5 - 1.9', '2.2-2.6']})
+    changes = poller.update(202105021211, {'WIDE': second}, timestamp=1)
+    assert changes['WIDE']['combo'].tolist() == [10300]
+    assert changes['WIDE']['Odds'].tolist() == [np.float32(2.2)]
+    assert len(series) == 3
+    snapshot = series.snapshot(202105021211, 'WIDE')
+    assert snapshot['combo'].tolist() == [10200, 10300]
+    assert snapshot['Odds'].tolist() == [1.5, np.float32(2.2)]
+    assert series.snapshot(202105021211, 'WIDE', at=0.5)['Odds'].tolist() == [1.5, 2.0]
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from scraping.odds_series import OddsPoller, OddsSeries
+from scraping.odds_tensor import OddsTensor, bet_key
+
+
+def make_frames():
+    return {
+        '単勝': pd.DataFrame({'First': ['1', '2', '3'], 'Odds': ['1.5', '3.0', '取消']}),
+        'FUKUSHO': pd.DataFrame({'First': ['1', '2', '3'], 'Odds': ['1.1 - 1.3', '1.4-2.0', '---']}),
+        'WIDE': pd.DataFrame({'First': ['1', '3', '2'], 'Second': ['2', '1', '3'],
+                              'Odds': ['1.5 - 1.8', '2.0 - 2.4', '3.1-3.9']}),
+        'UMATAN': pd.DataFrame({'First': [2, 1, None], 'Second': [1, 2, 3], 'Odds': [4.0, 5.0, 6.0]}),
+    }
+
+
+def test_bet_key():
+    assert bet_key('ワイド') == 'WIDE' and bet_key('3連単') == 'RENTAN' and bet_key('TANSHO') == 'TANSHO'
+    with pytest.raises(KeyError):
+        bet_key('WIN5')
+
+
+def test_from_frames_ranged_odds():
+    odds = OddsTensor.from_frames(make_frames())
+    assert odds.n_runners == 3
+    assert odds['TANSHO'].shape == (3,) and odds['WIDE'].shape == (3, 3)
+    # 範囲のオッズは下限を使い、'取消'などはNaN
+    assert odds['FUKUSHO'].tolist()[:2] == pytest.approx([1.1, 1.4]) and np.isnan(odds['FUKUSHO'][2])
+    assert np.isnan(odds['TANSHO'][2])
+    # 順序を問わない券種は添字が昇順の要素にだけ値を持つ
+    assert odds.get('WIDE', (2, 1)) == odds.get('WIDE', (1, 2)) == pytest.approx(1.5)
+    assert odds.get('ワイド', (3, 1)) == pytest.approx(2.0)
+    assert np.isnan(odds['WIDE'][1, 0])
+    assert np.isnan(odds['WIDE']).sum() == 6
+    # 馬単は順序を区別し、組番が欠けている行は使わない
+    assert odds.get('UMATAN', (2, 1)) == 4.0 and odds.get('UMATAN', (1, 2)) == 5.0
+    assert np.isnan(odds['UMATAN']).sum() == 7
+
+
+def test_round_trip_ranged_frames():
+    odds = OddsTensor.from_frames(make_frames())
+    frames = odds.to_frames()
+    assert frames['WIDE'][['First', 'Second']].values.tolist() == [[1, 2], [1, 3], [2, 3]]
+    assert frames['WIDE']['Odds'].tolist() == pytest.approx([1.5, 2.0, 3.1])
+    assert frames['FUKUSHO']['First'].tolist() == [1, 2]
+    restored = OddsTensor.from_frames(frames, n_runners=3)
+    assert restored.keys() == odds.keys()
+    for key in odds.keys():
+        np.testing.assert_array_equal(restored[key], odds[key])
+
+
+def test_from_series_ranged_odds():
+    series = OddsSeries()
+    OddsPoller(series).update(202105021211, {'WIDE': make_frames()['WIDE']}, timestamp=0)
+    odds = OddsTensor.from_series(series, 202105021211)
+    assert list(odds.keys()) == ['WIDE']
+    np.testing.assert_array_equal(odds['WIDE'], OddsTensor.from_frames(make_frames())['WIDE'])
+
+
+def test_probability_and_validation():
+    odds = OddsTensor(3, {'TANSHO': [2.0, 4.0, np.nan], 'UMAREN': np.full((3, 3), np.nan)})
+    assert odds.overround('TANSHO') == pytest.approx(0.75)
+    assert odds.normalized_probability('TANSHO')[:2].tolist() == pytest.approx([2 / 3, 1 / 3])
+    assert odds.expected_value('TANSHO', [0.6, 0.3, 0.1])[:2].tolist() == pytest.approx([1.2, 1.2])
+    assert 'UMAREN' in odds and '馬連' in odds and 'WIDE' not in odds
+    with pytest.raises(ValueError):
+        odds.get('UMAREN', (1,))
+    with pytest.raises(ValueError):
+        odds.get('TANSHO', (4,))
+    with pytest.raises(ValueError):
+        OddsTensor(3, {'UMAREN': np.zeros((3, 4))})
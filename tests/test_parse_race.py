@@ -0,0 +1,69 @@
+import pytest
+import requests
+
+import fixtures
+from scraping.journal import CrawlJournal
+from scraping.netkeiba import DatabaseScraper
+from scraping.transport import Page
+
+EMPTY_RACE_ID = 202105021299
+ERROR_RACE_ID = 202105021298
+
+
+class FakeTransport(object):
+    def __init__(self):
+        self.requested = list()
+
+    def fetch(self, url, encoding=None, session=None):
+        race_id = int(url.rstrip('/').split('/')[-1])
+        self.requested.append(race_id)
+        if race_id == ERROR_RACE_ID:
+            return Page(url, b'', encoding, status_code=503)
+        if race_id == EMPTY_RACE_ID:
+            # 存在しないレースIDの場合は、結果の表が無いページが返ってくる
+            return Page(url, '<html><body><p>該当なし</p></body></html>'.encode('euc-jp'), encoding)
+        return Page(url, fixtures.make_db_race_page(race_id, n_horses=6, seed=race_id % 5), encoding)
+
+
+def assert_same_record(record, race_id):
+    scraper = DatabaseScraper(transport=FakeTransport())
+    scraper.get_soup(race_id)
+    assert record.race_id == race_id
+    assert record.main_df.equals(scraper.get_main_df())
+    assert record.race_info == scraper.get_race_info()
+    assert record.pay_df.equals(scraper.get_pay_df())
+    assert record.corner_df.equals(scraper.get_corner_df())
+    assert record.laptime_df.equals(scraper.get_laptime_df())
+    assert record.horse_ids == record.main_df['horse_id'].tolist()
+
+
+def test_parse_race_matches_get_methods():
+    scraper = DatabaseScraper(transport=FakeTransport())
+    assert_same_record(scraper.parse_race(202105021211), 202105021211)
+
+
+def test_scrape_many():
+    race_ids = [202105021211, EMPTY_RACE_ID, 202105021210]
+    records = list(DatabaseScraper(transport=FakeTransport()).scrape_many(race_ids, workers=0, fetch_workers=2))
+    assert records[1] is None
+    assert_same_record(records[0], 202105021211)
+    assert_same_record(records[2], 202105021210)
+    with pytest.raises(requests.HTTPError):
+        list(DatabaseScraper(transport=FakeTransport()).scrape_many([ERROR_RACE_ID], workers=0))
+
+
+def test_scrape_many_with_journal(tmp_path):
+    race_ids = [202105021211, EMPTY_RACE_ID, ERROR_RACE_ID, 202105021210]
+    transport = FakeTransport()
+    with CrawlJournal(str(tmp_path / 'race.jsonl')) as journal:
+        results = list(DatabaseScraper(transport=transport).scrape_many(
+            race_ids, workers=0, journal=journal, return_exceptions=True))
+        assert isinstance(results[2], requests.HTTPError)
+        assert [journal.status(race_id) for race_id in race_ids] == ['done', 'empty', 'failed', 'done']
+    # 再開すると、終わったレースは取得しない
+    transport.requested.clear()
+    with CrawlJournal(str(tmp_path / 'race.jsonl')) as journal:
+        results = list(DatabaseScraper(transport=transport).scrape_many(
+            race_ids, workers=0, journal=journal, return_exceptions=True))
+    assert transport.requested == []
+    assert results == []
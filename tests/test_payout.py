@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from scraping.payout import BET_TYPES, PayoutIndex, normalize_payouts, pack_combinations
+
+
+def make_pay_df(race_id: int) -> pd.DataFrame:
+    # DatabaseScraper.get_pay_dfと同じ形式
+    return pd.DataFrame({
+        'race_id': [str(race_id)] * 6,
+        '券種': ['単勝', '複勝', '複勝', '馬連', '3連複', '三連単'],
+        '馬番号': ['3', '3', '5', '5 - 2', '6 - 2 - 5', '5 → 2 → 6'],
+        '払戻': ['150', '110', '230', '1,230', '3,450', '45,670'],
+        '人気': ['1', '1', '4', '4', '12', '120'],
+    })
+
+
+@pytest.fixture
+def payouts():
+    # ignore_indexを付けずに結合し、インデックスが重複したもの
+    return normalize_payouts(pd.concat([make_pay_df(202105021211), make_pay_df(202105021212)]))
+
+
+def test_pack_combinations_sorts_unordered_bet_types():
+    legs = np.array([[5, 2, 0], [5, 2, 0], [6, 2, 5], [6, 2, 5]])
+    codes = np.array([BET_TYPES['馬連'], BET_TYPES['馬単'], BET_TYPES['三連複'], BET_TYPES['三連単']])
+    assert pack_combinations(legs, codes).tolist() == [20500, 50200, 20506, 60205]
+
+
+def test_normalize_payouts_with_duplicated_index(payouts):
+    assert len(payouts) == 12
+    assert payouts['race_id'].tolist() == [202105021211] * 6 + [202105021212] * 6
+    first = payouts.iloc[:6]
+    assert first['券種'].astype(str).tolist() == ['単勝', '複勝', '複勝', '馬連', '三連複', '三連単']
+    assert first['組番'].tolist() == [(3,), (3,), (5,), (2, 5), (2, 5, 6), (5, 2, 6)]
+    assert first['払戻'].tolist() == [150, 110, 230, 1230, 3450, 45670]
+    assert first['人気'].tolist() == [1, 1, 4, 4, 12, 120]
+
+
+def test_payout_index_get(payouts):
+    index = PayoutIndex(payouts)
+    assert len(index) == 12
+    assert index.get(202105021211, '馬連', (2, 5)) == 1230
+    assert index.get(202105021212, '馬連', (5, 2)) == 1230
+    assert index.get('202105021211', '3連複', (5, 6, 2)) == 3450
+    assert index.get(202105021211, '三連単', (5, 2, 6)) == 45670
+    # 着順通りでない3連単、払戻の無い組番、無いレース
+    assert index.get(202105021211, '三連単', (2, 5, 6)) == 0
+    assert index.get(202105021211, '複勝', (4,)) == 0
+    assert index.get(202105021299, '単勝', (3,)) == 0
+
+
+def test_payout_index_lookup(payouts):
+    index = PayoutIndex(payouts)
+    race_ids = np.array([202105021211, 202105021212, 202105021212, 202105021211])
+    bet_types = np.array([BET_TYPES['複勝'], BET_TYPES['複勝'], BET_TYPES['馬連'], BET_TYPES['三連単']])
+    legs = np.array([[5, 0, 0], [3, 0, 0], [5, 2, 0], [2, 5, 6]])
+    assert index.lookup(race_ids, bet_types, legs, normalized=False).tolist() == [230, 110, 1230, 0]
+    combinations = pack_combinations(legs, bet_types)
+    assert index.lookup(race_ids, bet_types, combinations).tolist() == [230, 110, 1230, 0]
+
+
+def test_payout_index_empty():
+    index = PayoutIndex.from_records([])
+    assert len(index) == 0
+    assert index.lookup(np.array([202105021211]), np.array([1]), np.array([30000])).tolist() == [0]
@@ -0,0 +1,77 @@
+import re
+
+import pytest
+from bs4 import BeautifulSoup
+
+import fixtures
+from scraping.pedigree import PedigreeGraph, parse_ped_table
+
+
+def ped_entries(*generations):
+    # 世代ごとの祖先の馬IDのリストから、parse_ped_tableと同じ形式のリストを作る
+    return [(gen, k, horse_id, f'name_{horse_id}')
+            for gen, ids in enumerate(generations, start=1) for k, horse_id in enumerate(ids)]
+
+
+def test_parse_ped_table():
+    html = fixtures.make_ped_page(seed=1)
+    table = BeautifulSoup(html, 'lxml').find('table', class_='blood_table')
+    entries = parse_ped_table(table)
+    assert [sum(gen == g for gen, _, _, _ in entries) for g in range(1, 6)] == [2, 4, 8, 16, 32]
+    # 最初の行のセルは父、父父、…の順に並ぶ
+    first_row = re.findall(r'href="/horse/(\d{10})/">([^\n]+)\n', html.decode('euc-jp').split('</tr>')[0])
+    assert [(horse_id, name) for _, k, horse_id, name in entries if k == 0] == first_row
+    for gen, k, _, _ in entries:
+        assert 0 <= k < 2 ** gen
+
+
+def test_add_pedigree_and_queries():
+    graph = PedigreeGraph()
+    graph.add_pedigree('X', ped_entries(['S', 'D'], ['SS', 'SD', 'DS', 'DD']))
+    assert len(graph) == 7 and 'SD' in graph and 'Y' not in graph
+    assert graph.parents('X') == ('S', 'D')
+    assert graph.parents('SS') == (None, None)
+    assert graph.names[graph.index('DS')] == 'name_DS'
+    assert graph.generation('X', 2) == ['SS', 'SD', 'DS', 'DD']
+    assert sorted(graph.ancestors('X', 1)) == ['D', 'S']
+    df = graph.pedigree('X')
+    assert df['horse_id'].tolist() == ['S', 'D', 'SS', 'SD', 'DS', 'DD']
+    assert df['gen'].tolist() == [1, 1, 2, 2, 2, 2]
+    assert graph.known_depth('X') == 2 and graph.known_depth('S') == 1 and graph.known_depth('SS') == 0
+    # 母の血統表を追加すると、Xの血統が分かっている世代数も増える
+    graph.add_pedigree('S', ped_entries(['SS', 'SD'], ['A', 'B', 'C', 'E']))
+    graph.add_pedigree('D', ped_entries(['DS', 'DD'], ['F', 'G', 'H', 'I']))
+    assert graph.known_depth('X') == 3
+    assert sorted(graph.descendants('SS')) == ['S', 'X']
+    with pytest.raises(KeyError):
+        graph.parents('Y')
+
+
+def test_inbreeding():
+    graph = PedigreeGraph()
+    # 父と母が父Aを共有する(半兄妹)場合は1/8
+    graph.add_pedigree('X', ped_entries(['S', 'D'], ['A', 'SD', 'A', 'DD']))
+    assert graph.inbreeding('X') == pytest.approx(0.125)
+    assert graph.inbreeding('S') == 0.0
+    # 全兄妹の場合は1/4
+    graph.add_pedigree('Y', ped_entries(['S2', 'D2'], ['A', 'B', 'A', 'B']))
+    assert graph.inbreeding('Y') == pytest.approx(0.25)
+    # 共通祖先Cが父母の祖父にあたる場合は(1/2)^5。世代数を2に制限すると見えなくなる
+    graph.add_pedigree('Z', ped_entries(['S3', 'D3'], ['SS3', 'SD3', 'DS3', 'DD3'],
+                                        ['C', 'x1', 'x2', 'x3', 'C', 'x4', 'x5', 'x6']))
+    assert graph.inbreeding('Z') == pytest.approx(1 / 32)
+    assert graph.inbreeding('Z', generations=2) == 0.0
+
+
+def test_save_and_load(tmp_path):
+    graph = PedigreeGraph()
+    graph.add_pedigree('X', ped_entries(['S', 'D'], ['A', 'SD', 'A', 'DD']))
+    path = str(tmp_path / 'pedigree.npz')
+    graph.save(path)
+    loaded = PedigreeGraph.load(path)
+    assert loaded.ids == graph.ids and loaded.names == graph.names
+    assert loaded.parents('D') == ('A', 'DD')
+    assert loaded.inbreeding('X') == pytest.approx(0.125)
+    # 読み込んだ後も追加できる
+    loaded.add_pedigree('Y', ped_entries(['X', 'D']))
+    assert loaded.parents('Y') == ('X', 'D')
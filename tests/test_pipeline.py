@@ -0,0 +1,64 @@
+import threading
+import time
+
+import pytest
+
+from scraping.pipeline import PipelineStats, run_pipeline
+
+
+def square(x: int) -> int:
+    if x == 3:
+        raise ValueError('bad item')
+    return x * x
+
+
+def test_ordered_results():
+    results = list(run_pipeline(range(10), lambda x: x, lambda x: x + 1, fetch_workers=4, parse_workers=0))
+    assert results == [(i, i + 1) for i in range(10)]
+
+
+def test_unordered_results():
+    def fetch(x):
+        time.sleep(0.05 if x == 0 else 0)
+        return x
+    results = list(run_pipeline(range(5), fetch, lambda x: x, fetch_workers=5, parse_workers=0, ordered=False))
+    assert sorted(results) == [(i, i) for i in range(5)]
+    assert results[-1] == (0, 0)
+
+
+def test_parse_in_processes():
+    stats = PipelineStats()
+    results = list(run_pipeline(
+        [1, 2, 4], lambda x: x, square, fetch_workers=2, parse_workers=1, stats=stats))
+    assert results == [(1, 1), (2, 4), (4, 16)]
+    summary = stats.summary()
+    assert summary['fetch']['count'] == 3 and summary['parse']['count'] == 3
+
+
+def test_exceptions():
+    with pytest.raises(ValueError, match='bad item'):
+        list(run_pipeline(range(5), lambda x: x, square, parse_workers=0))
+    results = list(run_pipeline(range(5), lambda x: x, square, parse_workers=0, return_exceptions=True))
+    assert [item for item, _ in results] == list(range(5))
+    assert isinstance(results[3][1], ValueError)
+    assert results[4] == (4, 16)
+
+
+def test_slow_first_item_does_not_buffer_past_max_pending():
+    started = list()
+    lock = threading.Lock()
+    observed = dict()
+
+    def fetch(x):
+        with lock:
+            started.append(x)
+        if x == 0:
+            # 先頭の取得が遅れている間に、後続の取得がどこまで進むかを記録する
+            time.sleep(0.5)
+            with lock:
+                observed['started'] = len(started)
+        return x
+
+    results = list(run_pipeline(range(50), fetch, lambda x: x, fetch_workers=8, parse_workers=0, max_pending=4))
+    assert results == [(i, i) for i in range(50)]
+    assert observed['started'] <= 4
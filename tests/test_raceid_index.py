@@ -0,0 +1,118 @@
+import datetime
+import warnings
+
+import numpy as np
+import pytest
+
+from scraping.netkeiba import RaceidScraper
+from scraping.raceid_index import RaceIdIndex, decode_race_ids
+
+D = datetime.date
+# 2020年 1回東京1日目(1/25)と2日目(1/26)、2021年 2回東京1日目(5/1)、2021年 1回中山1日目(1/5)
+DATES = {
+    202005010101: D(2020, 1, 25), 202005010102: D(2020, 1, 25),
+    202005010201: D(2020, 1, 26),
+    202105020101: D(2021, 5, 1), 202105020112: D(2021, 5, 1),
+    202106010101: D(2021, 1, 5),
+}
+
+
+def make_index(with_dates=True):
+    index = RaceIdIndex()
+    ids = list(DATES)[::-1]
+    index.add([str(i) for i in ids], [DATES[i] for i in ids] if with_dates else None)
+    return index
+
+
+def test_decode_race_ids():
+    arr = decode_race_ids(['202105020112'], [20210501])
+    assert arr[0].tolist() == (202105020112, 20210501, 2021, 5, 2, 1, 12)
+
+
+def test_prefix_lookups():
+    index = make_index()
+    assert index.race_ids.tolist() == sorted(DATES)
+    assert index.year(2020).tolist() == [202005010101, 202005010102, 202005010201]
+    assert index.meeting(2021, 5).tolist() == [202105020101, 202105020112]
+    assert index.meeting(2020, 5, 1, 2).tolist() == [202005010201]
+    assert index.meeting(2021, 9).tolist() == []
+    assert '202106010101' in index and 202106010102 not in index
+    assert index.last_date == D(2021, 5, 1) and index.last_year == 2021
+
+
+def test_between():
+    index = make_index()
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        assert index.between(D(2020, 1, 26), D(2021, 1, 31)).tolist() == [202005010201, 202106010101]
+        assert index.between(D(2020, 1, 1), D(2021, 12, 31), course=5).tolist() == [
+            202005010101, 202005010102, 202005010201, 202105020101, 202105020112]
+        assert index.between(D(2022, 1, 1), D(2022, 12, 31)).tolist() == []
+
+
+def test_between_warns_on_undated():
+    index = make_index(with_dates=False)
+    index.add(['202105020101', '202105020112'], [D(2021, 5, 1)] * 2)
+    with pytest.warns(UserWarning, match='no date'):
+        assert index.between(D(2020, 1, 1), D(2021, 12, 31)).tolist() == [202105020101, 202105020112]
+    # 開催日が不明なレースが範囲の年に無ければ警告しない
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        assert index.between(D(2021, 1, 1), D(2021, 12, 31), course=5).tolist() == [
+            202105020101, 202105020112]
+    assert index.undated_years() == [2020, 2021]
+
+
+def test_add_fills_unknown_dates(tmp_path):
+    (tmp_path / '2020.txt').write_text('202005010102\n202005010101\n202005010101\n', encoding='utf-8')
+    index = RaceIdIndex.from_text(str(tmp_path / '2020.txt'))
+    assert index.race_ids.tolist() == [202005010101, 202005010102]
+    assert index.last_date is None and index.undated_years() == [2020]
+    assert index.add([202005010101, 202005010201], [20200125, D(2020, 1, 26)]) == 1
+    # 分かっている開催日は、開催日不明のIDを再度追加しても消えない
+    assert index.add(['202005010201']) == 0
+    assert index.data['date'].tolist() == [20200125, 0, 20200126]
+    df = index.to_frame()
+    assert df['date'].isna().tolist() == [False, True, False]
+    assert df['date'].iloc[0] == np.datetime64('2020-01-25')
+    assert df['course'].tolist() == [5, 5, 5]
+
+
+def test_save_and_load(tmp_path):
+    path = str(tmp_path / 'index.npy')
+    make_index().save(path)
+    index = RaceIdIndex.load(path)
+    assert index.race_ids.tolist() == sorted(DATES)
+    assert index.between(D(2021, 5, 1), D(2021, 5, 1)).tolist() == [202105020101, 202105020112]
+    np.save(path, np.arange(3))
+    with pytest.raises(ValueError):
+        RaceIdIndex.load(path)
+
+
+def test_backfill_and_update_index(monkeypatch):
+    scraper = RaceidScraper()
+    requested = []
+
+    async def aget_raceID_dict(start, end):
+        requested.append((start, end))
+        race_id_dict = dict()
+        for race_id, date in DATES.items():
+            if start <= date <= end:
+                race_id_dict.setdefault(date, []).append(race_id)
+        return race_id_dict
+    monkeypatch.setattr(scraper, 'aget_raceID_dict', aget_raceID_dict)
+
+    index = make_index(with_dates=False)
+    assert scraper.backfill_index(index, years=[2020], sleep_time=0) == 3
+    assert requested == [(D(2020, 1, 1), D(2020, 12, 31))]
+    assert index.undated_years() == [2021]
+    assert scraper.backfill_index(index, sleep_time=0) == 3
+    assert index.undated_years() == [] and len(index) == len(DATES)
+    # 全て埋まった後は取得しない
+    assert scraper.backfill_index(index, sleep_time=0) == 0
+    assert len(requested) == 2
+    # update_indexは最後の開催日の翌日から取得する
+    assert scraper.update_index(index, end=D(2021, 5, 31), sleep_time=0) == 0
+    assert requested[-1] == (D(2021, 5, 2), D(2021, 5, 31))
+    scraper.update_index(index, end=D(2020, 12, 31), sleep_time=0, start=D(2020, 1, 1))
+    assert requested[-1] == (D(2020, 1, 1), D(2020, 12, 31))
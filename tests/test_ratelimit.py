@@ -0,0 +1,104 @@
+import pytest
+
+from scraping import ratelimit
+from scraping.ratelimit import RateLimiter, TokenBucket
+
+
+class FakeClock(object):
+    '''time.monotonic, time.time, time.sleepの代わり。sleepした分だけ時刻を進める'''
+
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = list()
+
+    def time(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(ratelimit.time, 'monotonic', clock.time)
+    monkeypatch.setattr(ratelimit.time, 'time', clock.time)
+    monkeypatch.setattr(ratelimit.time, 'sleep', clock.sleep)
+    return clock
+
+
+def test_token_bucket_burst_then_rate(clock):
+    bucket = TokenBucket(rate=2, burst=3)
+    assert [bucket.acquire() for _ in range(3)] == [0, 0, 0]
+    assert bucket.acquire() == pytest.approx(0.5)
+    assert bucket.acquire() == pytest.approx(0.5)
+    # 待っている間にトークンが補充される
+    clock.now += 10
+    assert [bucket.acquire() for _ in range(3)] == [0, 0, 0]
+    assert bucket.acquire() == pytest.approx(0.5)
+
+
+def test_rate_limiter_per_host(clock):
+    limiter = RateLimiter()
+    limiter.set_rate('db.netkeiba.com', rate=1)
+    assert limiter.acquire('https://db.netkeiba.com/race/202105021211') == 0
+    assert limiter.acquire('https://db.netkeiba.com/race/202105021212') == pytest.approx(1)
+    # 設定していないホストは制限しない
+    assert limiter.acquire('https://race.netkeiba.com/') == 0
+    assert limiter.acquire('race.netkeiba.com') == 0
+
+
+def test_rate_limiter_default_rate(clock):
+    limiter = RateLimiter(default_rate=4, default_burst=1)
+    assert limiter.acquire('https://a.example.com/') == 0
+    assert limiter.acquire('https://a.example.com/') == pytest.approx(0.25)
+    # ホストごとに別のトークンバケットを持つ
+    assert limiter.acquire('https://b.example.com/') == 0
+
+
+def test_set_rate_keeps_tokens_for_same_setting(clock):
+    limiter = RateLimiter()
+    limiter.set_rate('a.example.com', rate=1, burst=2)
+    limiter.acquire('a.example.com')
+    limiter.acquire('a.example.com')
+    # 同じ設定を繰り返しても、使い切ったトークンは元に戻らない
+    limiter.set_rate('a.example.com', rate=1, burst=2)
+    assert limiter.acquire('a.example.com') == pytest.approx(1)
+    limiter.set_rate('a.example.com', rate=None)
+    assert limiter.acquire('a.example.com') == 0
+
+
+def test_set_interval(clock):
+    limiter = RateLimiter()
+    limiter.set_interval('a.example.com', 2)
+    limiter.acquire('a.example.com')
+    assert limiter.acquire('a.example.com') == pytest.approx(2)
+
+
+def test_override_interval_restores_previous_bucket(clock):
+    limiter = RateLimiter()
+    limiter.set_rate('a.example.com', rate=10, burst=5)
+    limiter.acquire('a.example.com')
+    with limiter.override_interval(['a.example.com', 'b.example.com'], 3):
+        limiter.acquire('a.example.com')
+        assert limiter.acquire('a.example.com') == pytest.approx(3)
+        limiter.acquire('b.example.com')
+        assert limiter.acquire('b.example.com') == pytest.approx(3)
+    # 元のトークンバケットに戻り、設定していなかったホストは制限しない
+    assert limiter._buckets['a.example.com'].burst == 5
+    assert limiter.acquire('a.example.com') == 0
+    assert 'b.example.com' not in limiter._buckets
+    with limiter.override_interval('a.example.com', None):
+        assert limiter._buckets['a.example.com'].burst == 5
+
+
+def test_file_token_bucket_shared_between_limiters(clock, tmp_path):
+    state_dir = str(tmp_path / 'ratelimit')
+    first, second = RateLimiter(state_dir=state_dir), RateLimiter(state_dir=state_dir)
+    first.set_rate('a.example.com', rate=1)
+    second.set_rate('a.example.com', rate=1)
+    assert first.acquire('a.example.com') == 0
+    # 別のインスタンス(別のプロセス)でも同じファイルの状態を参照する
+    assert second.acquire('a.example.com') == pytest.approx(1)
+    assert (tmp_path / 'ratelimit' / 'a.example.com.bucket').exists()
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import fixtures
+from scraping.netkeiba import DatabaseScraper
+from scraping.sink import ParquetSink, convert_frame, split_odds, split_weight, to_int, to_money, to_seconds
+from scraping.transport import Page
+
+
+def test_converters():
+    assert to_int(pd.Series(['1', '１２', '3(降)', '中', None])).tolist() == [1, 12, 3, pd.NA, pd.NA]
+    assert to_money(pd.Series(['¥1,230', '431,054', ''])).tolist() == [1230, 431054, pd.NA]
+    assert to_seconds(pd.Series(['2:22.9', '1\'50"3', '58.1'])).tolist() == pytest.approx([142.9, 110.3, 58.1])
+    odds = split_odds(pd.Series(['1.1 - 1.3', '2.5', '取消']))
+    assert odds[0].tolist()[:2] == [1.1, 2.5] and odds[1].tolist()[:2] == [1.3, 2.5]
+    assert odds[0].isna().tolist() == [False, False, True]
+    weight = split_weight(pd.Series(['488(-7)', '500', '計不']))
+    assert weight[0].tolist() == [488, 500, pd.NA] and weight[1].tolist() == [-7, pd.NA, pd.NA]
+
+
+def test_convert_frame():
+    df = pd.DataFrame({'着順': ['1', '取'], '性齢': ['牝3', 'セ10'], '距離': ['芝2400', 'ダ1200'],
+                       '馬体重': ['488(-7)', '計不'], 'Odds': ['1.1 - 1.3', '2.0'], '馬名': ['A', 'B']})
+    out = convert_frame(df)
+    assert out.columns.tolist() == ['着順', '性別', '年齢', 'コース種別', '距離', '馬体重', '体重増減',
+                                    'Odds', 'Odds上限', '馬名']
+    assert out['着順'].dtype == 'Int32' and out['年齢'].tolist() == [3, 10]
+    assert out['コース種別'].tolist() == ['芝', 'ダ'] and out['距離'].tolist() == [2400, 1200]
+    assert out['Odds'].tolist() == [1.1, 2.0] and out['Odds上限'].tolist() == [1.3, 2.0]
+    assert out['馬名'].dtype == 'string'
+    # 範囲の無いオッズだけなら上限の列は作らない
+    assert 'Odds上限' not in convert_frame(pd.DataFrame({'Odds': ['1.5']})).columns
+
+
+def test_parquet_sink(tmp_path):
+    pytest.importorskip('pyarrow')
+    scraper = DatabaseScraper()
+    main_dfs = list()
+    for race_id in [202105021211, 202106030801]:
+        content = fixtures.make_db_race_page(race_id, n_horses=8, seed=race_id % 7)
+        scraper.set_soup(scraper._make_soup(Page(f'https://db.netkeiba.com/race/{race_id}', content, 'EUC-JP')),
+                         race_id)
+        main_dfs.append(scraper.get_main_df())
+    with ParquetSink(str(tmp_path), row_group_size=10) as sink:
+        for main_df in main_dfs:
+            sink.add_main_df(main_df)
+        sink.add_odds(202105021211, 'WIDE', pd.DataFrame(
+            {'First': ['1', '1'], 'Second': ['2', '3'], 'Odds': ['1.5 - 1.8', '2.0 - 2.4']}),
+            fetched_at=pd.Timestamp('2021-05-30 15:00'))
+        sink.add_odds(202105021211, 'TANSHO', pd.DataFrame({'First': ['1'], 'Odds': ['3.5']}),
+                      fetched_at=pd.Timestamp('2021-05-30 15:00'))
+    results = sink.read('results')
+    assert len(results) == 16
+    assert sorted(results['racecourse'].astype(str).unique()) == ['中山', '東京']
+    tokyo = sink.read('results', filters=[('racecourse', '=', '東京')])
+    assert sorted(tokyo['horse_id'].astype(str)) == sorted(main_dfs[0]['horse_id'])
+    assert np.issubdtype(tokyo['タイム'].dtype, np.floating) and tokyo['馬番'].dtype == 'Int32'
+    odds = sink.read('odds').sort_values(['券種', 'Second'])
+    assert odds['Odds'].tolist() == [3.5, 1.5, 2.0]
+    assert odds['Odds上限'].tolist() == [3.5, 1.8, 2.4]
+    assert odds['Second'].isna().tolist() == [True, False, False]
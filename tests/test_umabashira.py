@@ -0,0 +1,58 @@
+from io import StringIO
+
+import numpy as np
+import pandas as pd
+import pytest
+from bs4 import BeautifulSoup
+
+import fixtures
+from scraping.netkeiba import UmabashiraLimitedScraper, UmabashiraScraper
+from scraping.table import read_table, table_texts
+from scraping.transport import Page
+
+SPANNED = '''<table>
+<tr><th>枠</th><th colspan="2">馬</th><th>印</th></tr>
+<tr><td rowspan="2">1</td><td>1</td><td>A</td><td rowspan="3"></td></tr>
+<tr><td>2</td><td>B</td></tr>
+<tr><td>2</td><td>3</td><td>C</td></tr>
+</table>'''
+
+
+def umabashira_page(n_horses=8):
+    url = 'http://jiro8.sakura.ne.jp/index.php?code=2105021211'
+    return Page(url, fixtures.make_umabashira_page('202105021211', n_horses=n_horses), 'cp932')
+
+
+def test_table_texts_expands_spans():
+    table = BeautifulSoup(SPANNED, 'html.parser').find('table')
+    texts = table_texts(table)
+    assert texts[1:] == [['1', '1', 'A', np.nan], ['1', '2', 'B', np.nan], ['2', '3', 'C', np.nan]]
+    assert texts[0] == ['枠', '馬', '馬', '印']
+
+
+@pytest.mark.parametrize('html', [
+    SPANNED,
+    '<table><tr><th>a</th><th>b</th></tr><tr><td>1,000</td><td>x</td></tr><tr><td>2</td></tr></table>',
+])
+def test_read_table_matches_read_html(html):
+    table = BeautifulSoup(html, 'html.parser').find('table')
+    pd.testing.assert_frame_equal(read_table(table), pd.read_html(StringIO(html))[0])
+
+
+def test_parse_umabashira_matches_read_html():
+    page = umabashira_page()
+    df = UmabashiraScraper()._parse_umabashira(page)
+    pd.testing.assert_frame_equal(df, pd.read_html(StringIO(page.text))[12])
+
+
+def test_parse_umabashira_limited():
+    page = umabashira_page(n_horses=8)
+    df = UmabashiraLimitedScraper()._parse_umabashira(page, '202105021211')
+    assert df.columns.tolist() == UmabashiraLimitedScraper().cols
+    # 馬は右から馬番の順に並んでいる
+    assert df['馬番'].tolist() == [str(h) for h in range(8, 0, -1)]
+    assert (df['race_id'] == '202105021211').all()
+    full = pd.read_html(StringIO(page.text))[12].set_index(8)
+    assert df['スピード指数'].astype(int).tolist() == full.loc['スピード指数'].astype(int).tolist()
+    with pytest.raises(ValueError):
+        UmabashiraLimitedScraper()._parse_umabashira(Page('http://jiro8/', b'<html></html>', 'cp932'), '1')